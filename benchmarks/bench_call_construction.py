@@ -0,0 +1,117 @@
+"""
+Benchmark the per step overhead of building a call.
+
+Compares the former deepcopy of the default call with the copy on write
+call. Every step merges a large default call with the call from the
+config, substitutes it and lets an augmenting function change a few
+values, like the bundled plugins do.
+
+Run with: python benchmarks/bench_call_construction.py [steps]
+"""
+import sys
+from copy import deepcopy
+from time import perf_counter
+from typing import Any, Callable, Dict
+
+from test_tool.substitute import find_variables, recursively_replace_variables
+from test_tool.utils import CopyOnWriteDict
+
+# A default call with large nested values, like browser options or headers
+DEFAULT_CALL: Dict[str, Any] = {
+    "base_url": "{{BASE_URL}}",
+    "path": "/",
+    "url": None,
+    "method": "GET",
+    "headers": {f"X-Header-{idx}": f"value-{idx}" for idx in range(50)},
+    "options": {
+        f"option_{idx}": {"enabled": True, "arguments": [idx, idx + 1]}
+        for idx in range(200)
+    },
+    "actions": [
+        {"action": "click", "selector": f"#{idx}"} for idx in range(100)
+    ],
+    "status_codes": [200],
+}
+DEFAULT_VARIABLES = find_variables(DEFAULT_CALL)
+
+USER_CALL: Dict[str, Any] = {"path": "/api/{{ID}}", "method": "POST"}
+
+DATA: Dict[str, Any] = {"BASE_URL": "http://localhost", "ID": 1}
+
+
+def augment(call: Dict[str, Any]) -> None:
+    """
+    Change some values of the call.
+
+    Parameters
+    ----------
+    call : Dict[str, Any]
+        The call.
+    """
+    call["url"] = f'{call["base_url"]}{call["path"]}'
+    call["headers"]["Content-Type"] = "application/json"
+    call["status_codes"] = [int(code) for code in call["status_codes"]]
+
+
+def deepcopy_step() -> None:
+    """
+    Build a call with a deepcopy of the default call.
+    """
+    call = {**deepcopy(DEFAULT_CALL), **USER_CALL}
+    recursively_replace_variables(call, DATA)
+    augment(call)
+
+
+def copy_on_write_step() -> None:
+    """
+    Build a call layered over the default call.
+    """
+    call = CopyOnWriteDict({**DEFAULT_CALL, **USER_CALL})
+    variables = {
+        key: value
+        for key, value in DEFAULT_VARIABLES.items()  # type: ignore
+        if key not in USER_CALL
+    }
+    variables.update(find_variables(USER_CALL))  # type: ignore
+    recursively_replace_variables(call, DATA, variables)
+    augment(call)
+
+
+def run(step: Callable[[], None], steps: int) -> float:
+    """
+    Run a step function and return the duration per step.
+
+    Parameters
+    ----------
+    step : Callable[[], None]
+        The step function.
+    steps : int
+        Number of steps.
+
+    Returns
+    -------
+    float
+        The duration per step in seconds.
+    """
+    start = perf_counter()
+    for _ in range(steps):
+        step()
+    return (perf_counter() - start) / steps
+
+
+def main() -> None:
+    """
+    Run the benchmark.
+    """
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    before = run(deepcopy_step, steps)
+    after = run(copy_on_write_step, steps)
+
+    print(f"Steps:         {steps}")
+    print(f"Deepcopy:      {before * 1e6:8.1f} us/step")
+    print(f"Copy on write: {after * 1e6:8.1f} us/step")
+    print(f"Speedup:       {before / after:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark the latency of a run with and without a daemon.
+
+A cold run starts a new interpreter, which imports the test tool and the
+plugins before the first step. A warm run starts a new interpreter, which
+only sends the run to a daemon started with test-tool serve.
+
+Run with: python benchmarks/bench_daemon.py [runs] [plugin ...]
+"""
+import subprocess
+import sys
+import time
+from pathlib import Path
+from statistics import median
+from tempfile import TemporaryDirectory
+from typing import List
+
+from test_tool.daemon import is_serving
+
+# Makes a run in a new interpreter
+COLD_RUN: str = (
+    "import sys\n"
+    "from test_tool.base import run_tests\n"
+    "try:\n"
+    "    run_tests(sys.argv[1], 'calls.yaml', 'data.yaml', False, '')\n"
+    "except SystemExit as e:\n"
+    "    sys.exit(e.code)\n"
+)
+
+# Sends a run to the daemon from a new interpreter
+WARM_RUN: str = (
+    "import sys\n"
+    "from pathlib import Path\n"
+    "from test_tool.daemon import run_in_daemon\n"
+    "arguments = {\n"
+    "    'project_path_str': sys.argv[1],\n"
+    "    'calls_path_str': 'calls.yaml',\n"
+    "    'data_path_str': 'data.yaml',\n"
+    "    'continue_on_failure': False,\n"
+    "    'output': '',\n"
+    "}\n"
+    "sys.exit(run_in_daemon(Path(sys.argv[2]), arguments, 30))\n"
+)
+
+
+def create_project(path: Path, plugins: List[str]) -> None:
+    """
+    Write a project with an ASSERT step and a step for every plugin to
+    import.
+
+    Parameters
+    ----------
+    path : Path
+        Folder of the project.
+    plugins : List[str]
+        Call types of the plugins the project imports.
+    """
+    with open(path.joinpath("calls.yaml"), "w", encoding="utf-8") as file:
+        file.write("- type: ASSERT\n  call:\n    value: 1\n    expected: 1\n")
+        for plugin in plugins:
+            # Importing the plugin is enough, the step fails fast
+            file.write(f"- type: {plugin}\n  call: {{}}\n")
+
+
+def measure(arguments: List[str], runs: int) -> float:
+    """
+    Start a process several times and return the median duration.
+
+    Parameters
+    ----------
+    arguments : List[str]
+        The arguments of the process.
+    runs : int
+        Number of runs.
+
+    Returns
+    -------
+    float
+        The median duration in seconds.
+    """
+    durations: List[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(arguments, capture_output=True, check=False)
+        durations.append(time.perf_counter() - start)
+    return median(durations)
+
+
+def main() -> None:
+    """
+    Run the benchmark.
+    """
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    plugins = sys.argv[2:]
+
+    with TemporaryDirectory() as directory:
+        project = Path(directory).joinpath("project")
+        project.mkdir()
+        create_project(project, plugins)
+        socket_path = Path(directory).joinpath("daemon.sock")
+
+        cold = measure([sys.executable, "-c", COLD_RUN, str(project)], runs)
+
+        daemon = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "test_tool",
+                "serve",
+                "--socket",
+                str(socket_path),
+                "--preload",
+                "ASSERT",
+                *plugins,
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            while not socket_path.exists() or not is_serving(socket_path):
+                if daemon.poll() is not None:
+                    raise RuntimeError("The daemon did not start")
+                time.sleep(0.05)
+            warm = measure(
+                [
+                    sys.executable,
+                    "-c",
+                    WARM_RUN,
+                    str(project),
+                    str(socket_path),
+                ],
+                runs,
+            )
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+    print(f"Runs:    {runs}")
+    print(f"Plugins: {', '.join(['ASSERT', *plugins])}")
+    print(f"Cold:    {cold * 1000:8.1f} ms")
+    print(f"Warm:    {warm * 1000:8.1f} ms")
+    print(f"Speedup: {cold / warm:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
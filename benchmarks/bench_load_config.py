@@ -0,0 +1,130 @@
+"""
+Benchmark loading a calls file with line numbers.
+
+Compares load_config_yaml, which uses libyaml if available and takes the
+line numbers from the nodes, with the former implementation, which
+parsed the file in pure Python and searched the lines for the calls.
+
+Run with: python benchmarks/bench_load_config.py [steps]
+"""
+import sys
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Callable, List
+
+from yaml import SafeLoader, __with_libyaml__, load
+
+from test_tool.base import load_config_yaml
+
+
+def legacy_load_config_yaml(path: Path) -> Any:
+    """
+    Load a calls file with line numbers, as done before the nodes were
+    used.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the file.
+
+    Returns
+    -------
+    Any
+        The loaded calls.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        content = file.read()
+
+    data = load(content, SafeLoader)
+
+    line_numbers: List[int] = []
+    intendation = 0
+    for idx, line in enumerate(content.split("\n")):
+        if "- call:" in line or "- type:" in line:
+            if idx > 0 and len(line) - len(line.lstrip()) == intendation:
+                line_numbers.append(idx + 1)
+            elif idx == 0:
+                intendation = len(line) - len(line.lstrip())
+                line_numbers.append(idx + 1)
+
+    for idx, element in enumerate(data):
+        if isinstance(element, dict):
+            element["line"] = line_numbers[idx]
+    return data
+
+
+def create_calls(path: Path, steps: int) -> None:
+    """
+    Write a synthetic calls file with REST and ASSERT steps.
+
+    Parameters
+    ----------
+    path : Path
+        Path of the calls file.
+    steps : int
+        Number of steps.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        for idx in range(steps):
+            if idx % 2:
+                file.write(
+                    "- type: ASSERT\n"
+                    "  call:\n"
+                    f"    value: '{{{{ RESULTS.values[{idx % 10}] }}}}'\n"
+                    "    expected: 1\n"
+                )
+            else:
+                file.write(
+                    "- type: REST\n"
+                    "  call:\n"
+                    "    base_url: '{{REST_BASE_URL}}'\n"
+                    f"    path: /api/items/{idx}\n"
+                    "    headers:\n"
+                    "      Accept: application/json\n"
+                    "    status_codes: [200, 201]\n"
+                )
+
+
+def run(load_calls: Callable[[Path], Any], path: Path) -> float:
+    """
+    Load the calls file and return the duration.
+
+    Parameters
+    ----------
+    load_calls : Callable[[Path], Any]
+        Function loading the calls file.
+    path : Path
+        Path of the calls file.
+
+    Returns
+    -------
+    float
+        The duration in seconds.
+    """
+    start = perf_counter()
+    load_calls(path)
+    return perf_counter() - start
+
+
+def main() -> None:
+    """
+    Run the benchmark.
+    """
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    with TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("calls.yaml")
+        create_calls(path, steps)
+        legacy = run(legacy_load_config_yaml, path)
+        loaded = run(lambda path: load_config_yaml(path, True), path)
+
+    print(f"Steps:   {steps}")
+    print(f"libyaml: {__with_libyaml__}")
+    print(f"Legacy:  {legacy * 1000:8.1f} ms")
+    print(f"Nodes:   {loaded * 1000:8.1f} ms")
+    print(f"Speedup: {legacy / loaded:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
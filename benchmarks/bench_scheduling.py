@@ -0,0 +1,172 @@
+"""
+Benchmark the order the scheduler starts the ready calls in.
+
+Runs the steps of a calls file with the scheduler of the test tool on a
+number of workers, every step sleeping for its duration, and compares
+the makespan of starting the ready calls in the order of the calls file
+with starting them by their expected duration. The durations are taken
+from the timings of a recorded run, or from a synthetic calls file whose
+few slow steps come last. The durations are scaled, so the slowest step
+takes half a second.
+
+Run with: python benchmarks/bench_scheduling.py [jobs] [RUN CALLS]
+"""
+import sys
+from pathlib import Path
+from random import Random
+from time import perf_counter, sleep
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from test_tool.base import load_config_yaml
+from test_tool.scheduler import (
+    build_dependencies,
+    get_step_priorities,
+    run_scheduled,
+)
+from test_tool.shard import load_step_durations
+
+# Duration of the slowest step in seconds
+SLOWEST_STEP: float = 0.5
+
+
+def create_calls(
+    steps: int, slow_steps: int
+) -> Tuple[List[Dict[str, Any]], List[float]]:
+    """
+    Create a synthetic calls file, a few slow steps follow many short ones.
+
+    Parameters
+    ----------
+    steps : int
+        Number of steps.
+    slow_steps : int
+        Number of slow steps at the end of the file.
+
+    Returns
+    -------
+    Tuple[List[Dict[str, Any]], List[float]]
+        The calls and the duration of every call in seconds.
+    """
+    random = Random(42)
+    calls: List[Dict[str, Any]] = []
+    durations: List[float] = []
+    for idx in range(steps):
+        if idx >= steps - slow_steps:
+            # Slow flows at the end of the file, like Selenium or SFTP
+            calls.append({"type": "SELENIUM", "line": idx + 1, "call": {}})
+            durations.append(random.uniform(20.0, 30.0))
+        elif idx % 10 == 9:
+            # A query reading the key saved by the step before
+            calls.append(
+                {
+                    "type": "ASSERT",
+                    "line": idx + 1,
+                    "call": {"value": "{{ RESULT_%d }}" % (idx - 1)},
+                }
+            )
+            durations.append(random.uniform(0.1, 0.5))
+        else:
+            calls.append(
+                {
+                    "type": "JDBC_SQL",
+                    "line": idx + 1,
+                    "call": {"save": [{"to": "RESULT_%d" % idx}]},
+                }
+            )
+            durations.append(random.uniform(0.5, 1.5))
+    return calls, durations
+
+
+def load_recorded_run(
+    run_path: Path, calls_path: Path
+) -> Tuple[List[Dict[str, Any]], List[float]]:
+    """
+    Load the calls and the durations of a recorded run.
+
+    Parameters
+    ----------
+    run_path : Path
+        The output folder of the run.
+    calls_path : Path
+        The calls file of the run.
+
+    Returns
+    -------
+    Tuple[List[Dict[str, Any]], List[float]]
+        The calls and the duration of every call in seconds.
+    """
+    calls: List[Dict[str, Any]] = load_config_yaml(calls_path, True)
+    recorded = load_step_durations(run_path)
+    known = list(recorded.values()) or [1.0]
+    default = sum(known) / len(known)
+    return calls, [recorded.get(test["line"], default) for test in calls]
+
+
+def measure(
+    dependencies: List[Set[int]],
+    durations: List[float],
+    jobs: int,
+    priorities: Optional[List[float]] = None,
+) -> float:
+    """
+    Run the steps with the scheduler and measure the makespan.
+
+    Parameters
+    ----------
+    dependencies : List[Set[int]]
+        The indices of the calls every call depends on.
+    durations : List[float]
+        The duration of every call in seconds.
+    jobs : int
+        Number of workers.
+    priorities : Optional[List[float]], optional
+        The priority of every call, by default the order of the calls.
+
+    Returns
+    -------
+    float
+        The time the last call finished in seconds.
+    """
+
+    def run_step(idx: int) -> bool:
+        sleep(durations[idx])
+        return False
+
+    start = perf_counter()
+    run_scheduled(dependencies, run_step, True, jobs, priorities)
+    return perf_counter() - start
+
+
+def main() -> None:
+    """
+    Run the benchmark.
+    """
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    if len(sys.argv) > 3:
+        calls, durations = load_recorded_run(
+            Path(sys.argv[2]), Path(sys.argv[3])
+        )
+    else:
+        calls, durations = create_calls(200, jobs // 2 or 1)
+    scale = SLOWEST_STEP / max(durations)
+    durations = [duration * scale for duration in durations]
+    # The default calls of the plugins are not needed to find the keys
+    # the calls reference and write
+    dependencies = build_dependencies(calls, {})
+
+    ordered = measure(dependencies, durations, jobs)
+    priorities = get_step_priorities(dependencies, durations)
+    longest_first = measure(dependencies, durations, jobs, priorities)
+    # No schedule is shorter than the work per worker or the longest chain
+    bound = max(sum(durations) / jobs, max(priorities or [0.0]))
+
+    print(f"Steps:         {len(calls)}")
+    print(f"Jobs:          {jobs}")
+    print(f"Config order:  {ordered:8.2f} s")
+    print(f"Longest first: {longest_first:8.2f} s")
+    print(f"Lower bound:   {bound:8.2f} s")
+    print(f"Speedup:       {ordered / longest_first:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
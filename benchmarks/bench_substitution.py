@@ -0,0 +1,223 @@
+"""
+Benchmark the substitution of variables.
+
+Compares the compiled templates of test_tool.substitute with the former
+implementation, which parsed every string on every call. Both are run
+twice per step, like make_all_calls does, on a synthetic calls file.
+
+Run with: python benchmarks/bench_substitution.py [steps]
+"""
+import sys
+from copy import deepcopy
+from pathlib import Path
+from re import findall, search, sub
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional
+
+from yaml import dump
+
+from test_tool.base import load_config_yaml
+from test_tool.substitute import (
+    available_pipes,
+    compile_template,
+    replace_string_variables,
+)
+
+
+def legacy_replace_string_variables(
+    to_change: str, data: Dict[str, Any]
+) -> Optional[str]:
+    """
+    Replace variables in a string, as done before the templates were
+    compiled.
+
+    Parameters
+    ----------
+    to_change : str
+        String to change.
+    data : Dict[str, Any]
+        Data to use for the changes.
+
+    Returns
+    -------
+    Optional[str]
+        The changed string if it was changed, None otherwise.
+    """
+    changed: Any = to_change
+    pattern = r"{{[a-zA-Z0-9\_\-\.\[\]\|\:\ ]+}}"
+    for variable in findall(pattern, changed):
+        pipes = [pipe.strip() for pipe in variable[2:-2].split("|")]
+        value: Any = data
+        for key in pipes[0].split("."):
+            list_pattern = r"\[(-?\d+)\]$"
+            is_list = search(list_pattern, key)
+            if is_list:
+                list_key = int(is_list.group(1))
+                key = sub(list_pattern, "", key)
+            value = value[key]
+            if is_list:
+                value = value[list_key]
+        if changed == variable:
+            for pipe in pipes[1:]:
+                name, *arguments = pipe.split(":")
+                for idx, argument in enumerate(arguments):
+                    try:
+                        arguments[idx] = int(argument)
+                    except ValueError:
+                        try:
+                            arguments[idx] = float(argument)
+                        except ValueError:
+                            pass
+                value = available_pipes[name](value, *arguments)
+            changed = value
+        else:
+            changed = changed.replace(variable, str(value))
+
+    if changed != to_change:
+        return changed
+    return None
+
+
+def replace_all(
+    to_change: Any, data: Dict[str, Any], replace: Callable
+) -> Any:
+    """
+    Replace the variables in all strings of a call.
+
+    Parameters
+    ----------
+    to_change : Any
+        The call or a value of it.
+    data : Dict[str, Any]
+        Data to use for the changes.
+    replace : Callable
+        Function replacing the variables in a string.
+
+    Returns
+    -------
+    Any
+        The changed value.
+    """
+    if isinstance(to_change, str):
+        changed = replace(to_change, data)
+        return to_change if changed is None else changed
+    if isinstance(to_change, dict):
+        return {
+            key: replace_all(value, data, replace)
+            for key, value in to_change.items()
+        }
+    if isinstance(to_change, list):
+        return [replace_all(value, data, replace) for value in to_change]
+    return to_change
+
+
+def create_calls(path: Path, steps: int) -> None:
+    """
+    Write a synthetic calls file with REST and ASSERT steps.
+
+    Parameters
+    ----------
+    path : Path
+        Path of the calls file.
+    steps : int
+        Number of steps.
+    """
+    calls: List[Dict[str, Any]] = []
+    for idx in range(steps):
+        if idx % 2:
+            calls.append(
+                {
+                    "type": "ASSERT",
+                    "call": {
+                        "value": "{{ RESULTS.values[%d] | int }}" % (idx % 10),
+                        "expected": "{{ EXPECTED | round:2 }}",
+                    },
+                }
+            )
+        else:
+            calls.append(
+                {
+                    "type": "REST",
+                    "call": {
+                        "base_url": "{{REST_BASE_URL}}",
+                        "path": "/api/items/{{ITEM.id}}/%d" % (idx % 100),
+                        "headers": {
+                            "Authorization": "Bearer {{TOKEN}}",
+                            "Accept": "application/json",
+                        },
+                        "body": {
+                            "type": "application/json",
+                            "data": {
+                                "name": "{{ITEM.name}}",
+                                "tags": ["{{TAGS[0]}}", "{{TAGS[-1]}}"],
+                                "count": 42,
+                            },
+                        },
+                    },
+                }
+            )
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(dump(calls))
+
+
+def run(
+    calls: List[Dict[str, Any]], data: Dict[str, Any], replace: Callable
+) -> float:
+    """
+    Substitute all calls twice and return the duration.
+
+    Parameters
+    ----------
+    calls : List[Dict[str, Any]]
+        The calls.
+    data : Dict[str, Any]
+        Data to use for the changes.
+    replace : Callable
+        Function replacing the variables in a string.
+
+    Returns
+    -------
+    float
+        The duration in seconds.
+    """
+    copies = [deepcopy(test["call"]) for test in calls]
+    start = perf_counter()
+    for call in copies:
+        call = replace_all(call, data, replace)
+        replace_all(call, data, replace)
+    return perf_counter() - start
+
+
+def main() -> None:
+    """
+    Run the benchmark.
+    """
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    data: Dict[str, Any] = {
+        "REST_BASE_URL": "http://localhost:8080",
+        "ITEM": {"id": 7, "name": "item"},
+        "TOKEN": "secret",
+        "TAGS": ["a", "b", "c"],
+        "RESULTS": {"values": [str(i) for i in range(10)]},
+        "EXPECTED": 1.2345,
+    }
+
+    with TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("calls.yaml")
+        create_calls(path, steps)
+        calls = load_config_yaml(path, True)
+
+    legacy = run(calls, data, legacy_replace_string_variables)
+    compile_template.cache_clear()
+    compiled = run(calls, data, replace_string_variables)
+
+    print(f"Steps:    {steps}")
+    print(f"Legacy:   {legacy * 1000:8.1f} ms")
+    print(f"Compiled: {compiled * 1000:8.1f} ms")
+    print(f"Speedup:  {legacy / compiled:8.2f}x")
+    print(f"Cache:    {compile_template.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
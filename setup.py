@@ -64,7 +64,22 @@ setup(
             "test-tool-ssh-cmd-plugin = test_tool_ssh_cmd_plugin.__main__:main",
             "test-tool-suite-plugin = test_tool_suite_plugin.__main__:main",
             "test-tool-timing-plugin = test_tool_timing_plugin.__main__:main",
-        ]
+        ],
+        "universal_test_tool.plugins": [
+            "ASSERT = test_tool_assert_plugin",
+            "COPY_FILES_SSH = test_tool_copy_files_ssh_plugin",
+            "JDBC_SQL = test_tool_jdbc_sql_plugin",
+            "PYTHON = test_tool_python_plugin",
+            "READ_JAR_MANIFEST = test_tool_read_jar_manifest_plugin",
+            "REST = test_tool_rest_plugin",
+            "RUN_PROCESS = test_tool_run_process_plugin",
+            "SECRET = test_tool_secret_plugin",
+            "SELENIUM = test_tool_selenium_plugin",
+            "SQL_PLUS = test_tool_sql_plus_plugin",
+            "SSH_CMD = test_tool_ssh_cmd_plugin",
+            "SUITE = test_tool_suite_plugin",
+            "TIMING = test_tool_timing_plugin",
+        ],
     },
     extras_require={"test": read_requirements("requirements-test.txt")},
 )
@@ -2,13 +2,21 @@
 This is the init file for the test_tool package.
 """
 
-from .import_plugin import CallType, import_plugin
+from .import_plugin import CallType, import_plugin, plugin_arguments
+from .resources import RunContext, acquire_resource, get_secret_digest
 from .substitute import recursively_replace_variables
-from .utils import DotDict
+from .trace import trace_span
+from .utils import DotDict, run_with_ssh_client
 
 __all__ = [
     "CallType",
     "DotDict",
+    "RunContext",
+    "acquire_resource",
+    "get_secret_digest",
     "import_plugin",
-    "recursively_replace_variables"
+    "plugin_arguments",
+    "recursively_replace_variables",
+    "run_with_ssh_client",
+    "trace_span",
 ]
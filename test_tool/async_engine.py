@@ -0,0 +1,289 @@
+"""
+This module contains the asyncio engine making the calls.
+
+Plugins can export make_<plugin>_call_async and augment_<plugin>_call_async
+coroutine functions beside the sync functions. They are awaited on one
+event loop, so the I/O of steps not depending on each other overlaps. The
+sync functions of the other plugins run on a bounded pool of threads.
+"""
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextvars import copy_context
+from functools import partial
+from heapq import heappop, heappush
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from test_tool import CallType, trace
+from test_tool.base import (
+    Call,
+    log_plugin_error,
+    prepare_call,
+    resubstitute_call,
+)
+from test_tool.checkpoint import CheckpointRecorder
+from test_tool.history import HistoryRecorder
+from test_tool.result_store import ResultStore
+from test_tool.instrumentation import (
+    StepRecord,
+    TimingRecorder,
+    create_step_record,
+    measure_phase,
+)
+from test_tool.scheduler import run_scheduled_async
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+
+async def invoke_plugin(
+    loaded: CallType,
+    augment: bool,
+    call: Dict[str, Any],
+    data: Dict[str, Any],
+    path: Path,
+    executor: Executor,
+) -> None:
+    """
+    Invoke the augmenting or making function of a plugin.
+
+    The coroutine function of the plugin is awaited, if there is one.
+    Otherwise the sync function runs on the executor.
+
+    Parameters
+    ----------
+    loaded : CallType
+        The loaded plugin.
+    augment : bool
+        Invoke the augmenting function, otherwise the making function.
+    call : Dict[str, Any]
+        The call.
+    data : Dict[str, Any]
+        Data to use for the call.
+    path : Path
+        Path to the project.
+    executor : Executor
+        The executor the sync functions run on.
+    """
+    if augment:
+        invoker_async = loaded["invoke_augment_call_async"]
+        invoker = loaded["invoke_augment_call"]
+    else:
+        invoker_async = loaded["invoke_make_call_async"]
+        invoker = loaded["invoke_make_call"]
+    if invoker_async is not None:
+        await invoker_async(call, data, path)
+        return
+    # The context holds the run and step the trace spans belong to
+    await asyncio.get_running_loop().run_in_executor(
+        executor, partial(copy_context().run, invoker, call, data, path)
+    )
+
+
+async def make_call_async(
+    idx: int,
+    test: Call,
+    data: Dict[str, Any],
+    path: Path,
+    loaded_call_types: Dict[str, CallType],
+    executor: Executor,
+    record: Optional[StepRecord] = None,
+    result_store: Optional[ResultStore] = None,
+) -> bool:
+    """
+    Make a single call on the event loop.
+
+    Parameters
+    ----------
+    idx : int
+        Index of the call in the calls config.
+    test : Call
+        The call from the config.
+    data : Dict[str, Any]
+        Data to use for the call.
+    path : Path
+        Path to the project.
+    loaded_call_types : Dict[str, CallType]
+        The already loaded plugins.
+    executor : Executor
+        The executor the sync functions of the plugins run on.
+    record : Optional[StepRecord], optional
+        Record the timing of the phases are added to, by default None.
+    result_store : Optional[ResultStore], optional
+        Store the results of cacheable calls are replayed from and stored
+        in, by default None.
+
+    Returns
+    -------
+    bool
+        True if an error occured, False otherwise.
+    """
+    if record is None:
+        record = create_step_record(idx, test)  # type: ignore
+
+    prepared = prepare_call(test, data, loaded_call_types, record)
+    if prepared is None:
+        return True
+    call, substituted = prepared
+    loaded = loaded_call_types[test["type"]]
+
+    # Call the augmenting function
+    with measure_phase(record, "augment"):
+        try:
+            test_tool_logger.info(
+                "Augment %s in %s plugin.", idx + 1, test["type"]
+            )
+            await invoke_plugin(loaded, True, call, data, path, executor)
+        except Exception as e:  # pylint: disable=broad-except
+            return log_plugin_error(test, e)
+
+    # Recursivly replace variables in values set by the augmenting function
+    if resubstitute_call(call, substituted, data, record):
+        return True
+
+    # Replay the result of an unchanged cacheable call
+    key: Optional[str] = None
+    if result_store is not None:
+        key = result_store.get_key(test["type"], loaded, call, path)
+        if key is not None and result_store.replay(key, data):
+            test_tool_logger.info(
+                "Replayed call %s in %s plugin.", idx + 1, test["type"]
+            )
+            return False
+
+    # Call the making function
+    with measure_phase(record, "make"):
+        try:
+            test_tool_logger.info(
+                "Make call %s in %s plugin.", idx + 1, test["type"]
+            )
+            await invoke_plugin(loaded, False, call, data, path, executor)
+        except Exception as e:  # pylint: disable=broad-except
+            return log_plugin_error(test, e)
+
+    if key is not None:
+        result_store.store(key, test["type"], call, data)  # type: ignore
+    return False
+
+
+async def make_all_calls_async(
+    calls: Iterable[Call],
+    data: Dict[str, Any],
+    path: Path,
+    continue_on_failure: bool,
+    jobs: int,
+    loaded_call_types: Dict[str, CallType],
+    recorder: TimingRecorder,
+    run: Tuple[int, str],
+    dependencies: Optional[List[Set[int]]] = None,
+    checkpoint_recorder: Optional[CheckpointRecorder] = None,
+    result_store: Optional[ResultStore] = None,
+    history_recorder: Optional[HistoryRecorder] = None,
+    priorities: Optional[List[float]] = None,
+) -> int:
+    """
+    Make all calls on one event loop.
+
+    Parameters
+    ----------
+    calls : Iterable[Call]
+        The calls, an iterator is consumed while the calls are made. Must
+        be a list if dependencies are given.
+    data : Dict[str, Any]
+        Data to use for the calls.
+    path : Path
+        Path to the project.
+    continue_on_failure : bool
+        Continue tests on error.
+    jobs : int
+        Number of calls running at the same time and of threads the sync
+        functions of the plugins run on.
+    loaded_call_types : Dict[str, CallType]
+        The already loaded plugins.
+    recorder : TimingRecorder
+        Recorder the timing of the steps is added to.
+    run : Tuple[int, str]
+        Id and name of the run in the trace.
+    dependencies : Optional[List[Set[int]]], optional
+        The indices of the calls every call depends on, by default None.
+        Without them the calls are made one by one.
+    checkpoint_recorder : Optional[CheckpointRecorder], optional
+        Recorder the data is checkpointed by after every step, by default
+        None.
+    result_store : Optional[ResultStore], optional
+        Store the results of cacheable calls are replayed from and stored
+        in, by default None.
+    history_recorder : Optional[HistoryRecorder], optional
+        Recorder the steps are appended to the history of the runs by, by
+        default None.
+    priorities : Optional[List[float]], optional
+        The priority of every call, by default the ready calls are started
+        in the order of the calls config.
+
+    Returns
+    -------
+    int
+        Number of errors.
+    """
+    executor = ThreadPoolExecutor(
+        max_workers=jobs, thread_name_prefix="test-tool"
+    )
+    # Steps running at the same time are shown on their own tracks
+    lanes: List[int] = list(range(1, jobs + 1))
+
+    async def run_step(idx: int, test: Call) -> bool:
+        record = create_step_record(idx, test)  # type: ignore
+        name = f"{record['type']} line {record['line']}"
+        lane = heappop(lanes)
+        # Every task has its own context, no need to reset
+        trace.current_run.set(run)
+        trace.current_step.set(name)
+        trace.current_lane.set(lane)
+        try:
+            with trace.trace_span(name, "step", step=record["step"]):
+                record["error"] = await make_call_async(
+                    idx,
+                    test,
+                    data,
+                    path,
+                    loaded_call_types,
+                    executor,
+                    record,
+                    result_store,
+                )
+        finally:
+            heappush(lanes, lane)
+        recorder.add(record)
+        if checkpoint_recorder is not None:
+            checkpoint_recorder.add(record, data)
+        if history_recorder is not None:
+            history_recorder.add(record)
+        return record["error"]
+
+    try:
+        if dependencies is not None:
+            steps: List[Call] = list(calls)
+            return await run_scheduled_async(
+                dependencies,
+                lambda idx: run_step(idx, steps[idx]),
+                continue_on_failure,
+                jobs,
+                priorities,
+            )
+
+        errors: int = 0
+        # Make the calls and check the response
+        for idx, test in enumerate(calls):
+            # Stopping on first error
+            if errors > 0 and not continue_on_failure:
+                test_tool_logger.error("Stopping on first error")
+                break
+
+            # Every step is a task of its own, with its own context
+            if await asyncio.ensure_future(run_step(idx, test)):
+                errors += 1
+
+        return errors
+    finally:
+        executor.shutdown()
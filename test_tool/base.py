@@ -4,17 +4,99 @@ test_tool base module.
 This is the principal module of the test_tool project.
 """
 import sys
-from copy import deepcopy
+from cProfile import Profile
 from datetime import datetime
-from inspect import getfullargspec
+from itertools import islice
+from os import fstat
 from logging import DEBUG, INFO, FileHandler, Formatter, getLogger
 from pathlib import Path
 from traceback import print_exception
-from typing import Any, Dict, List, TypedDict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypedDict,
+)
 
-from yaml import YAMLError, safe_load
+from yaml import (
+    SequenceEndEvent,
+    SequenceNode,
+    SequenceStartEvent,
+    StreamEndEvent,
+    YAMLError,
+)
+from yaml.composer import Composer
+from yaml.constructor import SafeConstructor
+from yaml.resolver import Resolver
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+    from yaml.cyaml import CParser  # type: ignore
+
+    class StreamingLoader(CParser, Composer, SafeConstructor, Resolver):
+        """
+        Loader composing the nodes from the events of libyaml one by one.
+        """
+
+        def __init__(self, stream: Any) -> None:
+            CParser.__init__(self, stream)
+            Composer.__init__(self)
+            SafeConstructor.__init__(self)
+            Resolver.__init__(self)
+
+except ImportError:  # pragma: no cover
+    # PyYAML was built without libyaml
+    from yaml import SafeLoader  # type: ignore
+
+    StreamingLoader = SafeLoader  # type: ignore
 
 from test_tool import recursively_replace_variables, import_plugin, CallType
+from test_tool import trace
+from test_tool.checkpoint import (
+    CheckpointRecorder,
+    load_checkpoint,
+    restore_data,
+)
+from test_tool.config_cache import load_cached_config, store_cached_config
+from test_tool.history import HistoryRecorder, get_history_path
+from test_tool.import_plugin import is_plugin_available
+from test_tool.registry import reload_plugin_index
+from test_tool.instrumentation import (
+    StepRecord,
+    TimingRecorder,
+    create_step_record,
+    measure_phase,
+)
+from test_tool.resources import current_context, run_context, setup_plugin
+from test_tool.result_store import ResultStore, open_result_store
+from test_tool.shard import (
+    load_step_durations,
+    parse_shard,
+    split_calls,
+    write_shard_info,
+)
+from test_tool.substitute import find_referenced_keys, find_variables
+from test_tool.utils import CopyOnWriteDict
+from test_tool.scheduler import (
+    build_dependencies,
+    get_step_priorities,
+    get_written_keys,
+    run_scheduled,
+)
+
+if TYPE_CHECKING:
+    # Only imported by runs profiling, tracing the memory or preparing the
+    # calls ahead, as pstats and tracemalloc are slow to import and the
+    # pipeline imports this module
+    from test_tool.memory import MemoryRecorder
+    from test_tool.pipeline import CallPipeline, PreparedCall
+    from test_tool.profiling import ProfileRecorder
 
 # Get the logger
 test_tool_logger = getLogger("test-tool")
@@ -30,25 +112,569 @@ class Call(TypedDict):
     line: int
 
 
-def make_all_calls(
+def load_call_type(test: Call, loaded_call_types: Dict[str, CallType]) -> bool:
+    """
+    Make sure the plugin for the type of a call is loaded.
+
+    Parameters
+    ----------
+    test : Call
+        The call from the config.
+    loaded_call_types : Dict[str, CallType]
+        The already loaded plugins.
+
+    Returns
+    -------
+    bool
+        True if the plugin is available, False otherwise.
+    """
+    if "type" not in test:
+        test_tool_logger.error(
+            "No type specified for test from line %s using assert plugin",
+            test["line"],
+        )
+        test["type"] = "ASSERT"
+
+    if not test["type"] in loaded_call_types:
+        test_tool_logger.debug("Loading plugin for call type %s", test["type"])
+        if not import_plugin(test["type"], loaded_call_types):
+            test_tool_logger.error("%s call is not supported", test["type"])
+            return False
+
+    # Set up the plugin for the run, before its first call
+    try:
+        setup_plugin(test["type"], loaded_call_types[test["type"]])
+    except Exception as e:  # pylint: disable=broad-except
+        test_tool_logger.error(
+            "Could not set up %s plugin: %s", test["type"], e
+        )
+        return False
+
+    return True
+
+
+def check_call_types(calls: List[Call]) -> bool:
+    """
+    Check that there is a plugin for every call type, before any call is
+    made.
+
+    Parameters
+    ----------
+    calls : List[Call]
+        The calls from the config.
+
+    Returns
+    -------
+    bool
+        True if all plugins are available, False otherwise.
+    """
+    lines: Dict[str, List[int]] = {}
+    for test in calls:
+        lines.setdefault(test.get("type", "ASSERT"), []).append(test["line"])
+
+    available = True
+    for call_type, type_lines in lines.items():
+        if not is_plugin_available(call_type):
+            test_tool_logger.error(
+                "%s call from line %s is not supported, no plugin found",
+                call_type,
+                ", ".join(str(line) for line in type_lines),
+            )
+            available = False
+    return available
+
+
+def log_plugin_error(test: Call, e: Exception) -> bool:
+    """
+    Log an error raised by the augmenting or making function of a plugin.
+
+    Parameters
+    ----------
+    test : Call
+        The call from the config.
+    e : Exception
+        The error raised by the plugin.
+
+    Returns
+    -------
+    bool
+        Always True, as an error occured.
+    """
+    if isinstance(e, AssertionError):
+        test_tool_logger.error(
+            "Assertion error for test from line %s: %s",
+            test["line"],
+            e,
+        )
+        return True
+    test_tool_logger.error(
+        'Exception "%s" occured for test from line %s '
+        + "(This might be a problem with the plugin or config).",
+        e,
+        test["line"],
+    )
+    # if debug is enabled print the exception
+    if test_tool_logger.getEffectiveLevel() == DEBUG:
+        print_exception(type(e), e, e.__traceback__)
+    return True
+
+
+def prepare_call(
+    test: Call,
+    data: Dict[str, Any],
+    loaded_call_types: Dict[str, CallType],
+    record: StepRecord,
+) -> Optional[Tuple[CopyOnWriteDict, Dict[str, Any]]]:
+    """
+    Load the plugin of a call and substitute the variables of the call.
+
+    Parameters
+    ----------
+    test : Call
+        The call from the config.
+    data : Dict[str, Any]
+        Data to use for the call.
+    loaded_call_types : Dict[str, CallType]
+        The already loaded plugins.
+    record : StepRecord
+        Record the timing of the phases are added to.
+
+    Returns
+    -------
+    Optional[Tuple[CopyOnWriteDict, Dict[str, Any]]]
+        The call and its values after the substitution, None if an error
+        occured.
+    """
+    # Make sure the plugin is loaded
+    with measure_phase(record, "load"):
+        if not load_call_type(test, loaded_call_types):
+            return None
+
+    # Layer the call from the config over the default call, dicts and lists
+    # within are only copied when they are accessed
+    with measure_phase(record, "merge"):
+        default_call = loaded_call_types[test["type"]]["default_call"]
+        variables: Dict[str, Any] = dict(
+            loaded_call_types[test["type"]][  # type: ignore
+                "default_variables"
+            ]
+            or {}
+        )
+        try:
+            call = CopyOnWriteDict({**default_call, **test["call"]})
+            # Only the strings containing variables are substituted
+            for key in test["call"]:
+                variables.pop(key, None)
+            variables.update(
+                find_variables(test["call"]) or {}  # type: ignore
+            )
+        except KeyError:
+            call = CopyOnWriteDict(default_call)
+
+    # Recursivly replace variables in call with data
+    with measure_phase(record, "substitute"):
+        try:
+            if variables:
+                recursively_replace_variables(call, data, variables)
+        except (KeyError, ValueError) as e:
+            # if debug is enabled print the exception
+            if test_tool_logger.getEffectiveLevel() == DEBUG:
+                print_exception(type(e), e, e.__traceback__)
+            return None
+
+        # Keep track of the values, to find the ones set by the augmenting
+        substituted: Dict[str, Any] = dict(call)
+
+    return call, substituted
+
+
+def resubstitute_call(
+    call: CopyOnWriteDict,
+    substituted: Dict[str, Any],
+    data: Dict[str, Any],
+    record: StepRecord,
+) -> bool:
+    """
+    Substitute the variables in the values set by the augmenting function.
+
+    Parameters
+    ----------
+    call : CopyOnWriteDict
+        The augmented call.
+    substituted : Dict[str, Any]
+        The values of the call before the augmenting.
+    data : Dict[str, Any]
+        Data to use for the call.
+    record : StepRecord
+        Record the timing of the phases are added to.
+
+    Returns
+    -------
+    bool
+        True if an error occured, False otherwise.
+    """
+    with measure_phase(record, "resubstitute"):
+        variables: Dict[str, Any] = {}
+        for key, value in dict.items(call):
+            if key not in substituted or value is not substituted[key]:
+                found = find_variables(value)
+                if found is not None:
+                    variables[key] = found
+        try:
+            if variables:
+                recursively_replace_variables(call, data, variables)
+        except (KeyError, ValueError) as e:
+            # if debug is enabled print the exception
+            if test_tool_logger.getEffectiveLevel() == DEBUG:
+                print_exception(type(e), e, e.__traceback__)
+            return True
+    return False
+
+
+def make_call(
+    idx: int,
+    test: Call,
+    data: Dict[str, Any],
+    path: Path,
+    loaded_call_types: Dict[str, CallType],
+    record: Optional[StepRecord] = None,
+    profiler: Optional[Profile] = None,
+    result_store: Optional[ResultStore] = None,
+    augmented: Optional[Tuple[CopyOnWriteDict, Dict[str, Any]]] = None,
+) -> bool:
+    """
+    Make a single call.
+
+    Parameters
+    ----------
+    idx : int
+        Index of the call in the calls config.
+    test : Call
+        The call from the config.
+    data : Dict[str, Any]
+        Data to use for the call.
+    path : Path
+        Path to the project.
+    loaded_call_types : Dict[str, CallType]
+        The already loaded plugins.
+    record : Optional[StepRecord], optional
+        Record the timing of the phases are added to, by default None.
+    profiler : Optional[Profile], optional
+        Profiler enabled during the augment and make phase, by default
+        None.
+    result_store : Optional[ResultStore], optional
+        Store the results of cacheable calls are replayed from and stored
+        in, by default None.
+    augmented : Optional[Tuple[CopyOnWriteDict, Dict[str, Any]]], optional
+        The call substituted and augmented ahead and its values before the
+        augmenting, by default the call is prepared and augmented here.
+
+    Returns
+    -------
+    bool
+        True if an error occured, False otherwise.
+    """
+    if record is None:
+        record = create_step_record(idx, test)  # type: ignore
+
+    if augmented is not None:
+        call, substituted = augmented
+    else:
+        prepared = prepare_call(test, data, loaded_call_types, record)
+        if prepared is None:
+            return True
+        call, substituted = prepared
+
+        # Call the augmenting function
+        with measure_phase(record, "augment"):
+            try:
+                test_tool_logger.info(
+                    "Augment %s in %s plugin.", idx + 1, test["type"]
+                )
+                # Augment the call with the data from the config
+                invoker = loaded_call_types[test["type"]][
+                    "invoke_augment_call"
+                ]
+                if profiler is None:
+                    invoker(call, data, path)
+                else:
+                    profiler.runcall(invoker, call, data, path)
+            except Exception as e:  # pylint: disable=broad-except
+                return log_plugin_error(test, e)
+
+    # Recursivly replace variables in values set by the augmenting function
+    if resubstitute_call(call, substituted, data, record):
+        return True
+
+    # Replay the result of an unchanged cacheable call
+    key: Optional[str] = None
+    if result_store is not None:
+        key = result_store.get_key(
+            test["type"], loaded_call_types[test["type"]], call, path
+        )
+        if key is not None and result_store.replay(key, data):
+            test_tool_logger.info(
+                "Replayed call %s in %s plugin.", idx + 1, test["type"]
+            )
+            return False
+
+    # Call the augmenting funktion
+    with measure_phase(record, "make"):
+        try:
+            test_tool_logger.info(
+                "Make call %s in %s plugin.", idx + 1, test["type"]
+            )
+            # Make the call
+            invoker = loaded_call_types[test["type"]]["invoke_make_call"]
+            if profiler is None:
+                invoker(call, data, path)
+            else:
+                profiler.runcall(invoker, call, data, path)
+        except Exception as e:  # pylint: disable=broad-except
+            return log_plugin_error(test, e)
+
+    if key is not None:
+        result_store.store(key, test["type"], call, data)  # type: ignore
+    return False
+
+
+def check_call(
+    idx: int,
+    test: Call,
+    data: Dict[str, Any],
+    path: Path,
+    loaded_call_types: Dict[str, CallType],
+) -> bool:
+    """
+    Check a call by loading its plugin and augmenting it, without making
+    it.
+
+    Parameters
+    ----------
+    idx : int
+        Index of the call in the calls config.
+    test : Call
+        The call from the config.
+    data : Dict[str, Any]
+        Data to use for the call, the augmenting function may change it.
+    path : Path
+        Path to the project.
+    loaded_call_types : Dict[str, CallType]
+        The already loaded plugins.
+
+    Returns
+    -------
+    bool
+        True if an error occured, False otherwise.
+    """
+    record = create_step_record(idx, test)  # type: ignore
+    prepared = prepare_call(test, data, loaded_call_types, record)
+    if prepared is None:
+        test_tool_logger.error(
+            "Variables of the call from line %s can not be substituted",
+            test["line"],
+        )
+        return True
+    call, substituted = prepared
+
+    try:
+        loaded = loaded_call_types[test["type"]]
+        invoker = loaded["invoke_augment_call_async"]
+        if invoker is None:
+            loaded["invoke_augment_call"](call, data, path)
+        else:
+            # Only plugins with coroutine functions need asyncio
+            import asyncio
+
+            asyncio.run(invoker(call, data, path))
+    except Exception as e:  # pylint: disable=broad-except
+        return log_plugin_error(test, e)
+
+    return resubstitute_call(call, substituted, data, record)
+
+
+def check_all_calls(
+    calls: Iterable[Call], data: Dict[str, Any], path: Path
+) -> int:
+    """
+    Check all calls before the first call is made.
+
+    The plugins are loaded, the calls are merged with the default calls,
+    substituted and augmented, the data is not changed. A call using keys
+    which a call before writes into the data is deferred, it is only
+    checked when it is made.
+
+    Parameters
+    ----------
+    calls : Iterable[Call]
+        The calls.
+    data : Dict[str, Any]
+        Data to use for the calls.
+    path : Path
+        Path to the project.
+
+    Returns
+    -------
+    int
+        Number of errors.
+    """
+    loaded_call_types: Dict[str, CallType] = dict()
+    # The augmenting functions may add to the data, like in a run
+    check_data = CopyOnWriteDict(data)
+    # Keys written by the calls before and if one of them writes unknown
+    # keys, like the calls the scheduler treats as barriers
+    written: Set[str] = set()
+    unknown_writes = False
+    checked = deferred = errors = 0
+    for idx, test in enumerate(calls):
+        checked += 1
+        if not load_call_type(test, loaded_call_types):
+            errors += 1
+            continue
+
+        merged = {
+            **loaded_call_types[test["type"]]["default_call"],
+            **(test.get("call") or {}),
+        }
+        referenced = find_referenced_keys(merged)
+        runtime_keys = referenced.intersection(written)
+        if unknown_writes:
+            runtime_keys.update(key for key in referenced if key not in data)
+        if runtime_keys:
+            test_tool_logger.info(
+                "Call from line %s uses %s set by the calls before, it is "
+                + "checked when it is made",
+                test["line"],
+                ", ".join(sorted(runtime_keys)),
+            )
+            deferred += 1
+        elif check_call(idx, test, check_data, path, loaded_call_types):
+            errors += 1
+
+        keys = get_written_keys(test["type"], merged)
+        if keys is None:
+            unknown_writes = True
+        else:
+            written.update(keys)
+
+    test_tool_logger.info(
+        "Checked %s calls, %s deferred, %s errors", checked, deferred, errors
+    )
+    return errors
+
+
+def estimate_call_durations(
     calls: List[Call],
+    loaded_call_types: Dict[str, CallType],
+    path: Path,
+    durations: Optional[Dict[int, float]] = None,
+) -> List[Optional[float]]:
+    """
+    Estimate the duration of every call.
+
+    The duration of a call in the history of the runs is used before the
+    estimate of its plugin, which gets the call merged with the default
+    call, before its variables are substituted.
+
+    Parameters
+    ----------
+    calls : List[Call]
+        The calls.
+    loaded_call_types : Dict[str, CallType]
+        The already loaded plugins.
+    path : Path
+        Path to the project.
+    durations : Optional[Dict[int, float]], optional
+        The duration of the step from every line in the history, by
+        default None.
+
+    Returns
+    -------
+    List[Optional[float]]
+        The duration of every call in seconds, None if it is not known.
+    """
+    durations = durations or {}
+    estimates: List[Optional[float]] = []
+    for test in calls:
+        estimate: Optional[float] = durations.get(test.get("line", 0))
+        loaded = loaded_call_types.get(test.get("type", "ASSERT"))
+        invoker = loaded["invoke_estimate_call"] if loaded else None
+        if estimate is None and invoker is not None:
+            # The estimate must not change the default call or the config
+            call = CopyOnWriteDict(
+                {
+                    **loaded["default_call"],  # type: ignore
+                    **(test.get("call") or {}),
+                }
+            )
+            try:
+                value = invoker(call, {}, path)
+                if value is not None:
+                    estimate = float(value)
+            except Exception as e:  # pylint: disable=broad-except
+                test_tool_logger.debug(
+                    "Could not estimate the call from line %s: %s",
+                    test.get("line"),
+                    e,
+                )
+        estimates.append(estimate)
+    return estimates
+
+
+def make_all_calls(
+    calls: Iterable[Call],
     data: Dict[str, Any],
-    path: Path,  # pylint: disable=unused-argument
+    path: Path,
     continue_on_failure: bool,
+    jobs: int = 1,
+    output_path: Optional[Path] = None,
+    profile: bool = False,
+    memory: bool = False,
+    async_engine: bool = False,
+    start: int = 0,
+    incremental: bool = False,
+    history_recorder: Optional[HistoryRecorder] = None,
+    pipeline: int = 0,
 ) -> int:
     """
     Make all calls.
 
     Parameters
     ----------
-    calls : List[Call]
-        List of calls.
+    calls : Iterable[Call]
+        The calls, an iterator is consumed while the calls are made.
     data : Dict[str, Any]
         Data to use for the calls.
     path : Path
         Path to the project.
     continue_on_failure : bool
         Continue tests on error.
+    jobs : int, optional
+        Number of calls to run in parallel, by default 1. With more than
+        one job the calls are scheduled by their dependencies.
+    output_path : Optional[Path], optional
+        Folder the timing of the steps is written to, by default None.
+    profile : bool, optional
+        Profile the augment and make phase of every step and write the
+        profiles to the output folder, by default False.
+    memory : bool, optional
+        Trace the memory used by every step and write the records to the
+        output folder, by default False.
+    async_engine : bool, optional
+        Make the calls on an event loop, awaiting the coroutine functions
+        of the plugins, by default False.
+    start : int, optional
+        Number of calls of the calls file made by the resumed run before,
+        by default 0.
+    incremental : bool, optional
+        Replay the results of unchanged cacheable calls from the result
+        store, instead of making them, by default False.
+    history_recorder : Optional[HistoryRecorder], optional
+        Recorder the steps are appended to the history of the runs by, by
+        default None.
+    pipeline : int, optional
+        Number of the next calls prepared while a call is made one by one,
+        by default 0.
 
     Returns
     -------
@@ -58,147 +684,249 @@ def make_all_calls(
     errors: int = 0
     # Loaded Plugins
     loaded_call_types: Dict[str, CallType] = dict()
+    # Timing of the phases of all steps
+    recorder = TimingRecorder(output_path)
+    # Profiles of all steps
+    profile_recorder: Optional["ProfileRecorder"] = None
+    if profile and output_path is None:
+        test_tool_logger.warning("Profiling needs an output folder")
+    elif profile:
+        from test_tool import profiling
 
-    # Make the calls and check the response
-    for idx, test in enumerate(calls):
-        # Stopping on first error
-        if errors > 0 and not continue_on_failure:
-            test_tool_logger.error("Stopping on first error")
-            break
+        profile_recorder = profiling.ProfileRecorder(
+            output_path  # type: ignore
+        )
+        if jobs > 1:
+            # Only one profiler can be active at a time
+            test_tool_logger.warning("Profiling runs the calls one by one")
+            jobs = 1
+    # Memory used by all steps
+    memory_recorder: Optional["MemoryRecorder"] = None
+    if memory:
+        from test_tool import memory as memory_module
 
-        if "type" not in test:
-            test_tool_logger.error(
-                "No type specified for test from line %s using assert plugin",
-                test["line"],
+        memory_recorder = memory_module.MemoryRecorder(output_path)
+        if jobs > 1:
+            # The traced memory is shared by all threads
+            test_tool_logger.warning(
+                "Tracing the memory runs the calls one by one"
             )
-            test["type"] = "ASSERT"
+            jobs = 1
+    if async_engine and (
+        profile_recorder is not None or memory_recorder is not None
+    ):
+        # Both measure the thread, steps on an event loop share it
+        test_tool_logger.warning(
+            "Profiling and tracing the memory use the sync engine"
+        )
+        async_engine = False
 
-        # Atomic error handling
-        error = False
+    # Checkpoints of the data to resume the run at the first failed call
+    checkpoint_recorder: Optional[CheckpointRecorder] = None
+    if output_path is not None and jobs > 1:
+        # Calls made at the same time change the data while it is written
+        test_tool_logger.debug("No checkpoints are written for parallel jobs")
+    elif output_path is not None:
+        checkpoint_recorder = CheckpointRecorder(output_path, data, start)
 
-        # Make sure the plugin is loaded
-        if not error:
-            if not test["type"] in loaded_call_types:
-                test_tool_logger.debug(
-                    "Loading plugin for call type %s", test["type"]
+    # Results of the cacheable calls
+    result_store: Optional[ResultStore] = None
+    if incremental:
+        result_store = open_result_store()
+
+    if async_engine:
+        # Only needed for async runs, asyncio is slow to import and the
+        # engine imports this module
+        import asyncio
+
+        from test_tool.async_engine import make_all_calls_async
+
+    # Tracks of the calls in the trace, nested runs get their own
+    run = trace.start_run(path.name)
+    # Resources of the run, the workers of parallel jobs use them as well
+    context = current_context.get()
+    # Calls prepared ahead, while a call is made
+    call_pipeline: Optional["CallPipeline"] = None
+    if pipeline > 0 and (jobs > 1 or async_engine):
+        test_tool_logger.warning(
+            "Only calls made one by one on threads are prepared ahead"
+        )
+    elif pipeline > 0 and (
+        profile_recorder is not None or memory_recorder is not None
+    ):
+        # Both would measure the calls prepared in the meantime
+        test_tool_logger.warning(
+            "Profiling and tracing the memory prepare the calls one by one"
+        )
+    elif pipeline > 0:
+        from test_tool import pipeline as pipeline_module
+
+        call_pipeline = pipeline_module.CallPipeline(
+            calls, data, path, loaded_call_types, pipeline, run
+        )
+
+    def run_step(
+        idx: int, test: Call, prepared: Optional["PreparedCall"] = None
+    ) -> bool:
+        record = (
+            prepared["record"]
+            if prepared is not None
+            else create_step_record(idx, test)  # type: ignore
+        )
+        profiler = Profile() if profile_recorder is not None else None
+        if memory_recorder is not None:
+            before = memory_recorder.start()
+        name = f"{record['type']} line {record['line']}"
+        run_token = trace.current_run.set(run)
+        step_token = trace.current_step.set(name)
+        context_token = current_context.set(context)
+        try:
+            with trace.trace_span(name, "step", step=record["step"]):
+                record["error"] = make_call(
+                    idx,
+                    test,
+                    data,
+                    path,
+                    loaded_call_types,
+                    record,
+                    profiler,
+                    result_store,
+                    (
+                        (prepared["call"], prepared["substituted"])
+                        if prepared is not None
+                        else None
+                    ),
                 )
-                if not import_plugin(test["type"], loaded_call_types):
-                    test_tool_logger.error(
-                        "%s call is not supported", test["type"]
-                    )
-                    errors += 1
-                    error = True
+        finally:
+            current_context.reset(context_token)
+            trace.current_step.reset(step_token)
+            trace.current_run.reset(run_token)
+        recorder.add(record)
+        if profile_recorder is not None:
+            profile_recorder.add(record, profiler)  # type: ignore
+        if memory_recorder is not None:
+            memory_recorder.add(record, data, before)  # type: ignore
+        if checkpoint_recorder is not None:
+            checkpoint_recorder.add(record, data)
+        if history_recorder is not None:
+            history_recorder.add(record)
+        return record["error"]
 
-        # Merge the default call with the call from the config
-        if not error:
-            default_call = deepcopy(
-                loaded_call_types[test["type"]]["default_call"]
-            )
-            try:
-                call = {**default_call, **test["call"]}
-            except KeyError:
-                call = default_call
+    try:
+        if jobs > 1:
+            # The dependencies can only be found with all calls
+            calls = list(calls)
 
-        # Recursivly replace variables in call with data
-        if not error:
-            try:
-                recursively_replace_variables(call, data)
-            except (KeyError, ValueError) as e:
-                # if debug is enabled print the exception
-                if test_tool_logger.getEffectiveLevel() == DEBUG:
-                    print_exception(type(e), e, e.__traceback__)
-                errors += 1
-                error = True
+            # Load all plugins upfront, the default calls are needed to find
+            # the variables a call depends on
+            for call_type in {test.get("type", "ASSERT") for test in calls}:
+                import_plugin(call_type, loaded_call_types)
 
-        # Call the augmenting function
-        if not error:
             try:
-                test_tool_logger.info(
-                    "Augment %s in %s plugin.", idx + 1, test["type"]
+                dependencies = build_dependencies(
+                    calls,  # type: ignore
+                    {
+                        call_type: loaded["default_call"]
+                        for call_type, loaded in loaded_call_types.items()
+                    },
                 )
-                # Augment the call with the data from the config
-                args: List[str] = getfullargspec(
-                    loaded_call_types[test["type"]]["augment_call"]
-                )[0]
-                call_args: Dict[str, Any] = {}
-                allowed_args: List[str] = ["call", "data", "path"]
-                for arg in args:
-                    if arg in allowed_args:
-                        call_args[arg] = locals()[arg]
-                loaded_call_types[test["type"]]["augment_call"](**call_args)
-            except AssertionError as e:
-                test_tool_logger.error(
-                    "Assertion error for test from line %s: %s",
-                    test["line"],
-                    e,
+            except ValueError as e:
+                test_tool_logger.error(e)
+                return 1
+
+            # Start the calls ready at the same time longest first
+            priorities = get_step_priorities(
+                dependencies,
+                estimate_call_durations(
+                    calls,  # type: ignore
+                    loaded_call_types,
+                    path,
+                    history_recorder.durations if history_recorder else None,
+                ),
+            )
+            if priorities is not None:
+                test_tool_logger.debug(
+                    "Ordering the calls by their expected duration"
                 )
-                errors += 1
-                error = True
-            except Exception as e:  # pylint: disable=broad-except
-                test_tool_logger.error(
-                    'Exception "%s" occured for test from line %s '
-                    + "(This might be a problem with the plugin or config).",
-                    e,
-                    test["line"],
+
+            if async_engine:
+                return asyncio.run(
+                    make_all_calls_async(
+                        calls,
+                        data,
+                        path,
+                        continue_on_failure,
+                        jobs,
+                        loaded_call_types,
+                        recorder,
+                        run,
+                        dependencies,
+                        result_store=result_store,
+                        history_recorder=history_recorder,
+                        priorities=priorities,
+                    )
                 )
-                # if debug is enabled print the exception
-                if test_tool_logger.getEffectiveLevel() == DEBUG:
-                    print_exception(type(e), e, e.__traceback__)
-                errors += 1
-                error = True
 
-        # Recursivly replace variables in call with data
-        if not error:
-            try:
-                recursively_replace_variables(call, data)
-            except (KeyError, ValueError) as e:
-                # if debug is enabled print the exception
-                if test_tool_logger.getEffectiveLevel() == DEBUG:
-                    print_exception(type(e), e, e.__traceback__)
-                errors += 1
-                error = True
+            return run_scheduled(
+                dependencies,
+                lambda idx: run_step(idx, calls[idx]),  # type: ignore
+                continue_on_failure,
+                jobs,
+                priorities,
+            )
 
-        # Call the augmenting funktion
-        if not error:
-            try:
-                test_tool_logger.info(
-                    "Make call %s in %s plugin.", idx + 1, test["type"]
+        if async_engine:
+            return asyncio.run(
+                make_all_calls_async(
+                    calls,
+                    data,
+                    path,
+                    continue_on_failure,
+                    jobs,
+                    loaded_call_types,
+                    recorder,
+                    run,
+                    checkpoint_recorder=checkpoint_recorder,
+                    result_store=result_store,
+                    history_recorder=history_recorder,
                 )
-                # Make the call
-                args = getfullargspec(
-                    loaded_call_types[test["type"]]["make_call"]
-                )[0]
-                call_args = {}
-                allowed_args = ["call", "data"]
-                for arg in args:
-                    if arg in allowed_args:
-                        call_args[arg] = locals()[arg]
-                loaded_call_types[test["type"]]["make_call"](**call_args)
-            except AssertionError as e:
-                test_tool_logger.error(
-                    "Assertion error for test from line %s: %s",
-                    test["line"],
-                    e,
-                )
-                errors += 1
-                error = True
-            except Exception as e:  # pylint: disable=broad-except
-                test_tool_logger.error(
-                    'Exception "%s" occured for test from line %s '
-                    + "(This might be a problem with the plugin or config).",
-                    e,
-                    test["line"],
-                )
-                # if debug is enabled print the exception
-                if test_tool_logger.getEffectiveLevel() == DEBUG:
-                    print_exception(type(e), e, e.__traceback__)
+            )
+
+        steps: Iterable[Tuple[int, Call, Optional["PreparedCall"]]] = (
+            call_pipeline
+            if call_pipeline is not None
+            else ((idx, test, None) for idx, test in enumerate(calls))
+        )
+
+        # Make the calls and check the response
+        for idx, test, prepared in steps:
+            # Stopping on first error
+            if errors > 0 and not continue_on_failure:
+                test_tool_logger.error("Stopping on first error")
+                break
+
+            if run_step(idx, test, prepared):
                 errors += 1
-                error = True
 
-    return errors
+        return errors
+    finally:
+        if call_pipeline is not None:
+            call_pipeline.close()
+        recorder.close()
+        if profile_recorder is not None:
+            profile_recorder.close()
+        if memory_recorder is not None:
+            memory_recorder.close()
+        if result_store is not None:
+            result_store.close()
+        if recorder.steps:
+            for line in recorder.summary():
+                test_tool_logger.info(line)
 
 
-def load_config_yaml(path: Path, add_line_numbers: bool = False) -> Any:
+def load_config_yaml(
+    path: Path, add_line_numbers: bool = False, cache: bool = True
+) -> Any:
     """
     Load a yaml config file.
 
@@ -209,47 +937,141 @@ def load_config_yaml(path: Path, add_line_numbers: bool = False) -> Any:
     add_line_numbers : bool, optional
         Add line numbers to the loaded data,
         if the data is a list, by default False
+    cache : bool, optional
+        Reuse and store the parsed file in the config cache, by default True
 
     Returns
     -------
     Dict[str, Any]
         The loaded config.
     """
-    with open(path, "r", encoding="utf-8") as file:
+    with open(path, "rb") as file:
+        status = fstat(file.fileno())
         content = file.read()
 
+    # Reuse the config parsed by a former run, if the file is unchanged
+    variant = "lines" if add_line_numbers else "plain"
+    data: Any
+    if cache:
+        cached, data = load_cached_config(path, status, content, variant)
+        if cached:
+            return data
+
+    # Uses libyaml if available, the nodes keep the position of the values
+    loader = SafeLoader(content.decode("utf-8"))
     try:
-        data = safe_load(content)
+        node = loader.get_single_node()
+        data = None if node is None else loader.construct_document(node)
     except YAMLError as e:
         test_tool_logger.error(e)
         sys.exit(1)
+    finally:
+        loader.dispose()
 
-    if add_line_numbers and isinstance(data, list):
-        line_numbers = []
-        # Every call starts with "- call: or - type:"
-        intendation = 0
-        for idx, line in enumerate(content.split("\n")):
-            if "- call:" in line or "- type:" in line:
-                # Count characters before "- call:"
-                if idx > 0 and len(line) - len(line.lstrip()) == intendation:
-                    line_numbers.append(idx + 1)
-                elif idx == 0:
-                    intendation = len(line) - len(line.lstrip())
-                    line_numbers.append(idx + 1)
-
-        for idx, element in enumerate(data):
+    if add_line_numbers and isinstance(node, SequenceNode):
+        # Take the line numbers from the nodes of the calls
+        for element, element_node in zip(data, node.value):
             if isinstance(element, dict):
-                element["line"] = line_numbers[idx]
+                element["line"] = element_node.start_mark.line + 1
 
+    if cache:
+        store_cached_config(path, status, content, variant, data)
     return data
 
 
+def iter_config_yaml(path: Path) -> Iterator[Call]:
+    """
+    Load the calls from a yaml config file one by one.
+
+    Every document of the file is either a call or a list of calls. A
+    call is loaded when it is requested, so it can be released after it
+    was made.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the file.
+
+    Yields
+    ------
+    Call
+        The next call, with the line number it starts at.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        loader = StreamingLoader(file)
+        try:
+            # Stream start
+            loader.get_event()
+            while not loader.check_event(StreamEndEvent):
+                # Document start
+                loader.get_event()
+                if loader.check_event(SequenceStartEvent):
+                    loader.get_event()
+                    while not loader.check_event(SequenceEndEvent):
+                        yield from construct_call(loader)
+                    loader.get_event()
+                else:
+                    yield from construct_call(loader)
+                # Document end, anchors are only valid within a document
+                loader.get_event()
+                loader.anchors = {}
+        except YAMLError as e:
+            test_tool_logger.error(e)
+            sys.exit(1)
+        finally:
+            loader.dispose()
+
+
+def construct_call(loader: Any) -> Iterator[Call]:
+    """
+    Compose and construct the next node of a loader as a call.
+
+    Parameters
+    ----------
+    loader : Any
+        The loader, positioned before the node.
+
+    Yields
+    ------
+    Call
+        The call, if the node is a mapping.
+    """
+    node: Any = Composer.compose_node(loader, None, None)  # type: ignore
+    element = loader.construct_document(node)
+    if isinstance(element, dict):
+        element["line"] = node.start_mark.line + 1
+        yield element  # type: ignore
+    elif element is not None:
+        test_tool_logger.error(
+            "Ignoring %s from line %s, it is not a call",
+            element,
+            node.start_mark.line + 1,
+        )
+
+
 def run_tests(
     project_path_str: str,
     calls_path_str: str,
     data_path_str: str,
     continue_on_failure: bool,
     output: str,
+    jobs: int = 1,
+    stream: bool = False,
+    profile: bool = False,
+    memory: bool = False,
+    trace_run: bool = False,
+    async_engine: bool = False,
+    preflight: bool = False,
+    check: bool = False,
+    resume: str = "",
+    incremental: bool = False,
+    repeat: int = 0,
+    concurrency: int = 1,
+    duration: float = 0.0,
+    shard: str = "",
+    shard_timings: str = "",
+    history: bool = True,
+    pipeline: int = 0,
 ) -> None:
     """
     Run the tests.
@@ -266,12 +1088,66 @@ def run_tests(
         Continue tests on error.
     output : str
         Path to the output folder.
+    jobs : int, optional
+        Number of calls to run in parallel, by default 1.
+    stream : bool, optional
+        Load every call just before it is made, instead of loading all
+        calls upfront, by default False.
+    profile : bool, optional
+        Profile every step and write the profiles to the output folder,
+        by default False.
+    memory : bool, optional
+        Trace the memory used by every step and write the records to the
+        output folder, by default False.
+    trace_run : bool, optional
+        Write the steps, their phases and the spans of the plugins as
+        Chrome trace events to the output folder, by default False.
+    async_engine : bool, optional
+        Make the calls on an event loop, awaiting the coroutine functions
+        of the plugins, by default False.
+    preflight : bool, optional
+        Check all calls before the first call is made, by default False.
+    check : bool, optional
+        Only check the calls, without making them or creating the output
+        folder, by default False.
+    resume : str, optional
+        Output folder of a run to resume, relative to the project. Its data
+        is restored and the calls start at its first failed call, by
+        default no run is resumed.
+    incremental : bool, optional
+        Replay the results of unchanged cacheable calls from the result
+        store, instead of making them, by default False.
+    repeat : int, optional
+        Run the calls this many times in every virtual user and write the
+        latencies of the steps to the output folder, by default the calls
+        are run once.
+    concurrency : int, optional
+        Number of virtual users running the calls repeatedly, by default 1.
+    duration : float, optional
+        Run the calls repeatedly, until this many seconds passed, by
+        default there is no limit.
+    shard : str, optional
+        Only make the calls of the shard i/N, by default all calls are
+        made.
+    shard_timings : str, optional
+        Output folder of an earlier run, relative to the project, the
+        calls are weighted by the durations of when they are split in
+        shards, by default every call has the same weight.
+    history : bool, optional
+        Append the steps to the history of the runs, which estimates the
+        time left and flags slower steps, by default True.
+    pipeline : int, optional
+        Prepare up to this many of the next calls while a call is made,
+        if they do not depend on the calls before them, by default 0.
     """
     project_path: Path = Path(project_path_str)
     test_tool_logger.info(
         "Running tests for project %s", project_path.as_posix()
     )
 
+    # Plugins may have been installed since the last run of this process
+    reload_plugin_index()
+
     calls_path: Path = project_path.joinpath(calls_path_str)
     test_tool_logger.info("Calls: %s", calls_path.relative_to(project_path))
 
@@ -279,8 +1155,8 @@ def run_tests(
     if data_path.exists():
         test_tool_logger.info("Data: %s", data_path.relative_to(project_path))
 
-        # Load the data
-        data: Dict[str, Any] = load_config_yaml(data_path)
+        # Load the data, it is not cached as it may hold credentials
+        data: Dict[str, Any] = load_config_yaml(data_path, cache=False)
         if data is None:
             data = {}
         for key, value in data.items():
@@ -289,14 +1165,28 @@ def run_tests(
         test_tool_logger.info("No data file found, using empty data dict.")
         data = {}
 
+    # Restore the data of the resumed run
+    start: int = 0
+    if resume:
+        try:
+            checkpoint = load_checkpoint(project_path.joinpath(resume))
+        except ValueError as e:
+            test_tool_logger.error(e)
+            sys.exit(1)
+        data = restore_data(checkpoint, data)
+        start = checkpoint["step"]
+        test_tool_logger.info("Resuming at call %s of %s", start + 1, resume)
+
     # Set the project path in the data
     data["PROJECT_PATH"] = project_path.as_posix()
 
     # Check if output is set
-    if output:
+    output_path: Optional[Path] = None
+    fh: Optional[FileHandler] = None
+    if output and not check:
         # Create a string from datetime in format YYYYMMDD_HHMMSS
         now_str = datetime.now().strftime(output)
-        output_path: Path = project_path.joinpath(now_str)
+        output_path = project_path.joinpath(now_str)
         test_tool_logger.debug(
             "Create output folder %s", output_path.relative_to(project_path)
         )
@@ -313,16 +1203,156 @@ def run_tests(
         )
         test_tool_logger.addHandler(fh)
 
-    # Load the calls
-    calls: List[Call] = load_config_yaml(calls_path, True)
-    errors = make_all_calls(calls, data, project_path, continue_on_failure)
+    # Run the calls repeatedly in virtual users
+    load = repeat > 0 or duration > 0
 
-    if errors == 0:
-        test_tool_logger.info("Everything OK")
-    else:
-        test_tool_logger.error(
-            "There occured %s test_tool_logger.errors while testing,"
-            + "please check the logs",
-            errors,
-        )
-        sys.exit(1)
+    try:
+        # Load the calls
+        calls: Iterable[Call]
+        if stream and jobs > 1:
+            test_tool_logger.warning(
+                "Streaming is not possible with parallel jobs, "
+                + "loading all calls"
+            )
+        if stream and (preflight or check):
+            test_tool_logger.warning(
+                "Streaming is not possible when checking the calls, "
+                + "loading all calls"
+            )
+        if stream and load:
+            test_tool_logger.warning(
+                "Streaming is not possible when repeating the calls, "
+                + "loading all calls"
+            )
+        if stream and shard:
+            test_tool_logger.warning(
+                "Streaming is not possible when splitting the calls in "
+                + "shards, loading all calls"
+            )
+        if stream and jobs <= 1 and not (preflight or check or load or shard):
+            calls = iter_config_yaml(calls_path)
+        else:
+            calls = load_config_yaml(calls_path, True)
+            # Find typos in the call types before the first call is made
+            if calls and not check_call_types(calls):  # type: ignore
+                sys.exit(1)
+        # Only the calls of this shard are made
+        if shard:
+            try:
+                number, shards = parse_shard(shard)
+                durations = (
+                    load_step_durations(project_path.joinpath(shard_timings))
+                    if shard_timings
+                    else None
+                )
+                # The default calls are needed to find the dependencies
+                calls = list(calls or [])
+                loaded_call_types: Dict[str, CallType] = {}
+                call_types = {test.get("type", "ASSERT") for test in calls}
+                for call_type in call_types:
+                    import_plugin(call_type, loaded_call_types)
+                calls = split_calls(
+                    calls,  # type: ignore
+                    {
+                        call_type: loaded["default_call"]
+                        for call_type, loaded in loaded_call_types.items()
+                    },
+                    number,
+                    shards,
+                    durations,
+                )
+            except ValueError as e:
+                test_tool_logger.error(e)
+                sys.exit(1)
+            if output_path is not None:
+                write_shard_info(
+                    output_path, number, shards, calls  # type: ignore
+                )
+        # The calls before were made by the resumed run
+        if start and isinstance(calls, list):
+            calls = calls[start:]
+        elif start and calls is not None:
+            calls = islice(calls, start, None)
+        # The plugins are torn down and their resources closed when the
+        # calls are done, nested runs of the SUITE plugin share them
+        with run_context(project_path, output_path):
+            # The checks set up the plugins like the calls
+            if preflight or check:
+                if check_all_calls(calls or [], data, project_path) > 0:
+                    sys.exit(1)
+                if check:
+                    return
+            if load:
+                # Only needed in load mode, the module imports this module
+                from test_tool.load import run_load
+
+                if jobs > 1:
+                    test_tool_logger.warning(
+                        "Parallel jobs are not used when repeating the calls, "
+                        + "set the number of users with --concurrency"
+                    )
+                errors = run_load(
+                    list(calls or []),
+                    data,
+                    project_path,
+                    continue_on_failure,
+                    repeat,
+                    concurrency,
+                    duration,
+                    output_path,
+                )
+            else:
+                # Nested runs of the SUITE plugin are added to the trace of
+                # their run
+                tracer: Optional[trace.Tracer] = None
+                if trace_run and output_path is None:
+                    test_tool_logger.warning("Tracing needs an output folder")
+                elif trace_run:
+                    tracer = trace.start_trace(output_path)  # type: ignore
+                history_path = get_history_path() if history else None
+                history_recorder: Optional[HistoryRecorder] = None
+                if history_path is not None:
+                    history_recorder = HistoryRecorder(
+                        history_path,
+                        project_path,
+                        calls_path,
+                        output_path,
+                        calls if isinstance(calls, list) else None,
+                        jobs,
+                    )
+                try:
+                    errors = make_all_calls(
+                        calls,
+                        data,
+                        project_path,
+                        continue_on_failure,
+                        jobs,
+                        output_path,
+                        profile,
+                        memory,
+                        async_engine,
+                        start,
+                        incremental,
+                        history_recorder,
+                        pipeline,
+                    )
+                finally:
+                    if history_recorder is not None:
+                        history_recorder.close()
+                    if tracer is not None:
+                        trace.stop_trace(tracer)
+
+        if errors == 0:
+            test_tool_logger.info("Everything OK")
+        else:
+            test_tool_logger.error(
+                "There occured %s test_tool_logger.errors while testing,"
+                + "please check the logs",
+                errors,
+            )
+            sys.exit(1)
+    finally:
+        if fh is not None:
+            # Every run writes its own log, e.g. in a test-tool serve daemon
+            test_tool_logger.removeHandler(fh)
+            fh.close()
@@ -0,0 +1,353 @@
+"""
+This module contains the checkpoints of a run to resume it.
+
+After every successful step, the index of the next step and the data are
+pickled to the output folder. A run started with --resume restores the
+data and starts at the first step, which failed. Secrets in the data are
+not written, they are taken from the data file of the resumed run.
+"""
+import pickle
+import re
+from logging import getLogger
+from os import getpid, replace
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple, TypedDict
+
+from test_tool.instrumentation import StepRecord
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+# File in the output folder, the checkpoint is written to
+CHECKPOINT_FILE: str = "checkpoint.pickle"
+
+# Change when the format of the checkpoint changes
+CHECKPOINT_VERSION: int = 1
+
+# Keys of the data holding secrets, also within nested dicts and lists
+SECRET_KEYS = re.compile(
+    r"password|passwd|secret|token|credential|api_?key|private_?key",
+    re.IGNORECASE,
+)
+
+
+class Checkpoint(TypedDict):
+    """
+    Checkpoint of a run.
+    """
+
+    version: int
+    step: int
+    data: Dict[str, Any]
+    secrets: List[str]
+    unpicklable: List[str]
+
+
+def remove_secrets(
+    data: Dict[str, Any], secrets: List[str], parent_path: str = ""
+) -> Dict[str, Any]:
+    """
+    Copy the dicts of the data without the keys holding secrets.
+
+    Parameters
+    ----------
+    data : Dict[str, Any]
+        The data.
+    secrets : List[str]
+        The dotted paths of the removed keys are appended to it, the
+        elements of lists are given by their index.
+    parent_path : str, optional
+        Dotted path of the data, by default the root.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The data without secrets, values without secrets are shared.
+    """
+    without_secrets: Dict[str, Any] = {}
+    for key, value in data.items():
+        path = f"{parent_path}{key}"
+        if isinstance(key, str) and SECRET_KEYS.search(key):
+            secrets.append(path)
+        else:
+            without_secrets[key] = remove_nested_secrets(
+                value, secrets, f"{path}."
+            )
+    return without_secrets
+
+
+def remove_nested_secrets(
+    value: Any, secrets: List[str], parent_path: str
+) -> Any:
+    """
+    Copy a value of the data without the keys holding secrets, within
+    dicts, lists and tuples.
+
+    Parameters
+    ----------
+    value : Any
+        The value.
+    secrets : List[str]
+        The dotted paths of the removed keys are appended to it.
+    parent_path : str
+        Dotted path of the value, ending with a dot.
+
+    Returns
+    -------
+    Any
+        The value without secrets, the value itself if it has none.
+    """
+    if isinstance(value, dict):
+        return remove_secrets(value, secrets, parent_path)
+    if not isinstance(value, (list, tuple)):
+        return value
+    elements = [
+        remove_nested_secrets(element, secrets, f"{parent_path}{idx}.")
+        for idx, element in enumerate(value)
+    ]
+    if all(new is old for new, old in zip(elements, value)):
+        return value
+    return elements if isinstance(value, list) else tuple(elements)
+
+
+def find_unpicklable(data: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Find the keys of the data, whose values can not be pickled.
+
+    Parameters
+    ----------
+    data : Dict[str, Any]
+        The data.
+
+    Returns
+    -------
+    Dict[str, str]
+        The error for every key, which can not be pickled.
+    """
+    unpicklable: Dict[str, str] = {}
+    for key, value in data.items():
+        try:
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:  # pylint: disable=broad-except
+            unpicklable[key] = f"{type(e).__name__}: {e}"
+    return unpicklable
+
+
+def write_checkpoint(path: Path, checkpoint: Checkpoint) -> None:
+    """
+    Write a checkpoint, replacing the one before at once.
+
+    Parameters
+    ----------
+    path : Path
+        Path of the checkpoint file.
+    checkpoint : Checkpoint
+        The checkpoint.
+    """
+    temporary_path = path.with_suffix(f".{getpid()}.tmp")
+    try:
+        with open(temporary_path, "wb") as file:
+            pickle.dump(checkpoint, file, pickle.HIGHEST_PROTOCOL)
+        # A run killed while writing leaves the checkpoint before
+        replace(temporary_path, path)
+    finally:
+        temporary_path.unlink(missing_ok=True)
+
+
+class CheckpointRecorder:
+    """
+    Writes a checkpoint after every successful step, until a step fails.
+    """
+
+    def __init__(
+        self, output_path: Path, data: Dict[str, Any], start: int = 0
+    ) -> None:
+        self.path = output_path.joinpath(CHECKPOINT_FILE)
+        # Steps before the first step of a resumed run
+        self.start = start
+        self.failed = False
+        # Keys, which could not be pickled by a step before
+        self.unpicklable: Set[str] = set()
+        self.write(start, data)
+
+    def write(self, step: int, data: Dict[str, Any]) -> None:
+        """
+        Write the checkpoint for the next step.
+
+        Parameters
+        ----------
+        step : int
+            Index of the next step in the calls file.
+        data : Dict[str, Any]
+            The data after the step before.
+        """
+        secrets: List[str] = []
+        without_secrets = remove_secrets(data, secrets)
+        for key in self.unpicklable.intersection(without_secrets):
+            del without_secrets[key]
+        checkpoint: Checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "step": step,
+            "data": without_secrets,
+            "secrets": secrets,
+            "unpicklable": sorted(self.unpicklable),
+        }
+        try:
+            write_checkpoint(self.path, checkpoint)
+            return
+        except Exception:  # pylint: disable=broad-except
+            # Only searched on failure, pickling every value on its own is
+            # slower
+            unpicklable = find_unpicklable(without_secrets)
+        for key, error in unpicklable.items():
+            test_tool_logger.warning(
+                "%s of the data can not be checkpointed, it is not "
+                + "restored by --resume: %s",
+                key,
+                error,
+            )
+            self.unpicklable.add(key)
+            del without_secrets[key]
+        checkpoint["unpicklable"] = sorted(self.unpicklable)
+        try:
+            write_checkpoint(self.path, checkpoint)
+        except Exception as e:  # pylint: disable=broad-except
+            test_tool_logger.error("Could not write the checkpoint: %s", e)
+
+    def add(self, record: StepRecord, data: Dict[str, Any]) -> None:
+        """
+        Write the checkpoint after a step.
+
+        Parameters
+        ----------
+        record : StepRecord
+            The record of the finished step.
+        data : Dict[str, Any]
+            The data after the step.
+        """
+        if self.failed:
+            # The checkpoint stays at the first failed step
+            return
+        if record["error"]:
+            self.failed = True
+            return
+        self.write(self.start + record["step"], data)
+
+
+def load_checkpoint(run_path: Path) -> Checkpoint:
+    """
+    Load the checkpoint of a run.
+
+    Parameters
+    ----------
+    run_path : Path
+        The output folder of the run.
+
+    Returns
+    -------
+    Checkpoint
+        The checkpoint.
+
+    Raises
+    ------
+    ValueError
+        If the folder has no checkpoint of this version.
+    """
+    path = run_path.joinpath(CHECKPOINT_FILE)
+    try:
+        with open(path, "rb") as file:
+            checkpoint = pickle.load(file)
+    except FileNotFoundError as e:
+        raise ValueError(f"No checkpoint found in {run_path}") from e
+    if (
+        not isinstance(checkpoint, dict)
+        or checkpoint.get("version") != CHECKPOINT_VERSION
+    ):
+        raise ValueError(f"{path} is not a checkpoint of this version")
+    return checkpoint  # type: ignore
+
+
+def get_path(data: Dict[str, Any], path: str) -> Tuple[bool, Any]:
+    """
+    Get a value of the data by its dotted path.
+
+    Parameters
+    ----------
+    data : Dict[str, Any]
+        The data.
+    path : str
+        The dotted path of the value, the elements of lists are given by
+        their index.
+
+    Returns
+    -------
+    Tuple[bool, Any]
+        True and the value if it exists, False and None otherwise.
+    """
+    value: Any = data
+    for key in path.split("."):
+        if isinstance(value, dict) and key in value:
+            value = value[key]
+        elif (
+            isinstance(value, (list, tuple))
+            and key.isdigit()
+            and int(key) < len(value)
+        ):
+            value = value[int(key)]
+        else:
+            return False, None
+    return True, value
+
+
+def restore_data(
+    checkpoint: Checkpoint, data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Restore the data of a checkpoint, with the secrets of the data file.
+
+    Parameters
+    ----------
+    checkpoint : Checkpoint
+        The checkpoint.
+    data : Dict[str, Any]
+        The data loaded from the data file.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The restored data.
+    """
+    restored: Dict[str, Any] = {**data, **checkpoint["data"]}
+    for path in checkpoint["secrets"]:
+        found, value = get_path(data, path)
+        if not found:
+            test_tool_logger.warning(
+                "Secret %s is not restored, it is not in the data file", path
+            )
+            continue
+        *parents, key = path.split(".")
+        parent: Any = restored
+        for parent_key in parents:
+            if isinstance(parent, dict):
+                parent = parent.setdefault(parent_key, {})
+            elif (
+                isinstance(parent, (list, tuple))
+                and parent_key.isdigit()
+                and int(parent_key) < len(parent)
+            ):
+                parent = parent[int(parent_key)]
+            else:
+                parent = None
+                break
+        if not isinstance(parent, dict):
+            test_tool_logger.warning(
+                "Secret %s is not restored, the data file differs", path
+            )
+            continue
+        parent[key] = value
+    for key in checkpoint["unpicklable"]:
+        test_tool_logger.warning(
+            "%s of the data could not be checkpointed, it is not restored",
+            key,
+        )
+    return restored
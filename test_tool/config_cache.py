@@ -0,0 +1,276 @@
+"""
+This module contains the on-disk cache of parsed config files.
+
+A cached config is only used if the path, size, modification time and
+content hash of the file match. The entries are evicted least recently
+used first, when the cache exceeds its size limit.
+"""
+import pickle
+from hashlib import sha256
+from logging import getLogger
+from os import environ, getpid, replace, stat_result, utime
+from pathlib import Path
+from typing import Any, Optional, Tuple, TypedDict
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+# Environment variable to change the folder of all caches and stores
+CACHE_HOME_VARIABLE: str = "TEST_TOOL_CACHE_HOME"
+
+# Environment variable to change the cache folder, empty disables the cache
+CACHE_DIR_VARIABLE: str = "TEST_TOOL_CACHE_DIR"
+
+# Folder of the config cache in the folder of all caches
+CACHE_FOLDER: str = "configs"
+
+# Maximal size of all cached configs in bytes
+CACHE_SIZE_LIMIT: int = 64 * 1024 * 1024
+
+# Change when the format of the entries changes
+CACHE_VERSION: int = 1
+
+
+class CacheHeader(TypedDict):
+    """
+    Header of a cache entry.
+    """
+
+    version: int
+    path: str
+    size: int
+    mtime: int
+    digest: str
+
+
+def get_cache_home() -> Path:
+    """
+    Get the folder of all caches and stores of the test tool.
+
+    Returns
+    -------
+    Path
+        The folder.
+    """
+    cache_home = environ.get(CACHE_HOME_VARIABLE)
+    if cache_home:
+        return Path(cache_home)
+    if "LOCALAPPDATA" in environ:
+        base = Path(environ["LOCALAPPDATA"])
+    else:
+        base = Path(environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    return base.joinpath("universal-test-tool")
+
+
+def get_store_dir(variable: str, folder: str) -> Optional[Path]:
+    """
+    Get the folder of a cache or store.
+
+    Every cache and store has a folder of its own, which can be changed or
+    disabled with its environment variable, without affecting the others.
+
+    Parameters
+    ----------
+    variable : str
+        Environment variable to change the folder, empty disables it.
+    folder : str
+        The default folder in the folder of all caches.
+
+    Returns
+    -------
+    Optional[Path]
+        The folder, None if it is disabled.
+    """
+    store_dir = environ.get(variable)
+    if store_dir is not None:
+        return Path(store_dir) if store_dir else None
+    return get_cache_home().joinpath(folder)
+
+
+def get_cache_dir() -> Optional[Path]:
+    """
+    Get the folder of the config cache.
+
+    Returns
+    -------
+    Optional[Path]
+        The folder, None if the cache is disabled.
+    """
+    return get_store_dir(CACHE_DIR_VARIABLE, CACHE_FOLDER)
+
+
+def get_entry_path(cache_dir: Path, path: Path, variant: str) -> Path:
+    """
+    Get the path of the cache entry for a config file.
+
+    Parameters
+    ----------
+    cache_dir : Path
+        The folder of the cache.
+    path : Path
+        Path to the config file.
+    variant : str
+        Distinguishes differently parsed entries of the same file.
+
+    Returns
+    -------
+    Path
+        Path to the cache entry.
+    """
+    key = f"{path.resolve().as_posix()}\0{variant}".encode("utf-8")
+    return cache_dir.joinpath(f"{sha256(key).hexdigest()}.pickle")
+
+
+def create_header(
+    path: Path, status: stat_result, content: bytes
+) -> CacheHeader:
+    """
+    Create the header identifying the content of a config file.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the config file.
+    status : stat_result
+        Status of the config file.
+    content : bytes
+        Content of the config file.
+
+    Returns
+    -------
+    CacheHeader
+        The header.
+    """
+    return {
+        "version": CACHE_VERSION,
+        "path": path.resolve().as_posix(),
+        "size": status.st_size,
+        "mtime": status.st_mtime_ns,
+        "digest": sha256(content).hexdigest(),
+    }
+
+
+def load_cached_config(
+    path: Path, status: stat_result, content: bytes, variant: str
+) -> Tuple[bool, Any]:
+    """
+    Load a parsed config file from the cache.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the config file.
+    status : stat_result
+        Status of the config file.
+    content : bytes
+        Content of the config file.
+    variant : str
+        Distinguishes differently parsed entries of the same file.
+
+    Returns
+    -------
+    Tuple[bool, Any]
+        True and the parsed config if it was cached, False and None
+        otherwise.
+    """
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return False, None
+
+    entry_path = get_entry_path(cache_dir, path, variant)
+    try:
+        with open(entry_path, "rb") as file:
+            header = pickle.load(file)
+            if header != create_header(path, status, content):
+                test_tool_logger.debug("Cached %s is stale", path)
+                return False, None
+            data = pickle.load(file)
+        # Mark the entry as recently used
+        utime(entry_path)
+    except FileNotFoundError:
+        return False, None
+    except Exception as e:  # pylint: disable=broad-except
+        test_tool_logger.debug("Could not load cached %s: %s", path, e)
+        return False, None
+
+    test_tool_logger.debug("Loaded %s from the cache", path)
+    return True, data
+
+
+def store_cached_config(
+    path: Path,
+    status: stat_result,
+    content: bytes,
+    variant: str,
+    data: Any,
+    size_limit: int = CACHE_SIZE_LIMIT,
+) -> None:
+    """
+    Store a parsed config file in the cache.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the config file.
+    status : stat_result
+        Status of the config file.
+    content : bytes
+        Content of the config file.
+    variant : str
+        Distinguishes differently parsed entries of the same file.
+    data : Any
+        The parsed config.
+    size_limit : int, optional
+        Maximal size of the cache in bytes, by default CACHE_SIZE_LIMIT.
+    """
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return
+
+    entry_path = get_entry_path(cache_dir, path, variant)
+    temporary_path = entry_path.with_suffix(f".{getpid()}.tmp")
+    try:
+        # Only the user may read the parsed files
+        cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        with open(temporary_path, "wb") as file:
+            pickle.dump(
+                create_header(path, status, content),
+                file,
+                pickle.HIGHEST_PROTOCOL,
+            )
+            pickle.dump(data, file, pickle.HIGHEST_PROTOCOL)
+        # Replace a stale entry at once, concurrent runs never see a part
+        replace(temporary_path, entry_path)
+        evict_cached_configs(cache_dir, size_limit)
+    except Exception as e:  # pylint: disable=broad-except
+        test_tool_logger.debug("Could not cache %s: %s", path, e)
+        temporary_path.unlink(missing_ok=True)
+
+
+def evict_cached_configs(cache_dir: Path, size_limit: int) -> None:
+    """
+    Remove the least recently used entries exceeding the size limit.
+
+    Parameters
+    ----------
+    cache_dir : Path
+        The folder of the cache.
+    size_limit : int
+        Maximal size of the cache in bytes.
+    """
+    entries = []
+    for entry_path in cache_dir.glob("*.pickle"):
+        try:
+            entries.append((entry_path.stat(), entry_path))
+        except FileNotFoundError:
+            # Removed by a concurrent run
+            pass
+
+    size = sum(status.st_size for status, _ in entries)
+    entries.sort(key=lambda entry: entry[0].st_mtime_ns)
+    for status, entry_path in entries:
+        if size <= size_limit:
+            break
+        test_tool_logger.debug("Evict %s from the cache", entry_path)
+        entry_path.unlink(missing_ok=True)
+        size -= status.st_size
@@ -0,0 +1,374 @@
+"""
+This module contains the daemon making runs for clients.
+
+A daemon started with test-tool serve keeps the imported plugins, a
+started JVM and the pooled connections of the plugins between runs: the
+runs share one run context, which is closed when the daemon stops. A
+client started with test-tool run --daemon sends its arguments over a
+local Unix socket and gets the logs and the exit code back. Without Unix
+sockets, there is no daemon and the clients run the tests themselves.
+
+Every message is a JSON object on its own line. The client sends one
+request, the daemon answers with log messages and finally the exit code.
+The runs are made one after the other, as the logging, the environment
+and the working directory are shared by the whole process.
+"""
+import os
+import socket
+import sys
+import tempfile
+from contextlib import contextmanager
+from json import dumps, loads
+from logging import Formatter, Handler, LogRecord, getLogger
+from pathlib import Path
+from signal import SIGTERM, default_int_handler, signal
+from socketserver import StreamRequestHandler, TCPServer
+from threading import Lock
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, TypedDict
+
+from test_tool.resources import RunContext, current_context
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+# Environment variable to change the path of the socket
+SOCKET_VARIABLE: str = "TEST_TOOL_SOCKET"
+
+# Format of the log messages sent to the client
+LOG_FORMAT: str = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+
+# Unix sockets are missing on some platforms, e.g. older Windows versions,
+# the clients run the tests themselves there
+UNIX_SOCKETS: bool = hasattr(socket, "AF_UNIX")
+
+
+class RunRequest(TypedDict):
+    """
+    Run requested by a client.
+    """
+
+    arguments: Dict[str, Any]
+    level: int
+    cwd: str
+    environment: Dict[str, str]
+
+
+def get_socket_path() -> Path:
+    """
+    Get the path of the socket the daemon listens on.
+
+    Returns
+    -------
+    Path
+        The path of the socket.
+    """
+    socket_path = os.environ.get(SOCKET_VARIABLE)
+    if socket_path:
+        return Path(socket_path)
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    user = os.getuid() if hasattr(os, "getuid") else 0
+    return Path(runtime_dir).joinpath(f"universal-test-tool-{user}.sock")
+
+
+def send_message(file: BinaryIO, message: Dict[str, Any]) -> None:
+    """
+    Send a message as a line of JSON.
+
+    Parameters
+    ----------
+    file : BinaryIO
+        The file of the socket.
+    message : Dict[str, Any]
+        The message.
+    """
+    file.write(dumps(message, default=str).encode("utf-8") + b"\n")
+    file.flush()
+
+
+class ClientLogHandler(Handler):
+    """
+    Sends the log messages of a run to the client.
+    """
+
+    def __init__(self, file: BinaryIO) -> None:
+        super().__init__()
+        self.file = file
+        self.send_lock = Lock()
+        self.setFormatter(Formatter(LOG_FORMAT))
+
+    def emit(self, record: LogRecord) -> None:
+        try:
+            message = {"log": self.format(record), "level": record.levelno}
+            with self.send_lock:
+                send_message(self.file, message)
+        except Exception:  # pylint: disable=broad-except
+            # The client is gone, the run is finished anyway
+            self.handleError(record)
+
+
+@contextmanager
+def run_context(request: RunRequest) -> Iterator[None]:
+    """
+    Use the working directory, environment and log level of the client.
+
+    Parameters
+    ----------
+    request : RunRequest
+        The request of the client.
+    """
+    root_logger = getLogger()
+    level = root_logger.level
+    cwd = os.getcwd()
+    environment = dict(os.environ)
+    try:
+        root_logger.setLevel(request["level"])
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["environment"])
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(environment)
+        os.chdir(cwd)
+        root_logger.setLevel(level)
+
+
+def make_run(request: RunRequest, file: BinaryIO) -> int:
+    """
+    Make a run requested by a client.
+
+    Parameters
+    ----------
+    request : RunRequest
+        The request of the client.
+    file : BinaryIO
+        The file of the socket, the logs are sent to.
+
+    Returns
+    -------
+    int
+        The exit code of the run.
+    """
+    # Imported here, so the client does not import the plugins
+    from test_tool.base import run_tests
+
+    handler = ClientLogHandler(file)
+    root_logger = getLogger()
+    root_logger.addHandler(handler)
+    try:
+        with run_context(request):
+            run_tests(**request["arguments"])
+        return 0
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+    except Exception as e:  # pylint: disable=broad-except
+        test_tool_logger.exception("Run failed: %s", e)
+        return 1
+    finally:
+        root_logger.removeHandler(handler)
+
+
+class RunRequestHandler(StreamRequestHandler):
+    """
+    Handles the connection of a client.
+    """
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        request: RunRequest = loads(line)
+        test_tool_logger.info(
+            "Run %s for client", request["arguments"]["project_path_str"]
+        )
+        # The run uses the context of the daemon instead of its own
+        token = current_context.set(self.server.context)  # type: ignore
+        try:
+            code = make_run(request, self.wfile)  # type: ignore
+        finally:
+            current_context.reset(token)
+        try:
+            send_message(self.wfile, {"exit": code})  # type: ignore
+        except OSError:
+            test_tool_logger.warning("Client left before the run finished")
+
+
+class RunServer(TCPServer):
+    """
+    Server making the runs with a context shared by all of them.
+    """
+
+    # Like UnixStreamServer, which only exists if there are Unix sockets
+    address_family = getattr(socket, "AF_UNIX", socket.AF_INET)
+
+    def __init__(self, socket_path: Path) -> None:
+        super().__init__(
+            socket_path.as_posix(), RunRequestHandler  # type: ignore
+        )
+        self.context = RunContext(Path.cwd())
+
+    def server_close(self) -> None:
+        super().server_close()
+        # Close the pooled handles and tear down the plugins
+        self.context.close()
+
+
+def preload_plugins(call_types: Iterable[str]) -> None:
+    """
+    Import plugins before the first run.
+
+    Parameters
+    ----------
+    call_types : Iterable[str]
+        The call types of the plugins.
+    """
+    from test_tool import CallType, import_plugin
+
+    loaded_call_types: Dict[str, CallType] = {}
+    for call_type in call_types:
+        if import_plugin(call_type, loaded_call_types):
+            test_tool_logger.info("Preloaded plugin for %s", call_type)
+
+
+def create_server(socket_path: Path) -> RunServer:
+    """
+    Create the server listening on a socket.
+
+    Parameters
+    ----------
+    socket_path : Path
+        The path of the socket to listen on.
+
+    Returns
+    -------
+    RunServer
+        The server, which is not serving yet.
+
+    Raises
+    ------
+    OSError
+        If a daemon is already listening on the socket or the platform has
+        no Unix sockets.
+    """
+    if not UNIX_SOCKETS:
+        raise OSError("The daemon needs Unix sockets, which are missing")
+    if socket_path.exists():
+        if is_serving(socket_path):
+            raise OSError(f"A daemon is already listening on {socket_path}")
+        # Left behind by a daemon, which was killed
+        socket_path.unlink()
+
+    server = RunServer(socket_path)
+    # Only the user can connect
+    socket_path.chmod(0o600)
+    return server
+
+
+def serve(socket_path: Path, call_types: Iterable[str] = ()) -> None:
+    """
+    Make the runs requested by clients until interrupted.
+
+    Parameters
+    ----------
+    socket_path : Path
+        The path of the socket to listen on.
+    call_types : Iterable[str], optional
+        The call types of the plugins to import before the first run, by
+        default none.
+
+    Raises
+    ------
+    OSError
+        If a daemon is already listening on the socket or the platform has
+        no Unix sockets.
+    """
+    server = create_server(socket_path)
+    # Stop like on an interrupt, so the socket is removed
+    signal(SIGTERM, default_int_handler)
+    preload_plugins(call_types)
+    with server:
+        test_tool_logger.info("Listening on %s", socket_path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            test_tool_logger.info("Stopping daemon")
+        finally:
+            socket_path.unlink()
+
+
+def is_serving(socket_path: Path) -> bool:
+    """
+    Check if a daemon listens on a socket.
+
+    Parameters
+    ----------
+    socket_path : Path
+        The path of the socket.
+
+    Returns
+    -------
+    bool
+        True if a daemon accepts connections, False otherwise.
+    """
+    if not UNIX_SOCKETS:
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path.as_posix())
+        except OSError:
+            return False
+    return True
+
+
+def run_in_daemon(
+    socket_path: Path, arguments: Dict[str, Any], level: int
+) -> int:
+    """
+    Let a daemon make a run and log its messages.
+
+    Parameters
+    ----------
+    socket_path : Path
+        The path of the socket the daemon listens on.
+    arguments : Dict[str, Any]
+        The arguments of run_tests.
+    level : int
+        The log level of the run.
+
+    Returns
+    -------
+    int
+        The exit code of the run.
+
+    Raises
+    ------
+    ConnectionError
+        If no daemon is listening on the socket or the platform has no Unix
+        sockets.
+    """
+    if not UNIX_SOCKETS:
+        raise ConnectionError(
+            "The daemon needs Unix sockets, which are missing"
+        )
+    request: RunRequest = {
+        "arguments": arguments,
+        "level": level,
+        "cwd": os.getcwd(),
+        "environment": dict(os.environ),
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path.as_posix())
+        except OSError as e:
+            raise ConnectionError(
+                f"No daemon is listening on {socket_path}"
+            ) from e
+        with client.makefile("rwb") as file:
+            send_message(file, request)  # type: ignore
+            for line in file:
+                message = loads(line)
+                if "exit" in message:
+                    return message["exit"]
+                print(message["log"], file=sys.stderr, flush=True)
+    test_tool_logger.error("The daemon closed the connection during the run")
+    return 1
@@ -0,0 +1,498 @@
+"""
+This module contains the history of the runs.
+
+The duration and the status of every step are appended to a SQLite
+database in its folder in the cache, when a run finished. The durations of the
+runs before estimate how long a run takes and flag steps, which got
+slower than before.
+"""
+from contextlib import closing
+from logging import getLogger
+from math import ceil
+from pathlib import Path
+from threading import Lock
+from time import perf_counter, time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypedDict,
+)
+
+from test_tool.config_cache import get_store_dir
+from test_tool.instrumentation import StepRecord
+
+if TYPE_CHECKING:
+    from sqlite3 import Connection
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+# Environment variable to change the history folder, empty disables it
+HISTORY_DIR_VARIABLE: str = "TEST_TOOL_HISTORY_DIR"
+
+# Folder of the history in the folder of all caches
+HISTORY_FOLDER: str = "history"
+
+# File of the database in the history folder
+HISTORY_FILE: str = "history.sqlite"
+
+# Number of runs before, the durations are compared to
+BASELINE_RUNS: int = 10
+
+# Steps taking this share longer than their baseline are flagged
+REGRESSION_THRESHOLD: float = 0.5
+
+# Steps taking less seconds longer than their baseline are never flagged
+MIN_REGRESSION: float = 0.01
+
+# Seconds between two estimates of the time left
+ETA_INTERVAL: float = 10.0
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    project TEXT NOT NULL,
+    calls TEXT NOT NULL,
+    started REAL NOT NULL,
+    output TEXT,
+    steps INTEGER NOT NULL,
+    errors INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run INTEGER NOT NULL REFERENCES runs (id),
+    step INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    error INTEGER NOT NULL,
+    wall REAL NOT NULL,
+    cpu REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_calls ON runs (project, calls);
+CREATE INDEX IF NOT EXISTS steps_run ON steps (run);
+"""
+
+
+class StepHistory(TypedDict):
+    """
+    Durations of the successful steps from a line of a calls file, oldest
+    first.
+    """
+
+    line: int
+    type: str
+    runs: List[int]
+    durations: List[float]
+
+
+class Regression(TypedDict):
+    """
+    Step of the last run, which took longer than its baseline.
+    """
+
+    line: int
+    type: str
+    baseline: float
+    last: float
+
+
+def get_calls_key(project_path: Path, calls_path: Path) -> Tuple[str, str]:
+    """
+    Get the project and calls file, the runs are stored for.
+
+    Parameters
+    ----------
+    project_path : Path
+        Path to the project.
+    calls_path : Path
+        Path to the calls file.
+
+    Returns
+    -------
+    Tuple[str, str]
+        The resolved path of the project and the calls file relative to
+        it, if it is within the project.
+    """
+    project = project_path.resolve()
+    calls = calls_path.resolve()
+    if calls.is_relative_to(project):
+        return project.as_posix(), calls.relative_to(project).as_posix()
+    return project.as_posix(), calls.as_posix()
+
+
+def get_history_path() -> Optional[Path]:
+    """
+    Get the path of the database.
+
+    Returns
+    -------
+    Optional[Path]
+        The path, None if the history is disabled.
+    """
+    history_dir = get_store_dir(HISTORY_DIR_VARIABLE, HISTORY_FOLDER)
+    return history_dir.joinpath(HISTORY_FILE) if history_dir else None
+
+
+def connect_history(path: Path) -> "Connection":
+    """
+    Open the database, creating it if needed.
+
+    Parameters
+    ----------
+    path : Path
+        Path of the database.
+
+    Returns
+    -------
+    Connection
+        The connection.
+    """
+    # Only needed with a history, sqlite3 is slow to import
+    from sqlite3 import connect
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Shards of a run may finish at the same time
+    connection = connect(path, timeout=30)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def get_step_histories(
+    path: Path, project: str, calls: str, runs: int = BASELINE_RUNS
+) -> Tuple[Optional[int], Dict[int, StepHistory]]:
+    """
+    Get the durations of the steps of the last runs of a calls file.
+
+    Parameters
+    ----------
+    path : Path
+        Path of the database.
+    project : str
+        The resolved path of the project.
+    calls : str
+        The calls file, relative to the project.
+    runs : int, optional
+        Number of runs, by default BASELINE_RUNS.
+
+    Returns
+    -------
+    Tuple[Optional[int], Dict[int, StepHistory]]
+        The id of the last run, None if there is none, and the history of
+        the steps from every line.
+    """
+    histories: Dict[int, StepHistory] = {}
+    if not path.exists():
+        return None, histories
+    with closing(connect_history(path)) as connection:
+        run_ids = [
+            row[0]
+            for row in connection.execute(
+                "SELECT id FROM runs WHERE project = ? AND calls = ? "
+                + "ORDER BY id DESC LIMIT ?",
+                (project, calls, runs),
+            )
+        ]
+        if not run_ids:
+            return None, histories
+        placeholders = ", ".join("?" * len(run_ids))
+        rows = connection.execute(
+            "SELECT run, line, type, wall FROM steps "
+            + f"WHERE error = 0 AND run IN ({placeholders}) ORDER BY run",
+            run_ids,
+        )
+        for run, line, call_type, wall in rows:
+            history = histories.setdefault(
+                line,
+                {"line": line, "type": call_type, "runs": [], "durations": []},
+            )
+            history["type"] = call_type
+            history["runs"].append(run)
+            history["durations"].append(wall)
+    return run_ids[0], histories
+
+
+def get_percentile(values: Sequence[float], quantile: float) -> float:
+    """
+    Get a percentile of values by the nearest rank.
+
+    Parameters
+    ----------
+    values : Sequence[float]
+        The values, at least one.
+    quantile : float
+        The quantile, between 0 and 1.
+
+    Returns
+    -------
+    float
+        The percentile.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, ceil(quantile * len(ordered)) - 1)]
+
+
+def get_step_durations(
+    path: Path, project: str, calls: str, runs: int = BASELINE_RUNS
+) -> Dict[int, float]:
+    """
+    Estimate the duration of the steps by the runs before.
+
+    Parameters
+    ----------
+    path : Path
+        Path of the database.
+    project : str
+        The resolved path of the project.
+    calls : str
+        The calls file, relative to the project.
+    runs : int, optional
+        Number of runs, by default BASELINE_RUNS.
+
+    Returns
+    -------
+    Dict[int, float]
+        The median duration in seconds of the step from every line.
+    """
+    _, histories = get_step_histories(path, project, calls, runs)
+    return {
+        line: get_percentile(history["durations"], 0.5)
+        for line, history in histories.items()
+    }
+
+
+def find_regressions(
+    last_run: Optional[int],
+    histories: Dict[int, StepHistory],
+    threshold: float = REGRESSION_THRESHOLD,
+) -> List[Regression]:
+    """
+    Find the steps of the last run, which took longer than the median of
+    the runs before.
+
+    Parameters
+    ----------
+    last_run : Optional[int]
+        The id of the last run.
+    histories : Dict[int, StepHistory]
+        The history of the steps.
+    threshold : float, optional
+        Share of the baseline a step must take longer, by default
+        REGRESSION_THRESHOLD.
+
+    Returns
+    -------
+    List[Regression]
+        The slower steps.
+    """
+    regressions: List[Regression] = []
+    for line, history in sorted(histories.items()):
+        if len(history["durations"]) < 2 or history["runs"][-1] != last_run:
+            continue
+        baseline = get_percentile(history["durations"][:-1], 0.5)
+        last = history["durations"][-1]
+        if last - baseline > max(baseline * threshold, MIN_REGRESSION):
+            regressions.append(
+                {
+                    "line": line,
+                    "type": history["type"],
+                    "baseline": baseline,
+                    "last": last,
+                }
+            )
+    return regressions
+
+
+def show_history(
+    path: Path,
+    project: str,
+    calls: str,
+    runs: int = BASELINE_RUNS,
+    threshold: float = REGRESSION_THRESHOLD,
+) -> List[str]:
+    """
+    Show the trend of the steps of a calls file.
+
+    Parameters
+    ----------
+    path : Path
+        Path of the database.
+    project : str
+        The resolved path of the project.
+    calls : str
+        The calls file, relative to the project.
+    runs : int, optional
+        Number of runs, by default BASELINE_RUNS.
+    threshold : float, optional
+        Share of the baseline a step must take longer to be flagged, by
+        default REGRESSION_THRESHOLD.
+
+    Returns
+    -------
+    List[str]
+        The lines of the table.
+    """
+    last_run, histories = get_step_histories(path, project, calls, runs)
+    if last_run is None:
+        return [f"No runs of {calls} in {project} found"]
+    regressed = {
+        regression["line"]
+        for regression in find_regressions(last_run, histories, threshold)
+    }
+
+    lines = [
+        " Line | Type              | Runs |   p50 ms |   p90 ms |   max ms "
+        + "|  last ms | Change"
+    ]
+    for line, history in sorted(histories.items()):
+        durations = history["durations"]
+        last = durations[-1] if history["runs"][-1] == last_run else None
+        baseline = durations[:-1] if last is not None else durations
+        change = ""
+        if last is not None and baseline:
+            median = get_percentile(baseline, 0.5)
+            if median:
+                change = f"{(last - median) / median * 100:+.0f}%"
+        lines.append(
+            f"{line:5} | {history['type'][:17]:<17} | {len(durations):4} "
+            + f"| {get_percentile(durations, 0.5) * 1000:8.1f} "
+            + f"| {get_percentile(durations, 0.9) * 1000:8.1f} "
+            + f"| {max(durations) * 1000:8.1f} "
+            + f"| {last * 1000 if last is not None else 0:8.1f} "
+            + f"| {change}{' REGRESSED' if line in regressed else ''}"
+        )
+    return lines
+
+
+class HistoryRecorder:
+    """
+    Collects the records of all steps of a run and appends them to the
+    history, when the run finished.
+
+    The durations of the runs before estimate the time left while the
+    calls are made.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        project_path: Path,
+        calls_path: Path,
+        output_path: Optional[Path] = None,
+        calls: Optional[List[Dict[str, Any]]] = None,
+        jobs: int = 1,
+    ) -> None:
+        self.path = path
+        self.project, self.calls = get_calls_key(project_path, calls_path)
+        self.output = output_path.as_posix() if output_path else None
+        self.lock = Lock()
+        self.records: List[StepRecord] = []
+        self.started = time()
+        self.jobs = max(jobs, 1)
+        self.durations: Dict[int, float] = {}
+        try:
+            self.durations = get_step_durations(path, self.project, self.calls)
+        except Exception as e:  # pylint: disable=broad-except
+            test_tool_logger.debug("Could not read the history: %s", e)
+
+        # Estimate of every step not made yet
+        self.pending: Dict[int, float] = {}
+        self.last_estimate = perf_counter()
+        if calls and self.durations:
+            mean = sum(self.durations.values()) / len(self.durations)
+            self.pending = {
+                test.get("line", 0): self.durations.get(
+                    test.get("line", 0), mean
+                )
+                for test in calls
+            }
+            test_tool_logger.info(
+                "The calls are expected to take %.1f s",
+                sum(self.pending.values()) / self.jobs,
+            )
+
+    def add(self, record: StepRecord) -> None:
+        """
+        Add the record of a finished step.
+
+        Parameters
+        ----------
+        record : StepRecord
+            The record of the step.
+        """
+        with self.lock:
+            self.records.append(record)
+            if not self.pending:
+                return
+            self.pending.pop(record["line"], None)
+            now = perf_counter()
+            if now - self.last_estimate < ETA_INTERVAL:
+                return
+            self.last_estimate = now
+            left = sum(self.pending.values()) / self.jobs
+            made = len(self.records)
+        test_tool_logger.info(
+            "Made %s of %s calls, about %.0f s left",
+            made,
+            made + len(self.pending),
+            left,
+        )
+
+    def close(self) -> None:
+        """
+        Append the run to the history and warn about slower steps.
+        """
+        if not self.records:
+            return
+        try:
+            with closing(connect_history(self.path)) as connection:
+                with connection:
+                    cursor = connection.execute(
+                        "INSERT INTO runs (project, calls, started, output, "
+                        + "steps, errors) VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            self.project,
+                            self.calls,
+                            self.started,
+                            self.output,
+                            len(self.records),
+                            sum(record["error"] for record in self.records),
+                        ),
+                    )
+                    connection.executemany(
+                        "INSERT INTO steps (run, step, line, type, error, "
+                        + "wall, cpu) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (
+                                cursor.lastrowid,
+                                record["step"],
+                                record["line"],
+                                record["type"],
+                                record["error"],
+                                record["wall"],
+                                record["cpu"],
+                            )
+                            for record in self.records
+                        ],
+                    )
+            last_run, histories = get_step_histories(
+                self.path, self.project, self.calls
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            test_tool_logger.warning("Could not write the history: %s", e)
+            return
+
+        for regression in find_regressions(last_run, histories):
+            test_tool_logger.warning(
+                "Call from line %s took %.1f ms, %.0f%% longer than the "
+                + "%.1f ms of the runs before",
+                regression["line"],
+                regression["last"] * 1000,
+                (regression["last"] / regression["baseline"] - 1) * 100
+                if regression["baseline"]
+                else 100,
+                regression["baseline"] * 1000,
+            )
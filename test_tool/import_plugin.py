@@ -1,15 +1,23 @@
 """
 In this file, we import the necessary modules for the test tool to run.
 """
+import sys
 from copy import deepcopy
 from importlib import import_module
+from importlib.util import find_spec
 from logging import getLogger
+from pathlib import Path
 from types import FunctionType
-from typing import Any, Callable, Dict, TypedDict
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple, TypedDict
+
+from test_tool.substitute import Variables, find_variables
 
 # Get the logger
 test_tool_logger = getLogger("test-tool")
 
+# Calls a plugin function with the call, data and path of a step
+Invoker = Callable[[Dict[str, Any], Dict[str, Any], Path], Any]
+
 
 class CallType(TypedDict):
     """
@@ -19,6 +27,20 @@ class CallType(TypedDict):
     default_call: Dict[str, Any]
     augment_call: Callable
     make_call: Callable
+    default_variables: Optional[Variables]
+    invoke_augment_call: Invoker
+    invoke_make_call: Invoker
+    augment_call_async: Optional[Callable]
+    make_call_async: Optional[Callable]
+    invoke_augment_call_async: Optional[Invoker]
+    invoke_make_call_async: Optional[Invoker]
+    cacheable_call: Optional[Callable]
+    invoke_cacheable_call: Optional[Invoker]
+    estimate_call: Optional[Callable]
+    invoke_estimate_call: Optional[Invoker]
+    setup: Optional[Callable]
+    teardown: Optional[Callable]
+    version: Optional[str]
 
 
 # Plugin Name Templates
@@ -29,21 +51,229 @@ PLUGIN_TEMPLATE: Dict[str, str] = {
     "default_call": "default_${plugin}_call",
     "augment_call": "augment_${plugin}_call",
     "make_call": "make_${plugin}_call",
+    "augment_call_async": "augment_${plugin}_call_async",
+    "make_call_async": "make_${plugin}_call_async",
+    "cacheable_call": "cacheable_${plugin}_call",
+    "estimate_call": "estimate_${plugin}_call",
+    "setup": "setup_${plugin}",
+    "teardown": "teardown_${plugin}",
 }
 
 PLUGIN_COMPONENT_TYPES: Dict[str, type] = {
     "default_call": dict,
     "augment_call": FunctionType,
     "make_call": FunctionType,
+    "augment_call_async": FunctionType,
+    "make_call_async": FunctionType,
+    "cacheable_call": FunctionType,
+    "estimate_call": FunctionType,
+    "setup": FunctionType,
+    "teardown": FunctionType,
+}
+
+# Arguments passed to the plugin functions, if they take them
+PLUGIN_ARGUMENTS: Dict[str, Tuple[str, ...]] = {
+    "augment_call": ("call", "data", "path"),
+    "make_call": ("call", "data"),
+    "augment_call_async": ("call", "data", "path"),
+    "make_call_async": ("call", "data"),
+    "cacheable_call": ("call", "path"),
+    "estimate_call": ("call", "path"),
 }
 
 PLUGIN_DEFAULT: CallType = {
     "default_call": {},
     "augment_call": lambda *args, **kwargs: None,
     "make_call": lambda *args, **kwargs: None,
+    "default_variables": None,
+    "invoke_augment_call": lambda call, data, path: None,
+    "invoke_make_call": lambda call, data, path: None,
+    "augment_call_async": None,
+    "make_call_async": None,
+    "invoke_augment_call_async": None,
+    "invoke_make_call_async": None,
+    "cacheable_call": None,
+    "invoke_cacheable_call": None,
+    "estimate_call": None,
+    "invoke_estimate_call": None,
+    "setup": None,
+    "teardown": None,
+    "version": None,
+}
+
+# Invokers for every combination of arguments a plugin function can take
+INVOKERS: Dict[FrozenSet[str], Callable[[Callable], Invoker]] = {
+    frozenset(): lambda function: (lambda call, data, path: function()),
+    frozenset(["call"]): lambda function: (
+        lambda call, data, path: function(call=call)
+    ),
+    frozenset(["data"]): lambda function: (
+        lambda call, data, path: function(data=data)
+    ),
+    frozenset(["path"]): lambda function: (
+        lambda call, data, path: function(path=path)
+    ),
+    frozenset(["call", "data"]): lambda function: (
+        lambda call, data, path: function(call=call, data=data)
+    ),
+    frozenset(["call", "path"]): lambda function: (
+        lambda call, data, path: function(call=call, path=path)
+    ),
+    frozenset(["data", "path"]): lambda function: (
+        lambda call, data, path: function(data=data, path=path)
+    ),
+    frozenset(["call", "data", "path"]): lambda function: (
+        lambda call, data, path: function(call=call, data=data, path=path)
+    ),
 }
 
 
+def plugin_arguments(*arguments: str) -> Callable[[Callable], Callable]:
+    """
+    Declare the arguments a plugin function takes.
+
+    Without the declaration, the arguments are read from the signature of
+    the function when the plugin is imported.
+
+    Parameters
+    ----------
+    *arguments : str
+        Names of the arguments, out of call, data and path.
+
+    Returns
+    -------
+    Callable[[Callable], Callable]
+        Decorator setting the arguments of the function.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        function.plugin_arguments = arguments  # type: ignore
+        return function
+
+    return decorator
+
+
+def build_invoker(
+    function: Callable, allowed_arguments: Tuple[str, ...]
+) -> Invoker:
+    """
+    Build an invoker passing the arguments a plugin function takes.
+
+    Parameters
+    ----------
+    function : Callable
+        The plugin function.
+    allowed_arguments : Tuple[str, ...]
+        Arguments which can be passed to the function.
+
+    Returns
+    -------
+    Invoker
+        Function calling the plugin function with call, data and path.
+
+    Raises
+    ------
+    AttributeError
+        If the declared arguments can not be passed to the function.
+    """
+    declared = getattr(function, "plugin_arguments", None)
+    if declared is None:
+        # The positional arguments, like inspect.getfullargspec without
+        # importing inspect
+        code = function.__code__
+        arguments = frozenset(
+            code.co_varnames[: code.co_argcount]
+        ).intersection(allowed_arguments)
+    else:
+        arguments = frozenset(declared)
+        if not arguments.issubset(allowed_arguments):
+            msg: str = (
+                f"{function.__name__} declares the arguments "
+                + f"{', '.join(declared)}, allowed are "
+                + ", ".join(allowed_arguments)
+            )
+            test_tool_logger.error(msg)
+            raise AttributeError(msg)
+    return INVOKERS[arguments](function)
+
+
+def build_sync_invoker(invoker_async: Invoker) -> Invoker:
+    """
+    Build an invoker running a coroutine function in an event loop.
+
+    Parameters
+    ----------
+    invoker_async : Invoker
+        Invoker of the coroutine function.
+
+    Returns
+    -------
+    Invoker
+        Function running the coroutine function to completion.
+    """
+
+    def invoker(call: Dict[str, Any], data: Dict[str, Any], path: Path) -> Any:
+        # Only plugins with coroutine functions need asyncio
+        import asyncio
+
+        return asyncio.run(invoker_async(call, data, path))
+
+    return invoker
+
+
+def find_plugin(plugin: str) -> Tuple[str, Optional[str]]:
+    """
+    Find the module of the plugin for a call type.
+
+    Parameters
+    ----------
+    plugin : str
+        Name of the plugin.
+
+    Returns
+    -------
+    Tuple[str, Optional[str]]
+        The module and the version from the plugin index, the module
+        following the naming convention and None if the plugin is not
+        indexed.
+    """
+    # Only runs need the index, it is slow to import
+    from test_tool.registry import get_plugin_index
+
+    entry = get_plugin_index()["plugins"].get(plugin.upper())
+    if entry is not None:
+        return entry["module"], entry["version"]
+    return PLUGIN_NAME_TEMPLATE.replace("${plugin}", plugin.lower()), None
+
+
+def is_plugin_available(plugin: str) -> bool:
+    """
+    Check if there is a plugin for a call type without importing it.
+
+    Parameters
+    ----------
+    plugin : str
+        Name of the plugin.
+
+    Returns
+    -------
+    bool
+        True if the plugin is indexed or can be found, False otherwise.
+    """
+    from test_tool.registry import get_plugin_index
+
+    if plugin.upper() in get_plugin_index()["plugins"]:
+        return True
+    # Added after the index was built, e.g. a module next to the project
+    module_name = PLUGIN_NAME_TEMPLATE.replace("${plugin}", plugin.lower())
+    if module_name in sys.modules:
+        return True
+    try:
+        return find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
 def import_plugin(plugin: str, loaded_call_types: Dict[str, CallType]) -> bool:
     """
     Dynamically import the specified plugin as a module.
@@ -58,16 +288,14 @@ def import_plugin(plugin: str, loaded_call_types: Dict[str, CallType]) -> bool:
     bool
         True if the plugin was loaded successfully, False otherwise.
     """
+    module_name, version = find_plugin(plugin)
     try:
-        plugin_module = import_module(
-            PLUGIN_NAME_TEMPLATE.replace("${plugin}", plugin.lower())
-        )
+        plugin_module = import_module(module_name)
     except ModuleNotFoundError:
         test_tool_logger.error(
-            "Plugin %s not found, try to install it with pip install"
-            + " test_tool_%s_plugin",
+            "Plugin %s not found, try to install it with pip install %s",
             plugin,
-            plugin.lower(),
+            module_name,
         )
         return False
 
@@ -87,15 +315,58 @@ def import_plugin(plugin: str, loaded_call_types: Dict[str, CallType]) -> bool:
         except AttributeError:
             # We can ignore this error, because default value is set
             pass
-        if not isinstance(
-            loaded_plugin[key], PLUGIN_COMPONENT_TYPES[key]  # type: ignore
-        ):
+        value = loaded_plugin[key]  # type: ignore
+        if value is None:
+            # The async, cacheable, estimate, setup and teardown functions are
+            # optional
+            continue
+        if not isinstance(value, PLUGIN_COMPONENT_TYPES[key]):
             msg: str = (
-                f"Module test_tool_{plugin.lower()}_plugin is not a valid "
+                f"Module {module_name} is not a valid "
                 + f"plugin, {component} is not a {PLUGIN_COMPONENT_TYPES[key]}"
             )
             test_tool_logger.error(msg)
             raise AttributeError(msg)
+        if key.endswith("_async"):
+            # Only plugins with async functions need inspect, which is slow
+            # to import
+            from inspect import iscoroutinefunction
+
+            if not iscoroutinefunction(value):
+                msg = (
+                    f"Module {module_name} is not a valid "
+                    + f"plugin, {component} is not a coroutine function"
+                )
+                test_tool_logger.error(msg)
+                raise AttributeError(msg)
+
+    # Inspect the plugin functions once, instead of on every call
+    for key in PLUGIN_ARGUMENTS:
+        if loaded_plugin[key] is not None:  # type: ignore
+            loaded_plugin[f"invoke_{key}"] = build_invoker(  # type: ignore
+                loaded_plugin[key], PLUGIN_ARGUMENTS[key]  # type: ignore
+            )
+
+    # Without a sync function, the coroutine function is run by the sync
+    # engine in an event loop of its own
+    for key in ("augment_call", "make_call"):
+        invoker_async = loaded_plugin[f"invoke_{key}_async"]  # type: ignore
+        if invoker_async is not None and not hasattr(
+            plugin_module, to_load[key]
+        ):
+            loaded_plugin[f"invoke_{key}"] = build_sync_invoker(  # type: ignore
+                invoker_async
+            )
+
+    # Results cached by a plugin of another version are not used
+    loaded_plugin["version"] = version or getattr(
+        plugin_module, "__version__", None
+    )
+
+    # Find the variables of the default call once
+    loaded_plugin["default_variables"] = find_variables(
+        loaded_plugin["default_call"]
+    )
 
     loaded_call_types[plugin] = loaded_plugin
     return True
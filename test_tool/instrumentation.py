@@ -0,0 +1,223 @@
+"""
+This module contains the instrumentation of the steps.
+
+Every step is split into phases, the wall and CPU time of each phase is
+recorded and written as JSON lines into the output folder.
+"""
+from contextlib import contextmanager
+from heapq import heappush, heappushpop
+from json import dumps
+from logging import getLogger
+from pathlib import Path
+from threading import Lock
+from time import perf_counter, thread_time
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+from typing import TypedDict
+
+from test_tool import trace
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+# The phases of a step, in the order they are run
+PHASES: Tuple[str, ...] = (
+    "load",
+    "merge",
+    "substitute",
+    "augment",
+    "resubstitute",
+    "make",
+)
+
+# Phases running the code of the plugin, all others are engine overhead
+PLUGIN_PHASES: Tuple[str, ...] = ("augment", "make")
+
+# File in the output folder, the records are written to
+TIMINGS_FILE: str = "timings.jsonl"
+
+# Number of steps shown in the summary
+SLOWEST_STEPS: int = 5
+
+
+class PhaseTiming(TypedDict):
+    """
+    Timing of a phase in seconds.
+    """
+
+    wall: float
+    cpu: float
+
+
+class StepRecord(TypedDict):
+    """
+    Record of a step.
+    """
+
+    step: int
+    line: int
+    type: str
+    error: bool
+    wall: float
+    cpu: float
+    phases: Dict[str, PhaseTiming]
+
+
+def create_step_record(idx: int, test: Dict[str, Any]) -> StepRecord:
+    """
+    Create the record of a step.
+
+    Parameters
+    ----------
+    idx : int
+        Index of the call in the calls config.
+    test : Dict[str, Any]
+        The call from the config.
+
+    Returns
+    -------
+    StepRecord
+        The empty record.
+    """
+    return {
+        "step": idx + 1,
+        "line": test.get("line", 0),
+        "type": test.get("type", "ASSERT"),
+        "error": False,
+        "wall": 0.0,
+        "cpu": 0.0,
+        "phases": {},
+    }
+
+
+@contextmanager
+def measure_phase(record: StepRecord, phase: str) -> Iterator[None]:
+    """
+    Measure the wall and CPU time of a phase of a step.
+
+    The CPU time is measured for the current thread, so it is correct
+    while steps are run in parallel.
+
+    Parameters
+    ----------
+    record : StepRecord
+        The record of the step.
+    phase : str
+        Name of the phase.
+    """
+    wall = perf_counter()
+    cpu = thread_time()
+    try:
+        yield
+    finally:
+        end = perf_counter()
+        timing: PhaseTiming = {
+            "wall": end - wall,
+            "cpu": thread_time() - cpu,
+        }
+        if trace.active_tracer is not None:
+            trace.active_tracer.add_span(phase, "phase", wall, end)
+        record["phases"][phase] = timing
+        record["wall"] += timing["wall"]
+        record["cpu"] += timing["cpu"]
+
+
+class TimingRecorder:
+    """
+    Collects the records of all steps of a run.
+
+    Every record is written to the output folder right away, only the
+    totals and the slowest steps are kept for the summary.
+    """
+
+    def __init__(self, output_path: Optional[Path] = None) -> None:
+        self.lock = Lock()
+        self.steps = 0
+        self.totals: Dict[str, PhaseTiming] = {
+            phase: {"wall": 0.0, "cpu": 0.0} for phase in PHASES
+        }
+        self.slowest: List[Tuple[float, int, StepRecord]] = []
+        self.file: Optional[TextIO] = None
+        if output_path is not None:
+            self.file = open(
+                output_path.joinpath(TIMINGS_FILE), "a", encoding="utf-8"
+            )
+
+    def add(self, record: StepRecord) -> None:
+        """
+        Add the record of a finished step.
+
+        Parameters
+        ----------
+        record : StepRecord
+            The record of the step.
+        """
+        with self.lock:
+            self.steps += 1
+            for phase, timing in record["phases"].items():
+                self.totals[phase]["wall"] += timing["wall"]
+                self.totals[phase]["cpu"] += timing["cpu"]
+
+            # The count breaks ties, records from several runs repeat steps
+            entry = (record["wall"], self.steps, record)
+            if len(self.slowest) < SLOWEST_STEPS:
+                heappush(self.slowest, entry)
+            else:
+                heappushpop(self.slowest, entry)
+
+            if self.file is not None:
+                self.file.write(dumps(record) + "\n")
+
+    def close(self) -> None:
+        """
+        Close the file of the records.
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def summary(self) -> List[str]:
+        """
+        Create a summary of the slowest steps and the engine overhead.
+
+        Returns
+        -------
+        List[str]
+            The lines of the summary.
+        """
+        wall = sum(timing["wall"] for timing in self.totals.values())
+        plugin = sum(self.totals[phase]["wall"] for phase in PLUGIN_PHASES)
+        engine = wall - plugin
+
+        lines = [
+            f"Timing of {self.steps} steps: {wall * 1000:.1f} ms, "
+            + f"engine {engine * 1000:.1f} ms "
+            + f"({engine / wall * 100 if wall else 0:.1f}%), "
+            + f"plugins {plugin * 1000:.1f} ms "
+            + f"({plugin / wall * 100 if wall else 0:.1f}%)",
+            "Phase         |    Wall ms |     CPU ms",
+        ]
+        for phase in PHASES:
+            lines.append(
+                f"{phase:<13} | {self.totals[phase]['wall'] * 1000:10.1f} "
+                + f"| {self.totals[phase]['cpu'] * 1000:10.1f}"
+            )
+
+        lines.append(
+            "Step  |  Line | Type              |    Wall ms |     CPU ms "
+            + "| Engine %"
+        )
+        for _, _, record in sorted(self.slowest, reverse=True):
+            step_plugin = sum(
+                record["phases"][phase]["wall"]
+                for phase in PLUGIN_PHASES
+                if phase in record["phases"]
+            )
+            step_engine = record["wall"] - step_plugin
+            share = step_engine / record["wall"] * 100 if record["wall"] else 0
+            lines.append(
+                f"{record['step']:5} | {record['line']:5} "
+                + f"| {record['type'][:17]:<17} "
+                + f"| {record['wall'] * 1000:10.1f} "
+                + f"| {record['cpu'] * 1000:10.1f} | {share:8.1f}"
+            )
+        return lines
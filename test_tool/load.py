@@ -0,0 +1,442 @@
+"""
+This module contains the load mode, running the calls file repeatedly.
+
+The calls run in parallel virtual users, every iteration with its own copy
+of the data. Every virtual user records the latencies of the steps in its
+own histograms, which are merged when all users finished, so no lock is
+shared while the calls are made.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from copy import deepcopy
+from json import dump
+from logging import getLogger
+from math import ceil, log
+from pathlib import Path
+from threading import Event
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
+
+from test_tool import CallType
+from test_tool.base import Call, import_plugin, make_call
+from test_tool.instrumentation import create_step_record
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+# File in the output folder, the report is written to
+LOAD_FILE: str = "load.json"
+
+# Latencies up to this are counted in the first bucket, in seconds
+MIN_LATENCY: float = 1e-6
+
+# Relative width of a bucket, the error of the percentiles
+BUCKET_WIDTH: float = 0.01
+
+# The percentiles in the report
+PERCENTILES: Tuple[Tuple[str, float], ...] = (
+    ("p50", 0.5),
+    ("p90", 0.9),
+    ("p99", 0.99),
+)
+
+
+class Histogram:
+    """
+    Histogram of latencies in buckets of exponentially growing width.
+
+    Histograms are merged by adding the counts of their buckets.
+    """
+
+    def __init__(self) -> None:
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency: float, error: bool = False) -> None:
+        """
+        Add the latency of a step.
+
+        Parameters
+        ----------
+        latency : float
+            The latency in seconds.
+        error : bool, optional
+            The step failed, by default False.
+        """
+        bucket = get_bucket(latency)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.errors += error
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    def merge(self, other: "Histogram") -> None:
+        """
+        Add the latencies of another histogram.
+
+        Parameters
+        ----------
+        other : Histogram
+            The histogram to add.
+        """
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.errors += other.errors
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, quantile: float) -> float:
+        """
+        Get a percentile of the latencies.
+
+        Parameters
+        ----------
+        quantile : float
+            The quantile, between 0 and 1.
+
+        Returns
+        -------
+        float
+            The upper bound of the bucket holding the percentile in seconds,
+            at most the maximum.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, ceil(quantile * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(get_bucket_bound(bucket), self.max)
+        return self.max
+
+
+def get_bucket(latency: float) -> int:
+    """
+    Get the bucket of a latency.
+
+    Parameters
+    ----------
+    latency : float
+        The latency in seconds.
+
+    Returns
+    -------
+    int
+        The index of the bucket.
+    """
+    if latency <= MIN_LATENCY:
+        return 0
+    return ceil(log(latency / MIN_LATENCY) / log(1 + BUCKET_WIDTH))
+
+
+def get_bucket_bound(bucket: int) -> float:
+    """
+    Get the upper bound of a bucket.
+
+    Parameters
+    ----------
+    bucket : int
+        The index of the bucket.
+
+    Returns
+    -------
+    float
+        The largest latency in the bucket in seconds.
+    """
+    return MIN_LATENCY * (1 + BUCKET_WIDTH) ** bucket
+
+
+class LoadStep(TypedDict):
+    """
+    Latencies of a step of the calls file, in milliseconds.
+    """
+
+    step: int
+    line: int
+    type: str
+    count: int
+    errors: int
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+    buckets: Dict[str, int]
+
+
+class LoadReport(TypedDict):
+    """
+    Report of a load run.
+    """
+
+    concurrency: int
+    iterations: int
+    duration: float
+    steps_per_second: float
+    iterations_per_second: float
+    steps: List[LoadStep]
+
+
+def run_virtual_user(
+    user: int,
+    calls: List[Call],
+    data: Dict[str, Any],
+    path: Path,
+    continue_on_failure: bool,
+    loaded_call_types: Dict[str, CallType],
+    repeat: int,
+    deadline: Optional[float],
+    stop: Event,
+) -> Tuple[List[Histogram], int]:
+    """
+    Run the calls repeatedly as a virtual user.
+
+    Parameters
+    ----------
+    user : int
+        Number of the virtual user.
+    calls : List[Call]
+        The calls.
+    data : Dict[str, Any]
+        Data every iteration starts with.
+    path : Path
+        Path to the project.
+    continue_on_failure : bool
+        Continue an iteration on error.
+    loaded_call_types : Dict[str, CallType]
+        The loaded plugins of all calls.
+    repeat : int
+        Number of iterations, 0 to repeat until the deadline.
+    deadline : Optional[float]
+        Performance counter no iteration starts after.
+    stop : Event
+        Set to stop the user after the current step.
+
+    Returns
+    -------
+    Tuple[List[Histogram], int]
+        The histograms of the steps and the number of iterations.
+    """
+    histograms = [Histogram() for _ in calls]
+    iteration = 0
+    while not stop.is_set():
+        if repeat and iteration >= repeat:
+            break
+        if deadline is not None and perf_counter() >= deadline:
+            break
+        iteration_data = deepcopy(data)
+        iteration_data["VIRTUAL_USER"] = user
+        iteration_data["ITERATION"] = iteration
+        for idx, test in enumerate(calls):
+            if stop.is_set():
+                break
+            record = create_step_record(idx, test)  # type: ignore
+            error = make_call(
+                idx, test, iteration_data, path, loaded_call_types, record
+            )
+            histograms[idx].add(record["wall"], error)
+            if error and not continue_on_failure:
+                break
+        iteration += 1
+    return histograms, iteration
+
+
+def create_load_report(
+    calls: List[Call],
+    histograms: List[Histogram],
+    concurrency: int,
+    iterations: int,
+    duration: float,
+) -> LoadReport:
+    """
+    Create the report of the merged histograms.
+
+    Parameters
+    ----------
+    calls : List[Call]
+        The calls.
+    histograms : List[Histogram]
+        The merged histogram of every call.
+    concurrency : int
+        Number of virtual users.
+    iterations : int
+        Number of iterations of all users.
+    duration : float
+        Wall time of the run in seconds.
+
+    Returns
+    -------
+    LoadReport
+        The report.
+    """
+    steps: List[LoadStep] = []
+    for idx, (test, histogram) in enumerate(zip(calls, histograms)):
+        record = create_step_record(idx, test)  # type: ignore
+        step: LoadStep = {
+            "step": record["step"],
+            "line": record["line"],
+            "type": record["type"],
+            "count": histogram.count,
+            "errors": histogram.errors,
+            "mean": (
+                histogram.total / histogram.count * 1000
+                if histogram.count
+                else 0.0
+            ),
+            "p50": 0.0,
+            "p90": 0.0,
+            "p99": 0.0,
+            "max": histogram.max * 1000,
+            "buckets": {
+                str(bucket): count
+                for bucket, count in sorted(histogram.buckets.items())
+            },
+        }
+        for name, quantile in PERCENTILES:
+            step[name] = histogram.percentile(quantile) * 1000  # type: ignore
+        steps.append(step)
+
+    made = sum(step["count"] for step in steps)
+    return {
+        "concurrency": concurrency,
+        "iterations": iterations,
+        "duration": duration,
+        "steps_per_second": made / duration if duration else 0.0,
+        "iterations_per_second": iterations / duration if duration else 0.0,
+        "steps": steps,
+    }
+
+
+def summarize_load_report(report: LoadReport) -> List[str]:
+    """
+    Create a summary of the report.
+
+    Parameters
+    ----------
+    report : LoadReport
+        The report.
+
+    Returns
+    -------
+    List[str]
+        The lines of the summary.
+    """
+    lines = [
+        f"Load of {report['concurrency']} users: "
+        + f"{report['iterations']} iterations in {report['duration']:.1f} s, "
+        + f"{report['iterations_per_second']:.1f} iterations/s, "
+        + f"{report['steps_per_second']:.1f} steps/s",
+        "Step  |  Line | Type              |  Count | Errors "
+        + "|   p50 ms |   p90 ms |   p99 ms |   max ms",
+    ]
+    for step in report["steps"]:
+        lines.append(
+            f"{step['step']:5} | {step['line']:5} "
+            + f"| {step['type'][:17]:<17} | {step['count']:6} "
+            + f"| {step['errors']:6} | {step['p50']:8.1f} "
+            + f"| {step['p90']:8.1f} | {step['p99']:8.1f} "
+            + f"| {step['max']:8.1f}"
+        )
+    return lines
+
+
+def run_load(
+    calls: List[Call],
+    data: Dict[str, Any],
+    path: Path,
+    continue_on_failure: bool,
+    repeat: int,
+    concurrency: int,
+    duration: float = 0.0,
+    output_path: Optional[Path] = None,
+) -> int:
+    """
+    Run the calls repeatedly in parallel virtual users.
+
+    Parameters
+    ----------
+    calls : List[Call]
+        The calls.
+    data : Dict[str, Any]
+        Data every iteration starts with.
+    path : Path
+        Path to the project.
+    continue_on_failure : bool
+        Continue an iteration on error.
+    repeat : int
+        Number of iterations of every user, 0 to repeat until the
+        duration passed.
+    concurrency : int
+        Number of virtual users.
+    duration : float, optional
+        Seconds after which no iteration starts, by default no limit.
+    output_path : Optional[Path], optional
+        Folder the report is written to, by default None.
+
+    Returns
+    -------
+    int
+        Number of failed steps.
+    """
+    # The users share the plugins, so they are loaded upfront
+    loaded_call_types: Dict[str, CallType] = {}
+    for call_type in {test.get("type", "ASSERT") for test in calls}:
+        import_plugin(call_type, loaded_call_types)
+
+    stop = Event()
+    start = perf_counter()
+    deadline = start + duration if duration else None
+    test_tool_logger.info(
+        "Running %s calls with %s users", len(calls), concurrency
+    )
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="test-tool-user"
+    ) as executor:
+        futures = [
+            # The users make their calls for the run, like the run's thread
+            executor.submit(
+                copy_context().run,
+                run_virtual_user,
+                user,
+                calls,
+                data,
+                path,
+                continue_on_failure,
+                loaded_call_types,
+                repeat,
+                deadline,
+                stop,
+            )
+            for user in range(concurrency)
+        ]
+        try:
+            results = [future.result() for future in futures]
+        except BaseException:
+            # E.g. Ctrl-C, the users stop after their current step
+            stop.set()
+            raise
+    elapsed = perf_counter() - start
+
+    merged = [Histogram() for _ in calls]
+    iterations = 0
+    for histograms, user_iterations in results:
+        iterations += user_iterations
+        for histogram, user_histogram in zip(merged, histograms):
+            histogram.merge(user_histogram)
+
+    report = create_load_report(
+        calls, merged, concurrency, iterations, elapsed
+    )
+    for line in summarize_load_report(report):
+        test_tool_logger.info(line)
+    if output_path is not None:
+        with open(
+            output_path.joinpath(LOAD_FILE), "w", encoding="utf-8"
+        ) as file:
+            dump(report, file, indent=2)
+    return sum(histogram.errors for histogram in merged)
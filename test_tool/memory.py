@@ -0,0 +1,230 @@
+"""
+This module contains the memory accounting of the steps.
+
+The allocations of every step are traced with tracemalloc, together with
+the change of the resident set size and the size of the data. Steps
+leaving large objects behind are flagged.
+"""
+import sys
+import tracemalloc
+from json import dumps
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, TextIO, Tuple, TypedDict
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+# File in the output folder, the records are written to
+MEMORY_FILE: str = "memory.jsonl"
+
+# Steps leaving more bytes behind are flagged
+LEAK_THRESHOLD: int = 10 * 1024 * 1024
+
+# The values of all keys are measured again after this many steps, else
+# only the values, which were replaced or added
+DATA_SAMPLE_STEPS: int = 100
+
+
+class MemoryRecord(TypedDict):
+    """
+    Memory record of a step, all sizes in bytes.
+    """
+
+    step: int
+    line: int
+    type: str
+    peak: int
+    net: int
+    rss: int
+    data: int
+    leak: bool
+
+
+def get_rss() -> int:
+    """
+    Get the resident set size of the process.
+
+    Returns
+    -------
+    int
+        The resident set size in bytes, 0 if it is not available.
+    """
+    try:
+        from os import sysconf
+
+        with open("/proc/self/statm", "r", encoding="utf-8") as file:
+            return int(file.read().split()[1]) * sysconf("SC_PAGE_SIZE")
+    except (ImportError, OSError, ValueError):
+        pass
+    try:
+        # The maximum is the best there is without procfs
+        from resource import RUSAGE_SELF, getrusage
+
+        rss = getrusage(RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+    except ImportError:
+        return 0
+
+
+def get_size(value: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    Get the size of a value and all values within.
+
+    Parameters
+    ----------
+    value : Any
+        The value.
+    seen : Optional[Set[int]], optional
+        Ids of the values already counted, by default None.
+
+    Returns
+    -------
+    int
+        The size in bytes.
+    """
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, element in dict.items(value):
+            size += get_size(key, seen) + get_size(element, seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for element in value:
+            size += get_size(element, seen)
+    return size
+
+
+class MemoryRecorder:
+    """
+    Traces the memory used by the steps of a run.
+
+    Every record is written to the output folder right away.
+    """
+
+    def __init__(self, output_path: Optional[Path] = None) -> None:
+        self.started = not tracemalloc.is_tracing()
+        if self.started:
+            tracemalloc.start()
+        self.leaks: List[MemoryRecord] = []
+        self.steps = 0
+        # The value and the size of every key of the data, when it was
+        # measured
+        self.data_sizes: Dict[str, Tuple[Any, int]] = {}
+        self.file: Optional[TextIO] = None
+        if output_path is not None:
+            self.file = open(
+                output_path.joinpath(MEMORY_FILE), "a", encoding="utf-8"
+            )
+
+    def start(self) -> Tuple[int, int]:
+        """
+        Start the accounting of a step.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The traced memory and resident set size before the step.
+        """
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0], get_rss()
+
+    def add(
+        self,
+        record: Dict[str, Any],
+        data: Dict[str, Any],
+        before: Tuple[int, int],
+    ) -> MemoryRecord:
+        """
+        Add the memory record of a finished step.
+
+        Parameters
+        ----------
+        record : Dict[str, Any]
+            The record of the step.
+        data : Dict[str, Any]
+            Data used for the calls.
+        before : Tuple[int, int]
+            The traced memory and resident set size before the step.
+
+        Returns
+        -------
+        MemoryRecord
+            The memory record of the step.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        memory: MemoryRecord = {
+            "step": record["step"],
+            "line": record["line"],
+            "type": record["type"],
+            "peak": peak - before[0],
+            "net": current - before[0],
+            "rss": get_rss() - before[1],
+            "data": self.get_data_size(data),
+            "leak": current - before[0] > LEAK_THRESHOLD,
+        }
+        if memory["leak"]:
+            test_tool_logger.warning(
+                "Step %s from line %s left %.1f MiB behind, "
+                + "data is %.1f MiB",
+                memory["step"],
+                memory["line"],
+                memory["net"] / 1024 / 1024,
+                memory["data"] / 1024 / 1024,
+            )
+            self.leaks.append(memory)
+
+        if self.file is not None:
+            self.file.write(dumps(memory) + "\n")
+        return memory
+
+    def get_data_size(self, data: Dict[str, Any]) -> int:
+        """
+        Get the size of the data, measuring only the values which changed.
+
+        A value changed in place is measured again every DATA_SAMPLE_STEPS
+        steps.
+
+        Parameters
+        ----------
+        data : Dict[str, Any]
+            Data used for the calls.
+
+        Returns
+        -------
+        int
+            The size in bytes.
+        """
+        self.steps += 1
+        if self.steps % DATA_SAMPLE_STEPS == 0:
+            self.data_sizes = {}
+        sizes: Dict[str, Tuple[Any, int]] = {}
+        for key, value in dict.items(data):
+            known = self.data_sizes.get(key)
+            if known is not None and known[0] is value:
+                sizes[key] = known
+            else:
+                sizes[key] = (value, get_size(key) + get_size(value))
+        self.data_sizes = sizes
+        return sys.getsizeof(data) + sum(size for _, size in sizes.values())
+
+    def close(self) -> None:
+        """
+        Stop tracing and close the file of the records.
+        """
+        if self.started:
+            tracemalloc.stop()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.leaks:
+            test_tool_logger.warning(
+                "%s steps left more than %.1f MiB behind: %s",
+                len(self.leaks),
+                LEAK_THRESHOLD / 1024 / 1024,
+                ", ".join(f"line {memory['line']}" for memory in self.leaks),
+            )
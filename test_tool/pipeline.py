@@ -0,0 +1,362 @@
+"""
+This module contains the pipelining of the calls made one by one.
+
+While a call is made, the next calls are prepared on a thread of their
+own: their variables are substituted and they are augmented, e.g. a JDBC
+driver is downloaded. Only calls of plugins, whose augmenting can be
+repeated without side effects, reading none of the keys, which the calls
+before them write, are prepared and they use a copy of the data. A
+prepared call is discarded, if a key it reads changed until it is made or
+if its augmenting changed the data.
+"""
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from logging import getLogger
+from pathlib import Path
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Set,
+    Tuple,
+    TypedDict,
+)
+
+from test_tool import CallType, trace
+from test_tool.base import Call, prepare_call
+from test_tool.import_plugin import import_plugin, is_plugin_available
+from test_tool.instrumentation import (
+    StepRecord,
+    create_step_record,
+    measure_phase,
+)
+from test_tool.scheduler import DATA_READS, get_written_keys
+from test_tool.substitute import find_referenced_keys
+from test_tool.utils import CopyOnWriteDict
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+# Value of a key missing in the data
+MISSING = object()
+
+# Call types whose augmenting only validates and converts the call or
+# downloads files kept for later calls, so a prepared call can be discarded
+# and augmented again. The REST plugin opens the files of an upload, which
+# would not be closed, other plugins may have unknown side effects.
+PREPARED_CALL_TYPES: Set[str] = {
+    "ASSERT",
+    "COPY_FILES_SSH",
+    "JDBC_SQL",
+    "PYTHON",
+    "READ_JAR_MANIFEST",
+    "RUN_PROCESS",
+    "SELENIUM",
+    "SQL_PLUS",
+    "SSH_CMD",
+}
+
+
+class PreparedCall(TypedDict):
+    """
+    Call substituted and augmented ahead.
+    """
+
+    record: StepRecord
+    call: CopyOnWriteDict
+    substituted: Dict[str, Any]
+
+
+class PipelineStep(TypedDict):
+    """
+    Step in the window of the pipeline.
+    """
+
+    idx: int
+    test: Call
+    reads: Optional[Set[str]]
+    writes: Optional[Set[str]]
+    snapshot: Optional[Dict[str, Any]]
+    future: Optional["Future[Optional[PreparedCall]]"]
+
+
+def is_data_changed(snapshot: Dict[str, Any], data: CopyOnWriteDict) -> bool:
+    """
+    Check if the copy of the data was changed or its values were copied.
+
+    Parameters
+    ----------
+    snapshot : Dict[str, Any]
+        The data the copy was created from.
+    data : CopyOnWriteDict
+        The copy.
+
+    Returns
+    -------
+    bool
+        True if a key was set or removed or a dict or list was accessed,
+        whose changes would be lost.
+    """
+    if len(data) != len(snapshot):
+        return True
+    return any(
+        dict.get(data, key, MISSING) is not value
+        for key, value in snapshot.items()
+    )
+
+
+class CallPipeline:
+    """
+    Prepares the next calls of a run, while a call is made.
+
+    Iterating the pipeline yields every call with its prepared call, or
+    None if the call has to be prepared when it is made.
+    """
+
+    def __init__(
+        self,
+        calls: Iterable[Call],
+        data: Dict[str, Any],
+        path: Path,
+        loaded_call_types: Dict[str, CallType],
+        depth: int,
+        run: Tuple[int, str],
+    ) -> None:
+        self.calls = enumerate(calls)
+        self.data = data
+        self.path = path
+        self.loaded_call_types = loaded_call_types
+        self.depth = depth
+        self.run = run
+        self.window: Deque[PipelineStep] = deque()
+        self.prepared = 0
+        self.discarded = 0
+        # One thread, the calls are augmented in order like without it
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="test-tool-pipeline"
+        )
+
+    def __iter__(
+        self,
+    ) -> Iterator[Tuple[int, Call, Optional[PreparedCall]]]:
+        self.fill()
+        while self.window:
+            step = self.window.popleft()
+            prepared = self.take(step)
+            self.fill()
+            # The data is copied before the call is made
+            self.start(step)
+            yield step["idx"], step["test"], prepared
+
+    def fill(self) -> None:
+        """
+        Read the calls following the call made next into the window.
+        """
+        while len(self.window) < self.depth:
+            try:
+                idx, test = next(self.calls)
+            except StopIteration:
+                return
+            self.window.append(self.analyze(idx, test))
+
+    def analyze(self, idx: int, test: Call) -> PipelineStep:
+        """
+        Find the keys a call reads and writes.
+
+        Parameters
+        ----------
+        idx : int
+            Index of the call in the calls config.
+        test : Call
+            The call from the config.
+
+        Returns
+        -------
+        PipelineStep
+            The step, its reads are None if it can not be prepared ahead
+            and its writes are None if no call after it can.
+        """
+        step: PipelineStep = {
+            "idx": idx,
+            "test": test,
+            "reads": None,
+            "writes": None,
+            "snapshot": None,
+            "future": None,
+        }
+        call_type = test.get("type")
+        # Missing plugins are reported when the call is made
+        if (
+            call_type is None
+            or test.get("barrier", False)
+            or call_type not in self.loaded_call_types
+            and not (
+                is_plugin_available(call_type)
+                and import_plugin(call_type, self.loaded_call_types)
+            )
+        ):
+            return step
+
+        merged: Dict[str, Any] = {
+            **self.loaded_call_types[call_type]["default_call"],
+            **(test.get("call") or {}),
+        }
+        step["writes"] = get_written_keys(call_type, merged)
+        # Explicit dependencies are not visible in the data
+        if (
+            step["writes"] is not None
+            and "depends_on" not in test
+            and call_type in PREPARED_CALL_TYPES
+        ):
+            step["reads"] = find_referenced_keys(merged) | DATA_READS.get(
+                call_type, set()
+            )
+        return step
+
+    def start(self, current: PipelineStep) -> None:
+        """
+        Start preparing the calls in the window, which read none of the
+        keys the calls before them write.
+
+        Parameters
+        ----------
+        current : PipelineStep
+            The step made next.
+        """
+        if current["writes"] is None:
+            return
+        pending: Set[str] = set(current["writes"])
+        for step in self.window:
+            if (
+                step["future"] is None
+                and step["reads"] is not None
+                and not step["reads"] & pending
+            ):
+                snapshot = dict(self.data)
+                step["snapshot"] = snapshot
+                # The calls are prepared for the run, like the run's thread
+                step["future"] = self.executor.submit(
+                    copy_context().run,
+                    self.prepare,
+                    step["idx"],
+                    step["test"],
+                    snapshot,
+                )
+            if step["writes"] is None:
+                return
+            pending.update(step["writes"])
+
+    def prepare(
+        self, idx: int, test: Call, snapshot: Dict[str, Any]
+    ) -> Optional[PreparedCall]:
+        """
+        Substitute and augment a call with a copy of the data.
+
+        Parameters
+        ----------
+        idx : int
+            Index of the call in the calls config.
+        test : Call
+            The call from the config.
+        snapshot : Dict[str, Any]
+            The data when the call was started to be prepared.
+
+        Returns
+        -------
+        Optional[PreparedCall]
+            The prepared call, None if it has to be prepared again when it
+            is made.
+        """
+        record = create_step_record(idx, test)  # type: ignore
+        trace.current_run.set(self.run)
+        trace.current_step.set(f"{record['type']} line {record['line']}")
+
+        prepared = prepare_call(test, snapshot, self.loaded_call_types, record)
+        if prepared is None:
+            return None
+        call, substituted = prepared
+
+        data = CopyOnWriteDict(snapshot)
+        with measure_phase(record, "augment"):
+            try:
+                test_tool_logger.info(
+                    "Augment %s in %s plugin ahead.", idx + 1, test["type"]
+                )
+                self.loaded_call_types[test["type"]]["invoke_augment_call"](
+                    call, data, self.path
+                )
+            except Exception as e:  # pylint: disable=broad-except
+                # Errors are reported when the call is made
+                test_tool_logger.debug(
+                    "Could not augment call %s ahead: %s", idx + 1, e
+                )
+                return None
+
+        if is_data_changed(snapshot, data):
+            test_tool_logger.debug(
+                "Augmenting call %s changed the data, it is augmented again",
+                idx + 1,
+            )
+            return None
+        return {"record": record, "call": call, "substituted": substituted}
+
+    def take(self, step: PipelineStep) -> Optional[PreparedCall]:
+        """
+        Get the prepared call of a step, if the keys it reads are still the
+        same.
+
+        Parameters
+        ----------
+        step : PipelineStep
+            The step made next.
+
+        Returns
+        -------
+        Optional[PreparedCall]
+            The prepared call, None if the call has to be prepared.
+        """
+        if step["future"] is None:
+            return None
+        try:
+            prepared = step["future"].result()
+        except Exception as e:  # pylint: disable=broad-except
+            test_tool_logger.debug(
+                "Could not prepare call %s ahead: %s", step["idx"] + 1, e
+            )
+            prepared = None
+        snapshot: Dict[str, Any] = step["snapshot"] or {}
+        changed = sorted(
+            key
+            for key in step["reads"] or set()
+            if dict.get(self.data, key, MISSING)
+            is not snapshot.get(key, MISSING)
+        )
+        if prepared is None or changed:
+            if changed:
+                test_tool_logger.debug(
+                    "Discarded call %s prepared ahead, %s changed",
+                    step["idx"] + 1,
+                    ", ".join(changed),
+                )
+            self.discarded += 1
+            return None
+        self.prepared += 1
+        return prepared
+
+    def close(self) -> None:
+        """
+        Stop preparing the calls, waiting for the call being prepared.
+        """
+        for step in self.window:
+            if step["future"] is not None:
+                step["future"].cancel()
+        self.executor.shutdown()
+        test_tool_logger.debug(
+            "Prepared %s calls ahead, %s were discarded",
+            self.prepared,
+            self.discarded,
+        )
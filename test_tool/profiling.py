@@ -0,0 +1,171 @@
+"""
+This module contains the profiling of the steps.
+
+The augment and make phases of every step are profiled with cProfile.
+The profile of every step is written as pstats file, and all profiles
+are merged into one pstats file and one file of collapsed stacks, which
+can be read by flame graph tools.
+"""
+from collections import defaultdict
+from cProfile import Profile
+from logging import getLogger
+from pathlib import Path
+from pstats import Stats
+from typing import Any, Dict, List, Optional, Tuple
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+# Folder in the output folder, the profiles of the steps are written to
+PROFILES_FOLDER: str = "profiles"
+
+# Files in the output folder, the merged profile is written to
+MERGED_PROFILE_FILE: str = "profile.pstats"
+COLLAPSED_STACKS_FILE: str = "profile.collapsed"
+
+# Functions of cProfile itself, which are not shown
+IGNORED_FUNCTIONS: Tuple[str, ...] = ("_lsprof.Profiler",)
+
+# Function of a profile as (file, line, name)
+Function = Tuple[str, int, str]
+
+
+def format_function(function: Function) -> str:
+    """
+    Format a function of a profile as frame of a stack.
+
+    Parameters
+    ----------
+    function : Function
+        The function as (file, line, name).
+
+    Returns
+    -------
+    str
+        The frame.
+    """
+    filename, line, name = function
+    if filename == "~":
+        # Built-in functions have no file
+        return name.replace(";", ",")
+    return f"{name} ({Path(filename).name}:{line})".replace(";", ",")
+
+
+def collapse_stats(stats: Dict[Function, Any], root: str) -> Dict[str, float]:
+    """
+    Reconstruct the stacks of a profile.
+
+    A profile only knows the callers of every function, so the time of a
+    function is split onto the stacks by the time spent in it per caller.
+
+    Parameters
+    ----------
+    stats : Dict[Function, Any]
+        The stats of a profile.
+    root : str
+        The frame all stacks start with.
+
+    Returns
+    -------
+    Dict[str, float]
+        The time spent in the last frame of every stack in seconds.
+    """
+    children: Dict[Function, List[Tuple[Function, float]]] = defaultdict(list)
+    roots: List[Tuple[Function, float]] = []
+    for function, (_, _, _, ct, callers) in stats.items():
+        if any(ignored in function[2] for ignored in IGNORED_FUNCTIONS):
+            continue
+        for caller, timing in callers.items():
+            children[caller].append((function, timing[3]))
+        # The time not spent below a known caller is spent at the top
+        root_ct = ct - sum(timing[3] for timing in callers.values())
+        if root_ct > 1e-9:
+            roots.append((function, root_ct))
+
+    stacks: Dict[str, float] = defaultdict(float)
+
+    def walk(
+        function: Function, ct: float, stack: List[str], seen: List[Function]
+    ) -> None:
+        # Share of the total time of the function spent on this stack
+        total_tt, total_ct = stats[function][2:4]
+        share = min(ct / total_ct, 1.0) if total_ct else 0.0
+        stack.append(format_function(function))
+        seen.append(function)
+        if total_tt * share > 0:
+            stacks[";".join(stack)] += total_tt * share
+        for child, child_ct in children[function]:
+            # Recursive calls are already part of the stack
+            if child not in seen:
+                walk(child, child_ct * share, stack, seen)
+        stack.pop()
+        seen.pop()
+
+    for function, ct in roots:
+        walk(function, ct, [root], [])
+    return stacks
+
+
+class ProfileRecorder:
+    """
+    Writes the profiles of the steps of a run.
+    """
+
+    def __init__(self, output_path: Path) -> None:
+        self.output_path = output_path
+        self.profiles_path = output_path.joinpath(PROFILES_FOLDER)
+        self.profiles_path.mkdir(parents=True, exist_ok=True)
+        self.merged: Optional[Stats] = None
+        self.collapsed = open(
+            output_path.joinpath(COLLAPSED_STACKS_FILE), "w", encoding="utf-8"
+        )
+
+    def add(self, record: Dict[str, Any], profiler: Profile) -> None:
+        """
+        Write the profile of a finished step.
+
+        Parameters
+        ----------
+        record : Dict[str, Any]
+            The record of the step.
+        profiler : Profile
+            The profiler of the step.
+        """
+        profiler.create_stats()
+        if not profiler.stats:  # type: ignore
+            # The augment and make phase were not reached
+            return
+
+        profiler.dump_stats(
+            self.profiles_path.joinpath(
+                f"step_{record['step']:05d}_line_{record['line']}.pstats"
+            )
+        )
+        # Tag the stacks with the line of the step in the calls file
+        root = f"line {record['line']} {record['type']}"
+        for stack, seconds in collapse_stats(
+            profiler.stats, root  # type: ignore
+        ).items():
+            microseconds = round(seconds * 1e6)
+            if microseconds:
+                self.collapsed.write(f"{stack} {microseconds}\n")
+
+        # Merging takes the stats from the profiler
+        if self.merged is None:
+            self.merged = Stats(profiler)
+        else:
+            self.merged.add(profiler)
+
+    def close(self) -> None:
+        """
+        Write the merged profile and close the files.
+        """
+        self.collapsed.close()
+        if self.merged is not None:
+            self.merged.dump_stats(
+                self.output_path.joinpath(MERGED_PROFILE_FILE)
+            )
+            test_tool_logger.info(
+                "Profiles written to %s",
+                self.output_path.joinpath(MERGED_PROFILE_FILE),
+            )
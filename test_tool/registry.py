@@ -0,0 +1,295 @@
+"""
+This module contains the index of the installed plugins.
+
+Plugins are found by the entry points of the group
+universal_test_tool.plugins, whose names are the call types and whose
+values are the modules, and by the naming convention test_tool_*_plugin.
+Finding them means importing every plugin, so the index is built once
+and stored in its folder in the cache. It is built again, when a folder on
+the module search path changes, e.g. by installing a package. The folders
+are checked once per run, the lookups of the run use the index in memory.
+"""
+import sys
+from hashlib import sha256
+from importlib import import_module
+from json import dump, load
+from logging import getLogger
+from os import getpid, replace
+from pathlib import Path
+from pkgutil import iter_modules
+from typing import Any, Dict, List, Optional, TypedDict
+
+from test_tool.config_cache import get_store_dir
+from test_tool.import_plugin import PLUGIN_NAME_TEMPLATE, PLUGIN_TEMPLATE
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+# Entry point group of the plugins
+ENTRY_POINT_GROUP: str = "universal_test_tool.plugins"
+
+# Environment variable to change the index folder, empty disables it
+INDEX_DIR_VARIABLE: str = "TEST_TOOL_PLUGINS_DIR"
+
+# Folder of the index in the folder of all caches
+INDEX_FOLDER: str = "plugins"
+
+# File of the index in the index folder
+INDEX_FILE: str = "plugins.json"
+
+# Change when the format of the index changes
+INDEX_VERSION: int = 1
+
+
+class PluginEntry(TypedDict):
+    """
+    Plugin in the index.
+    """
+
+    module: str
+    version: Optional[str]
+    functions: List[str]
+
+
+class PluginIndex(TypedDict):
+    """
+    Index of the installed plugins.
+    """
+
+    version: int
+    fingerprint: str
+    plugins: Dict[str, PluginEntry]
+
+
+# The index of this process, checked against the fingerprint once per run
+loaded_index: Optional[PluginIndex] = None
+
+
+def get_fingerprint() -> str:
+    """
+    Get a fingerprint of the module search path.
+
+    Installing or removing a package changes the modification time of its
+    folder on the path.
+
+    Returns
+    -------
+    str
+        The fingerprint.
+    """
+    # The working directory changes with every run writing its output,
+    # plugins in there are found without the index
+    cwd = Path.cwd().resolve()
+    folders: List[str] = []
+    for folder in sys.path:
+        try:
+            if Path(folder or ".").resolve() == cwd:
+                continue
+            mtime = Path(folder).stat().st_mtime_ns
+        except OSError:
+            continue
+        folders.append(f"{folder}\0{mtime}")
+    return sha256("\n".join(folders).encode("utf-8")).hexdigest()
+
+
+def get_plugin_entry_points() -> List[Any]:
+    """
+    Get the entry points of the plugins.
+
+    Returns
+    -------
+    List[Any]
+        The entry points of the group universal_test_tool.plugins.
+    """
+    # Only needed to build the index, importlib.metadata is slow to import
+    from importlib.metadata import entry_points
+
+    found = entry_points()
+    if hasattr(found, "select"):
+        return list(found.select(group=ENTRY_POINT_GROUP))
+    # Python 3.9 returns a dict of the groups
+    return list(found.get(ENTRY_POINT_GROUP, []))  # type: ignore
+
+
+def create_entry(
+    call_type: str, module_name: str, version: Optional[str]
+) -> Optional[PluginEntry]:
+    """
+    Import a plugin and find its functions.
+
+    Parameters
+    ----------
+    call_type : str
+        The call type of the plugin.
+    module_name : str
+        The module of the plugin.
+    version : Optional[str]
+        The version of the distribution providing the plugin.
+
+    Returns
+    -------
+    Optional[PluginEntry]
+        The entry, None if the plugin can not be imported.
+    """
+    try:
+        module = import_module(module_name)
+    except Exception as e:  # pylint: disable=broad-except
+        test_tool_logger.debug("Could not index %s: %s", module_name, e)
+        return None
+
+    return {
+        "module": module_name,
+        "version": version or getattr(module, "__version__", None),
+        "functions": [
+            key
+            for key, component in PLUGIN_TEMPLATE.items()
+            if hasattr(
+                module, component.replace("${plugin}", call_type.lower())
+            )
+        ],
+    }
+
+
+def build_plugin_index(fingerprint: str) -> PluginIndex:
+    """
+    Build the index by importing all plugins.
+
+    Parameters
+    ----------
+    fingerprint : str
+        The fingerprint of the module search path.
+
+    Returns
+    -------
+    PluginIndex
+        The index.
+    """
+    plugins: Dict[str, PluginEntry] = {}
+    for entry_point in get_plugin_entry_points():
+        call_type = entry_point.name.upper()
+        distribution = getattr(entry_point, "dist", None)
+        entry = create_entry(
+            call_type,
+            entry_point.value.split(":")[0],
+            distribution.version if distribution is not None else None,
+        )
+        if entry is not None and call_type not in plugins:
+            plugins[call_type] = entry
+
+    # Plugins without an entry point only follow the naming convention
+    prefix, suffix = PLUGIN_NAME_TEMPLATE.split("${plugin}")
+    for module_info in iter_modules():
+        name = module_info.name
+        if not name.startswith(prefix) or not name.endswith(suffix):
+            continue
+        call_type = name.removeprefix(prefix).removesuffix(suffix).upper()
+        if call_type in plugins:
+            continue
+        entry = create_entry(call_type, name, None)
+        if entry is not None:
+            plugins[call_type] = entry
+
+    test_tool_logger.debug("Indexed plugins for %s", ", ".join(plugins))
+    return {
+        "version": INDEX_VERSION,
+        "fingerprint": fingerprint,
+        "plugins": plugins,
+    }
+
+
+def load_plugin_index(index_path: Path, fingerprint: str) -> Optional[Any]:
+    """
+    Load the index from the cache.
+
+    Parameters
+    ----------
+    index_path : Path
+        Path to the stored index.
+    fingerprint : str
+        The fingerprint of the module search path.
+
+    Returns
+    -------
+    Optional[Any]
+        The index, None if it is missing or stale.
+    """
+    try:
+        with open(index_path, "r", encoding="utf-8") as file:
+            index = load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:  # pylint: disable=broad-except
+        test_tool_logger.debug("Could not load the plugin index: %s", e)
+        return None
+    if (
+        index.get("version") != INDEX_VERSION
+        or index.get("fingerprint") != fingerprint
+    ):
+        test_tool_logger.debug("The plugin index is stale")
+        return None
+    return index
+
+
+def store_plugin_index(index_path: Path, index: PluginIndex) -> None:
+    """
+    Store the index in the cache.
+
+    Parameters
+    ----------
+    index_path : Path
+        Path to store the index at.
+    index : PluginIndex
+        The index.
+    """
+    temporary_path = index_path.with_suffix(f".{getpid()}.tmp")
+    try:
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            dump(index, file, indent=2)
+        # Concurrent runs never see a part of the index
+        replace(temporary_path, index_path)
+    except Exception as e:  # pylint: disable=broad-except
+        test_tool_logger.debug("Could not store the plugin index: %s", e)
+        temporary_path.unlink(missing_ok=True)
+
+
+def reload_plugin_index() -> None:
+    """
+    Check the index against the module search path on its next use, e.g.
+    at the start of a run of a daemon.
+    """
+    global loaded_index  # pylint: disable=global-statement
+
+    loaded_index = None
+
+
+def get_plugin_index() -> PluginIndex:
+    """
+    Get the index of the installed plugins, building it if needed.
+
+    Returns
+    -------
+    PluginIndex
+        The index.
+    """
+    global loaded_index  # pylint: disable=global-statement
+
+    if loaded_index is not None:
+        return loaded_index
+
+    fingerprint = get_fingerprint()
+
+    index_dir = get_store_dir(INDEX_DIR_VARIABLE, INDEX_FOLDER)
+    index_path = index_dir.joinpath(INDEX_FILE) if index_dir else None
+    index = (
+        load_plugin_index(index_path, fingerprint)
+        if index_path is not None
+        else None
+    )
+    if index is None:
+        index = build_plugin_index(fingerprint)
+        if index_path is not None:
+            store_plugin_index(index_path, index)
+
+    loaded_index = index
+    return index
@@ -0,0 +1,395 @@
+"""
+This module contains the resources of a run, which the plugins share.
+
+Plugins can export setup_<plugin>(context) and teardown_<plugin>(context).
+The setup is called before the first call of the plugin in a run, the
+teardown when the run finished, even if it failed or was interrupted.
+Expensive handles, like SSH clients or database connections, are taken
+from the pools of the run with acquire_resource and are reused by the
+following calls. Nested runs of the SUITE plugin share the resources and
+the plugins set up by the run they are part of.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import sha256
+from logging import getLogger
+from pathlib import Path
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from test_tool.import_plugin import CallType
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+
+def close_nothing(handle: Any) -> None:
+    """
+    Close a handle, which needs no closing.
+
+    Parameters
+    ----------
+    handle : Any
+        The handle.
+    """
+
+
+def get_secret_digest(secret: Any) -> str:
+    """
+    Get a digest of a secret, e.g. a password, to use in the key of a pool.
+
+    The keys of the pools are kept until the run ends, so they should not
+    contain secrets in plain text.
+
+    Parameters
+    ----------
+    secret : Any
+        The secret.
+
+    Returns
+    -------
+    str
+        The digest.
+    """
+    return sha256(str(secret).encode("utf-8")).hexdigest()
+
+
+class ResourceRegistry:
+    """
+    Pools of the handles of a run.
+
+    A handle is taken from its pool while a call uses it and is put back
+    afterwards. Calls running at the same time get handles of their own. If
+    the call using a handle failed, the handle is only put back if its
+    check passes.
+    """
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.idle: Dict[Hashable, List[Any]] = {}
+        # Every handle with the function closing it, in the order created
+        self.handles: List[Tuple[Any, Callable[[Any], None]]] = []
+        self.closed = False
+
+    @contextmanager
+    def acquire(
+        self,
+        key: Hashable,
+        create: Callable[[], Any],
+        close: Callable[[Any], None] = close_nothing,
+        check: Optional[Callable[[Any], bool]] = None,
+    ) -> Iterator[Any]:
+        """
+        Use a pooled handle.
+
+        Parameters
+        ----------
+        key : Hashable
+            The key of the pool, e.g. the host and user of a connection.
+        create : Callable[[], Any]
+            Function creating a handle, if no idle handle is in the pool.
+        close : Callable[[Any], None], optional
+            Function closing a handle, by default nothing is closed.
+        check : Optional[Callable[[Any], bool]], optional
+            Function checking if a handle can still be used, when it was
+            idle or its call failed. By default every idle handle is used
+            and the handles of failed calls are closed.
+
+        Yields
+        ------
+        Iterator[Any]
+            The handle.
+        """
+        handle = self.take(key, close, check)
+        if handle is None:
+            handle = create()
+            with self.lock:
+                self.handles.append((handle, close))
+        try:
+            yield handle
+        except Exception:
+            # A failed call, e.g. an unexpected return code, leaves the
+            # handle usable, unless its check fails, e.g. a connection
+            # closed by the server
+            if check is not None and self.is_usable(handle, check):
+                self.release(key, handle)
+            else:
+                self.discard(handle)
+            raise
+        except BaseException:
+            self.discard(handle)
+            raise
+        self.release(key, handle)
+
+    def release(self, key: Hashable, handle: Any) -> None:
+        """
+        Put a handle back into its pool, or close it if the registry is
+        closed.
+
+        Parameters
+        ----------
+        key : Hashable
+            The key of the pool.
+        handle : Any
+            The handle.
+        """
+        with self.lock:
+            if not self.closed:
+                self.idle.setdefault(key, []).append(handle)
+                return
+        self.discard(handle)
+
+    @staticmethod
+    def is_usable(handle: Any, check: Callable[[Any], bool]) -> bool:
+        """
+        Check if a handle can still be used.
+
+        Parameters
+        ----------
+        handle : Any
+            The handle.
+        check : Callable[[Any], bool]
+            Function checking the handle.
+
+        Returns
+        -------
+        bool
+            True if the check passed.
+        """
+        try:
+            return bool(check(handle))
+        except Exception as e:  # pylint: disable=broad-except
+            test_tool_logger.debug("Could not check a handle: %s", e)
+            return False
+
+    def take(
+        self,
+        key: Hashable,
+        close: Callable[[Any], None],
+        check: Optional[Callable[[Any], bool]],
+    ) -> Optional[Any]:
+        """
+        Take an idle handle from a pool.
+
+        Parameters
+        ----------
+        key : Hashable
+            The key of the pool.
+        close : Callable[[Any], None]
+            Function closing a handle.
+        check : Optional[Callable[[Any], bool]]
+            Function checking if an idle handle can still be used.
+
+        Returns
+        -------
+        Optional[Any]
+            The handle, None if there is no usable idle handle.
+        """
+        while True:
+            with self.lock:
+                idle = self.idle.get(key)
+                if not idle:
+                    return None
+                handle = idle.pop()
+            if check is None or self.is_usable(handle, check):
+                return handle
+            self.discard(handle)
+
+    def discard(self, handle: Any) -> None:
+        """
+        Close a handle and remove it from the registry.
+
+        Parameters
+        ----------
+        handle : Any
+            The handle.
+        """
+        with self.lock:
+            for idx, (known, close) in enumerate(self.handles):
+                if known is handle:
+                    del self.handles[idx]
+                    break
+            else:
+                return
+        try:
+            close(handle)
+        except Exception as e:  # pylint: disable=broad-except
+            test_tool_logger.warning("Could not close a handle: %s", e)
+
+    def close(self) -> None:
+        """
+        Close all handles, the newest first.
+        """
+        with self.lock:
+            self.closed = True
+            self.idle = {}
+            handles, self.handles = self.handles, []
+        for handle, close in reversed(handles):
+            try:
+                close(handle)
+            except Exception as e:  # pylint: disable=broad-except
+                test_tool_logger.warning("Could not close a handle: %s", e)
+
+
+class RunContext:
+    """
+    Context of a run, passed to the setup and teardown of the plugins.
+    """
+
+    def __init__(self, path: Path, output_path: Optional[Path] = None) -> None:
+        self.path = path
+        self.output_path = output_path
+        self.resources = ResourceRegistry()
+        # Plugins can keep their own state of the run in here
+        self.state: Dict[str, Any] = {}
+        self.lock = Lock()
+        self.set_up: List[Tuple[str, Optional[Callable]]] = []
+
+    def setup(self, call_type: str, loaded: CallType) -> None:
+        """
+        Set up a plugin, if it is not set up in this run yet.
+
+        Parameters
+        ----------
+        call_type : str
+            The call type of the plugin.
+        loaded : CallType
+            The loaded plugin.
+        """
+        with self.lock:
+            if any(known == call_type for known, _ in self.set_up):
+                return
+            if loaded["setup"] is not None:
+                test_tool_logger.debug("Set up %s plugin", call_type)
+                loaded["setup"](self)
+            self.set_up.append((call_type, loaded["teardown"]))
+
+    def close(self) -> None:
+        """
+        Close the handles of the run and tear down the plugins, the last
+        set up first.
+        """
+        self.resources.close()
+        with self.lock:
+            set_up, self.set_up = self.set_up, []
+        for call_type, teardown in reversed(set_up):
+            if teardown is None:
+                continue
+            test_tool_logger.debug("Tear down %s plugin", call_type)
+            try:
+                teardown(self)
+            except Exception as e:  # pylint: disable=broad-except
+                test_tool_logger.error(
+                    "Could not tear down %s plugin: %s", call_type, e
+                )
+
+
+# The context of the run the current thread makes calls for
+current_context: ContextVar[Optional[RunContext]] = ContextVar(
+    "current_context", default=None
+)
+
+
+@contextmanager
+def run_context(
+    path: Path, output_path: Optional[Path] = None
+) -> Iterator[RunContext]:
+    """
+    Enter the context of a run.
+
+    A nested run uses the context of the run it is part of, the outermost
+    run closes it.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the project.
+    output_path : Optional[Path], optional
+        The output folder of the run, by default None.
+
+    Yields
+    ------
+    Iterator[RunContext]
+        The context.
+    """
+    context = current_context.get()
+    if context is not None:
+        yield context
+        return
+
+    context = RunContext(path, output_path)
+    token = current_context.set(context)
+    try:
+        yield context
+    finally:
+        current_context.reset(token)
+        context.close()
+
+
+def setup_plugin(call_type: str, loaded: CallType) -> None:
+    """
+    Set up a plugin for the run of the current thread.
+
+    Parameters
+    ----------
+    call_type : str
+        The call type of the plugin.
+    loaded : CallType
+        The loaded plugin.
+    """
+    context = current_context.get()
+    if context is not None:
+        context.setup(call_type, loaded)
+
+
+@contextmanager
+def acquire_resource(
+    key: Hashable,
+    create: Callable[[], Any],
+    close: Callable[[Any], None] = close_nothing,
+    check: Optional[Callable[[Any], bool]] = None,
+) -> Iterator[Any]:
+    """
+    Use a handle of the pools of the current run.
+
+    Outside of a run, e.g. if a plugin function is called on its own, the
+    handle is created and closed right away.
+
+    Parameters
+    ----------
+    key : Hashable
+        The key of the pool, e.g. the host and user of a connection.
+    create : Callable[[], Any]
+        Function creating a handle.
+    close : Callable[[Any], None], optional
+        Function closing a handle, by default nothing is closed.
+    check : Optional[Callable[[Any], bool]], optional
+        Function checking if a handle can still be used, when it was idle
+        or its call failed. By default every idle handle is used and the
+        handles of failed calls are closed.
+
+    Yields
+    ------
+    Iterator[Any]
+        The handle.
+    """
+    context = current_context.get()
+    if context is not None:
+        with context.resources.acquire(key, create, close, check) as handle:
+            yield handle
+        return
+
+    handle = create()
+    try:
+        yield handle
+    finally:
+        close(handle)
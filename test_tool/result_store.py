@@ -0,0 +1,295 @@
+"""
+This module contains the local store of the results of cacheable calls.
+
+A plugin declares a call cacheable with a function
+cacheable_<plugin>_call, returning the local files the call reads or None
+if the call can not be cached. The key of a result is the hash of the
+substituted and augmented call, the version of the plugin and the
+content of the files. The stored result are the keys the call wrote into
+the data, runs with --incremental replay them instead of making the call.
+"""
+import pickle
+from hashlib import sha256
+from json import dumps
+from logging import getLogger
+from os import getpid, replace, utime
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
+
+from test_tool.config_cache import evict_cached_configs, get_store_dir
+from test_tool.import_plugin import CallType
+from test_tool.scheduler import get_written_keys
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+# Environment variable to change the results folder, empty disables it
+RESULTS_DIR_VARIABLE: str = "TEST_TOOL_RESULTS_DIR"
+
+# Folder of the results in the folder of all caches
+RESULTS_DIR: str = "results"
+
+# Maximal size of all stored results in bytes
+RESULT_STORE_SIZE_LIMIT: int = 256 * 1024 * 1024
+
+# Results of a single call larger than this are not stored
+RESULT_SIZE_LIMIT: int = 16 * 1024 * 1024
+
+# Change when the format of the results or of the keys changes
+RESULT_STORE_VERSION: int = 1
+
+
+class StoredResult(TypedDict):
+    """
+    Result of a call in the store.
+    """
+
+    version: int
+    key: str
+    writes: Dict[str, Any]
+
+
+def hash_file(path: Path) -> str:
+    """
+    Hash the content of a file.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the file.
+
+    Returns
+    -------
+    str
+        The hex digest of the content.
+    """
+    digest = sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultStore:
+    """
+    Replays and stores the results of cacheable calls.
+    """
+
+    def __init__(
+        self,
+        store_path: Path,
+        size_limit: int = RESULT_STORE_SIZE_LIMIT,
+    ) -> None:
+        self.store_path = store_path
+        self.size_limit = size_limit
+        self.lock = Lock()
+        # Files are only hashed again, when they changed during the run
+        self.file_digests: Dict[Tuple[str, int, int], str] = {}
+        self.replayed = 0
+        self.stored = 0
+
+    def get_key(
+        self,
+        call_type: str,
+        loaded: CallType,
+        call: Dict[str, Any],
+        path: Path,
+    ) -> Optional[str]:
+        """
+        Get the key of the result of a call.
+
+        Parameters
+        ----------
+        call_type : str
+            The type of the call.
+        loaded : CallType
+            The plugin of the call.
+        call : Dict[str, Any]
+            The substituted and augmented call.
+        path : Path
+            Path to the project.
+
+        Returns
+        -------
+        Optional[str]
+            The key, None if the call can not be cached.
+        """
+        invoker = loaded["invoke_cacheable_call"]
+        if invoker is None or get_written_keys(call_type, call) is None:
+            return None
+        try:
+            files: Optional[List[Path]] = invoker(call, {}, path)
+            if files is None:
+                return None
+            file_digests: List[Tuple[str, str]] = []
+            for file in files:
+                file_path = Path(file)
+                file_digests.append(
+                    (file_path.as_posix(), self.get_file_digest(file_path))
+                )
+            content = dumps(
+                {
+                    "version": RESULT_STORE_VERSION,
+                    "type": call_type,
+                    "plugin": loaded["version"],
+                    "call": call,
+                    "files": file_digests,
+                },
+                sort_keys=True,
+                default=repr,
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            # The call fails when it is made, if e.g. a file is missing
+            test_tool_logger.debug("Could not get the result key: %s", e)
+            return None
+        return sha256(content.encode("utf-8")).hexdigest()
+
+    def get_file_digest(self, path: Path) -> str:
+        """
+        Get the digest of a file read by a call.
+
+        Parameters
+        ----------
+        path : Path
+            Path to the file.
+
+        Returns
+        -------
+        str
+            The hex digest of the content.
+        """
+        status = path.stat()
+        file_key = (path.as_posix(), status.st_size, status.st_mtime_ns)
+        with self.lock:
+            digest = self.file_digests.get(file_key)
+        if digest is None:
+            digest = hash_file(path)
+            with self.lock:
+                self.file_digests[file_key] = digest
+        return digest
+
+    def get_entry_path(self, key: str) -> Path:
+        """
+        Get the path of a stored result.
+
+        Parameters
+        ----------
+        key : str
+            The key of the result.
+
+        Returns
+        -------
+        Path
+            Path to the stored result.
+        """
+        return self.store_path.joinpath(f"{key}.pickle")
+
+    def replay(self, key: str, data: Dict[str, Any]) -> bool:
+        """
+        Write a stored result into the data.
+
+        Parameters
+        ----------
+        key : str
+            The key of the result.
+        data : Dict[str, Any]
+            The data.
+
+        Returns
+        -------
+        bool
+            True if the result was stored, False otherwise.
+        """
+        entry_path = self.get_entry_path(key)
+        try:
+            with open(entry_path, "rb") as file:
+                result: StoredResult = pickle.load(file)
+            if (
+                result["version"] != RESULT_STORE_VERSION
+                or result["key"] != key
+            ):
+                return False
+            # Mark the result as recently used
+            utime(entry_path)
+        except FileNotFoundError:
+            return False
+        except Exception as e:  # pylint: disable=broad-except
+            test_tool_logger.debug("Could not load result %s: %s", key, e)
+            return False
+
+        data.update(result["writes"])
+        with self.lock:
+            self.replayed += 1
+        return True
+
+    def store(
+        self, key: str, call_type: str, call: Dict[str, Any], data: Dict
+    ) -> None:
+        """
+        Store the keys a call wrote into the data.
+
+        Parameters
+        ----------
+        key : str
+            The key of the result.
+        call_type : str
+            The type of the call.
+        call : Dict[str, Any]
+            The made call.
+        data : Dict
+            The data after the call.
+        """
+        written = get_written_keys(call_type, call) or set()
+        result: StoredResult = {
+            "version": RESULT_STORE_VERSION,
+            "key": key,
+            "writes": {name: data[name] for name in written if name in data},
+        }
+        entry_path = self.get_entry_path(key)
+        temporary_path = entry_path.with_suffix(f".{getpid()}.tmp")
+        try:
+            content = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+            if len(content) > RESULT_SIZE_LIMIT:
+                test_tool_logger.debug("Result %s is too large to store", key)
+                return
+            # The written values may be tokens, only the user may read them
+            self.store_path.mkdir(mode=0o700, parents=True, exist_ok=True)
+            with open(temporary_path, "wb") as file:
+                file.write(content)
+            replace(temporary_path, entry_path)
+        except Exception as e:  # pylint: disable=broad-except
+            test_tool_logger.debug("Could not store result %s: %s", key, e)
+            temporary_path.unlink(missing_ok=True)
+            return
+        with self.lock:
+            self.stored += 1
+
+    def close(self) -> None:
+        """
+        Evict the least recently used results exceeding the size limit.
+        """
+        if self.stored:
+            evict_cached_configs(self.store_path, self.size_limit)
+        if self.replayed or self.stored:
+            test_tool_logger.info(
+                "Replayed %s calls from the result store, stored %s",
+                self.replayed,
+                self.stored,
+            )
+
+
+def open_result_store() -> Optional[ResultStore]:
+    """
+    Open the result store in its folder in the cache.
+
+    Returns
+    -------
+    Optional[ResultStore]
+        The store, None if the result store is disabled.
+    """
+    store_dir = get_store_dir(RESULTS_DIR_VARIABLE, RESULTS_DIR)
+    if store_dir is None:
+        test_tool_logger.warning("Incremental runs need the result store")
+        return None
+    return ResultStore(store_dir)
@@ -0,0 +1,481 @@
+"""
+This module contains the functions to run calls in parallel.
+
+The order of the calls is derived from the variables a call references
+and the keys a call writes into the data. Calls ready at the same time
+are started longest first, if their durations can be estimated.
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import wait
+from heapq import heapify, heappop, heappush
+from logging import getLogger
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from test_tool.substitute import find_referenced_keys
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+
+def _save_keys(field: str) -> Callable[[Dict[str, Any]], Set[str]]:
+    """
+    Create a function returning the keys saved by a list of save objects.
+
+    Parameters
+    ----------
+    field : str
+        The field of a save object containing the key in the data.
+
+    Returns
+    -------
+    Callable[[Dict[str, Any]], Set[str]]
+        The function returning the keys written by the call.
+    """
+
+    def writes(call: Dict[str, Any]) -> Set[str]:
+        return {save[field] for save in call.get("save") or []}
+
+    return writes
+
+
+def _run_process_keys(call: Dict[str, Any]) -> Set[str]:
+    """
+    Get the key saved by a run process call.
+
+    Parameters
+    ----------
+    call : Dict[str, Any]
+        The call.
+
+    Returns
+    -------
+    Set[str]
+        The keys written by the call.
+    """
+    if call.get("save") is None:
+        return set()
+    return {call["save"]["name"]}
+
+
+# Keys a call writes into the data, call types not listed here are
+# treated as barriers because their side effects are unknown
+DATA_WRITES: Dict[str, Callable[[Dict[str, Any]], Set[str]]] = {
+    "ASSERT": lambda call: set(),
+    "COPY_FILES_SSH": lambda call: set(),
+    "JDBC_SQL": _save_keys("to"),
+    "PYTHON": lambda call: {"PYTHON_PLUGIN"},
+    "READ_JAR_MANIFEST": _save_keys("name"),
+    "REST": lambda call: set(),
+    "RUN_PROCESS": _run_process_keys,
+    "SELENIUM": lambda call: set(),
+    "SQL_PLUS": lambda call: set(),
+    "SSH_CMD": lambda call: set(),
+}
+
+# Keys a call reads from the data without referencing them as variable
+DATA_READS: Dict[str, Set[str]] = {
+    "JDBC_SQL": {
+        "DB_URL",
+        "DB_USERNAME",
+        "DB_PASSWORD",
+        "DB_DRIVER",
+        "DB_DRIVER_PATH",
+        "DB_DRIVER_URL",
+    },
+    "PYTHON": {"PYTHON_PLUGIN"},
+}
+
+
+def get_written_keys(
+    call_type: str,
+    call: Dict[str, Any],
+    data_writes: Optional[
+        Dict[str, Callable[[Dict[str, Any]], Set[str]]]
+    ] = None,
+) -> Optional[Set[str]]:
+    """
+    Get the keys a call writes into the data.
+
+    Parameters
+    ----------
+    call_type : str
+        The type of the call.
+    call : Dict[str, Any]
+        The call merged with the default call.
+    data_writes : Optional[Dict[str, Callable]], optional
+        The keys the call types write, by default DATA_WRITES.
+
+    Returns
+    -------
+    Optional[Set[str]]
+        The written keys or None if they can't be determined.
+    """
+    if data_writes is None:
+        data_writes = DATA_WRITES
+    if call_type not in data_writes:
+        return None
+    try:
+        keys = data_writes[call_type](call)
+    except (KeyError, TypeError):
+        return None
+    # Keys built from variables are only known at runtime
+    if any(not isinstance(key, str) or "{{" in key for key in keys):
+        return None
+    return keys
+
+
+def build_dependencies(
+    calls: Sequence[Dict[str, Any]],
+    default_calls: Dict[str, Dict[str, Any]],
+    data_writes: Optional[
+        Dict[str, Callable[[Dict[str, Any]], Set[str]]]
+    ] = None,
+) -> List[Set[int]]:
+    """
+    Build the dependency graph of the calls.
+
+    A call depends on the last call writing a key it reads, on the last
+    call writing a key it writes and on all calls reading a key it
+    writes since then. A call with ``depends_on`` only depends on the
+    calls with the given ``id``. A call with ``barrier`` or an unknown
+    type waits for all previous calls and all following calls wait for
+    it.
+
+    Parameters
+    ----------
+    calls : Sequence[Dict[str, Any]]
+        List of calls.
+    default_calls : Dict[str, Dict[str, Any]]
+        The default call of every loaded call type.
+    data_writes : Optional[Dict[str, Callable]], optional
+        The keys the call types write, by default DATA_WRITES.
+
+    Returns
+    -------
+    List[Set[int]]
+        The indices of the calls every call depends on.
+
+    Raises
+    ------
+    ValueError
+        If a call depends on an unknown id.
+    """
+    dependencies: List[Set[int]] = []
+    ids: Dict[str, int] = {}
+    last_writer: Dict[str, int] = {}
+    readers: Dict[str, List[int]] = {}
+    last_barrier: Optional[int] = None
+    since_barrier: List[int] = []
+
+    for idx, test in enumerate(calls):
+        deps: Set[int] = set()
+        call_type: str = test.get("type", "ASSERT")
+        call: Dict[str, Any] = {
+            **default_calls.get(call_type, {}),
+            **(test.get("call") or {}),
+        }
+        reads: Set[str] = find_referenced_keys(call) | DATA_READS.get(
+            call_type, set()
+        )
+        writes = get_written_keys(call_type, call, data_writes)
+
+        if test.get("barrier", False) or writes is None:
+            # Wait for everything before and block everything after
+            deps.update(since_barrier)
+            if last_barrier is not None:
+                deps.add(last_barrier)
+            last_barrier = idx
+            since_barrier = []
+            last_writer = {}
+            readers = {}
+        else:
+            if "depends_on" in test:
+                depends_on = test["depends_on"]
+                if not isinstance(depends_on, list):
+                    depends_on = [depends_on]
+                for step_id in depends_on:
+                    if str(step_id) not in ids:
+                        raise ValueError(
+                            f"Unknown id {step_id} in depends_on for test "
+                            + f"from line {test.get('line')}"
+                        )
+                    deps.add(ids[str(step_id)])
+            else:
+                for key in reads:
+                    if key in last_writer:
+                        deps.add(last_writer[key])
+                for key in writes:
+                    if key in last_writer:
+                        deps.add(last_writer[key])
+                    deps.update(readers.get(key, []))
+            if last_barrier is not None:
+                deps.add(last_barrier)
+            since_barrier.append(idx)
+
+            for key in reads:
+                readers.setdefault(key, []).append(idx)
+            for key in writes:
+                last_writer[key] = idx
+                readers[key] = []
+
+        if "id" in test:
+            ids[str(test["id"])] = idx
+
+        deps.discard(idx)
+        dependencies.append(deps)
+
+    return dependencies
+
+
+def get_step_priorities(
+    dependencies: List[Set[int]], durations: Sequence[Optional[float]]
+) -> Optional[List[float]]:
+    """
+    Get the priority of every call from the expected durations.
+
+    The priority of a call is its duration plus the longest chain of calls
+    waiting for it, so independent calls are started longest first and
+    calls blocking long chains before the rest. Calls without a duration
+    are weighted with the mean duration of the others.
+
+    Parameters
+    ----------
+    dependencies : List[Set[int]]
+        The indices of the calls every call depends on.
+    durations : Sequence[Optional[float]]
+        The expected duration of every call in seconds, None if unknown.
+
+    Returns
+    -------
+    Optional[List[float]]
+        The priority of every call, None if no duration is known.
+    """
+    known = [duration for duration in durations if duration is not None]
+    if not known:
+        return None
+    default = sum(known) / len(known)
+
+    # Calls only depend on calls before them
+    priorities: List[float] = [
+        default if duration is None else duration for duration in durations
+    ]
+    longest: List[float] = [0.0] * len(dependencies)
+    for idx in reversed(range(len(dependencies))):
+        priorities[idx] += longest[idx]
+        for dep in dependencies[idx]:
+            longest[dep] = max(longest[dep], priorities[idx])
+    return priorities
+
+
+def _start_schedule(
+    dependencies: List[Set[int]],
+    priorities: Optional[List[float]] = None,
+) -> Tuple[List[int], List[List[int]], List[Tuple[float, int]], List[float]]:
+    """
+    Count the dependencies of the calls and find the calls ready to run.
+
+    Parameters
+    ----------
+    dependencies : List[Set[int]]
+        The indices of the calls every call depends on.
+    priorities : Optional[List[float]], optional
+        The priority of every call, ready calls with a higher priority are
+        started first. By default they are started in the order of the
+        calls config.
+
+    Returns
+    -------
+    Tuple[List[int], List[List[int]], List[Tuple[float, int]], List[float]]
+        The number of dependencies not done yet of every call, the calls
+        depending on every call, the heap of calls ready to run and the
+        key of every call in the heap.
+    """
+    remaining: List[int] = [len(deps) for deps in dependencies]
+    dependents: List[List[int]] = [[] for _ in dependencies]
+    for idx, deps in enumerate(dependencies):
+        for dep in deps:
+            dependents[dep].append(idx)
+
+    # Calls with the same priority are started in the order of the config
+    keys: List[float] = (
+        [-priority for priority in priorities]
+        if priorities is not None
+        else [0.0] * len(dependencies)
+    )
+    ready: List[Tuple[float, int]] = [
+        (keys[idx], idx) for idx, count in enumerate(remaining) if not count
+    ]
+    heapify(ready)
+    return remaining, dependents, ready, keys
+
+
+def _finish_step(
+    idx: int,
+    remaining: List[int],
+    dependents: List[List[int]],
+    ready: List[Tuple[float, int]],
+    keys: List[float],
+) -> None:
+    """
+    Mark a call as done and add the calls it unblocks to the ready heap.
+
+    Parameters
+    ----------
+    idx : int
+        Index of the call done.
+    remaining : List[int]
+        The number of dependencies not done yet of every call.
+    dependents : List[List[int]]
+        The calls depending on every call.
+    ready : List[Tuple[float, int]]
+        The heap of calls ready to run.
+    keys : List[float]
+        The key of every call in the heap.
+    """
+    for dependent in dependents[idx]:
+        remaining[dependent] -= 1
+        if remaining[dependent] == 0:
+            heappush(ready, (keys[dependent], dependent))
+
+
+def run_scheduled(
+    dependencies: List[Set[int]],
+    run_step: Callable[[int], bool],
+    continue_on_failure: bool,
+    jobs: int,
+    priorities: Optional[List[float]] = None,
+) -> int:
+    """
+    Run the calls on a pool of workers as soon as their dependencies are
+    done.
+
+    Parameters
+    ----------
+    dependencies : List[Set[int]]
+        The indices of the calls every call depends on.
+    run_step : Callable[[int], bool]
+        Function running the call with the given index, returns True on
+        error.
+    continue_on_failure : bool
+        Continue tests on error. Otherwise no further calls are started
+        after the first error, calls already running are finished.
+    jobs : int
+        Number of workers.
+    priorities : Optional[List[float]], optional
+        The priority of every call, by default the ready calls are started
+        in the order of the calls config.
+
+    Returns
+    -------
+    int
+        Number of errors.
+    """
+    errors: int = 0
+    stopping: bool = False
+    remaining, dependents, ready, keys = _start_schedule(
+        dependencies, priorities
+    )
+    running: Dict[Future, int] = {}
+
+    with ThreadPoolExecutor(
+        max_workers=jobs, thread_name_prefix="test-tool"
+    ) as executor:
+        while ready or running:
+            while ready and len(running) < jobs and not stopping:
+                _, idx = heappop(ready)
+                running[executor.submit(run_step, idx)] = idx
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx = running.pop(future)
+                if future.result():
+                    errors += 1
+                _finish_step(idx, remaining, dependents, ready, keys)
+
+            # Stopping on first error
+            if errors > 0 and not continue_on_failure and not stopping:
+                test_tool_logger.error("Stopping on first error")
+                stopping = True
+
+    return errors
+
+
+async def run_scheduled_async(
+    dependencies: List[Set[int]],
+    run_step: Callable[[int], Awaitable[bool]],
+    continue_on_failure: bool,
+    jobs: int,
+    priorities: Optional[List[float]] = None,
+) -> int:
+    """
+    Run the calls as tasks on the event loop as soon as their dependencies
+    are done.
+
+    Parameters
+    ----------
+    dependencies : List[Set[int]]
+        The indices of the calls every call depends on.
+    run_step : Callable[[int], Awaitable[bool]]
+        Coroutine function running the call with the given index, returns
+        True on error.
+    continue_on_failure : bool
+        Continue tests on error. Otherwise no further calls are started
+        after the first error, calls already running are finished.
+    jobs : int
+        Number of calls running at the same time.
+    priorities : Optional[List[float]], optional
+        The priority of every call, by default the ready calls are started
+        in the order of the calls config.
+
+    Returns
+    -------
+    int
+        Number of errors.
+    """
+    # Only needed by the async engine, asyncio is slow to import
+    import asyncio
+
+    errors: int = 0
+    stopping: bool = False
+    remaining, dependents, ready, keys = _start_schedule(
+        dependencies, priorities
+    )
+    running: Dict[asyncio.Task, int] = {}
+
+    while ready or running:
+        while ready and len(running) < jobs and not stopping:
+            _, idx = heappop(ready)
+            running[asyncio.ensure_future(run_step(idx))] = idx
+
+        if not running:
+            break
+
+        done, _ = await asyncio.wait(
+            running, return_when=asyncio.FIRST_COMPLETED
+        )
+        # Calls finishing together are handled in the order of the config
+        for task in sorted(done, key=running.__getitem__):
+            idx = running.pop(task)
+            if task.result():
+                errors += 1
+            _finish_step(idx, remaining, dependents, ready, keys)
+
+        # Stopping on first error
+        if errors > 0 and not continue_on_failure and not stopping:
+            test_tool_logger.error("Stopping on first error")
+            stopping = True
+
+    return errors
@@ -0,0 +1,420 @@
+"""
+This module contains the sharding of the calls and the merging of the
+reports of the shards.
+
+The calls are split in groups, which do not depend on each other. The
+groups are assigned to the shards, the longest first to the shard with
+the least work, weighted by the step durations of an earlier run. Every
+shard computes the same assignment, so the shards can run on different
+machines.
+"""
+import re
+from heapq import heappop, heappush, merge
+from json import dump, load, loads
+from logging import getLogger
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypedDict,
+)
+
+from test_tool.instrumentation import TIMINGS_FILE, StepRecord, TimingRecorder
+from test_tool.scheduler import DATA_WRITES, build_dependencies
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+# File in the output folder, the shard of the run is written to
+SHARD_FILE: str = "shard.json"
+
+# Files in the output folder of the merged reports
+REPORT_FILE: str = "report.json"
+LOG_FILE: str = "run.log"
+
+# Start of a log entry, continued lines of an entry do not match
+LOG_ENTRY = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} \| ")
+
+# A suite makes its calls with its own data. It is only a barrier for
+# parallel jobs, whose nested runs would log into each others files.
+SHARD_WRITES: Dict[str, Callable[[Dict[str, Any]], Set[str]]] = {
+    "SUITE": lambda call: set(),
+}
+
+
+class ShardInfo(TypedDict):
+    """
+    Shard of a run.
+    """
+
+    shard: int
+    shards: int
+    lines: List[int]
+
+
+class FailedStep(TypedDict):
+    """
+    Failed step in the merged report.
+    """
+
+    line: int
+    type: str
+    run: str
+
+
+class MergedReport(TypedDict):
+    """
+    Report merged from the runs of the shards.
+    """
+
+    runs: List[str]
+    steps: int
+    errors: int
+    failed: List[FailedStep]
+    skipped: List[int]
+    missing: List[int]
+
+
+def parse_shard(shard: str) -> Tuple[int, int]:
+    """
+    Parse a shard given as i/N.
+
+    Parameters
+    ----------
+    shard : str
+        The shard, i is between 1 and N.
+
+    Returns
+    -------
+    Tuple[int, int]
+        The number of the shard and the number of shards.
+
+    Raises
+    ------
+    ValueError
+        If the shard is not valid.
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", shard)
+    if match is None or not 1 <= int(match[1]) <= int(match[2]):
+        raise ValueError(f"Shard {shard} is not i/N with 1 <= i <= N")
+    return int(match[1]), int(match[2])
+
+
+def load_step_durations(run_path: Path) -> Dict[int, float]:
+    """
+    Load the durations of the steps of an earlier run.
+
+    Parameters
+    ----------
+    run_path : Path
+        The output folder of the run.
+
+    Returns
+    -------
+    Dict[int, float]
+        The wall time in seconds of the step from every line of the calls
+        file.
+
+    Raises
+    ------
+    ValueError
+        If the folder has no timings.
+    """
+    durations: Dict[int, float] = {}
+    try:
+        with open(run_path.joinpath(TIMINGS_FILE), encoding="utf-8") as file:
+            for line in file:
+                record = loads(line)
+                durations[record["line"]] = record["wall"]
+    except FileNotFoundError as e:
+        raise ValueError(f"No timings found in {run_path}") from e
+    return durations
+
+
+def split_calls(
+    calls: List[Dict[str, Any]],
+    default_calls: Dict[str, Dict[str, Any]],
+    shard: int,
+    shards: int,
+    durations: Optional[Dict[int, float]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Get the calls of a shard.
+
+    Calls depending on each other are made by the same shard. Steps
+    without a duration are weighted with the mean duration of the others.
+
+    Parameters
+    ----------
+    calls : List[Dict[str, Any]]
+        All calls.
+    default_calls : Dict[str, Dict[str, Any]]
+        The default call of every call type.
+    shard : int
+        The number of the shard, starting at 1.
+    shards : int
+        The number of shards.
+    durations : Optional[Dict[int, float]], optional
+        The duration of the step from every line, by default every step
+        has the same weight.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        The calls of the shard, in the order of the calls file.
+
+    Raises
+    ------
+    ValueError
+        If a call depends on an unknown id.
+    """
+    dependencies = build_dependencies(
+        calls, default_calls, {**DATA_WRITES, **SHARD_WRITES}
+    )
+
+    # Join the calls depending on each other
+    parents = list(range(len(calls)))
+
+    def find(idx: int) -> int:
+        while parents[idx] != idx:
+            parents[idx] = parents[parents[idx]]
+            idx = parents[idx]
+        return idx
+
+    for idx, deps in enumerate(dependencies):
+        for dep in deps:
+            parents[find(idx)] = find(dep)
+    groups: Dict[int, List[int]] = {}
+    for idx in range(len(calls)):
+        groups.setdefault(find(idx), []).append(idx)
+
+    durations = durations or {}
+    known = [
+        durations[test["line"]]
+        for test in calls
+        if test.get("line") in durations
+    ]
+    default = sum(known) / len(known) if known else 1.0
+
+    def weight(group: List[int]) -> float:
+        return sum(
+            durations.get(calls[idx].get("line", 0), default) for idx in group
+        )
+
+    # Longest group first to the shard with the least work
+    work_heap: List[Tuple[float, int]] = [
+        (0.0, number) for number in range(shards)
+    ]
+    assigned: List[List[int]] = [[] for _ in range(shards)]
+    for group in sorted(
+        groups.values(), key=lambda group: (-weight(group), group[0])
+    ):
+        work, number = heappop(work_heap)
+        assigned[number].extend(group)
+        heappush(work_heap, (work + weight(group), number))
+
+    test_tool_logger.info(
+        "Shard %s/%s makes %s of %s calls in %s independent groups",
+        shard,
+        shards,
+        len(assigned[shard - 1]),
+        len(calls),
+        len(groups),
+    )
+    return [calls[idx] for idx in sorted(assigned[shard - 1])]
+
+
+def write_shard_info(
+    output_path: Path, shard: int, shards: int, calls: List[Dict[str, Any]]
+) -> None:
+    """
+    Write the shard of a run to its output folder.
+
+    Parameters
+    ----------
+    output_path : Path
+        The output folder of the run.
+    shard : int
+        The number of the shard.
+    shards : int
+        The number of shards.
+    calls : List[Dict[str, Any]]
+        The calls of the shard.
+    """
+    info: ShardInfo = {
+        "shard": shard,
+        "shards": shards,
+        "lines": [test.get("line", 0) for test in calls],
+    }
+    with open(output_path.joinpath(SHARD_FILE), "w", encoding="utf-8") as file:
+        dump(info, file)
+
+
+def load_shard_info(run_path: Path) -> Optional[ShardInfo]:
+    """
+    Load the shard of a run.
+
+    Parameters
+    ----------
+    run_path : Path
+        The output folder of the run.
+
+    Returns
+    -------
+    Optional[ShardInfo]
+        The shard, None if the run was not sharded.
+    """
+    try:
+        with open(run_path.joinpath(SHARD_FILE), encoding="utf-8") as file:
+            return load(file)
+    except FileNotFoundError:
+        return None
+
+
+def iter_log_entries(path: Path, label: str) -> Iterator[str]:
+    """
+    Iterate over the entries of a log, labeled with their run.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the log.
+    label : str
+        The label added after the time of every entry.
+
+    Yields
+    ------
+    Iterator[str]
+        The entries, with the lines continuing them.
+    """
+    try:
+        file = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with file:
+        entry = ""
+        for line in file:
+            if LOG_ENTRY.match(line):
+                if entry:
+                    yield entry
+                entry = line[:26] + f"{label} | " + line[26:]
+            else:
+                entry += line
+        if entry:
+            yield entry
+
+
+def merge_reports(run_paths: List[Path], output_path: Path) -> int:
+    """
+    Merge the timings, errors and logs of the runs of the shards.
+
+    Parameters
+    ----------
+    run_paths : List[Path]
+        The output folders of the runs.
+    output_path : Path
+        The folder the merged reports are written to.
+
+    Returns
+    -------
+    int
+        Number of failed steps, steps not made and missing shards.
+    """
+    output_path.mkdir(parents=True, exist_ok=True)
+    records: List[StepRecord] = []
+    report: MergedReport = {
+        "runs": [run_path.as_posix() for run_path in run_paths],
+        "steps": 0,
+        "errors": 0,
+        "failed": [],
+        "skipped": [],
+        "missing": [],
+    }
+    labels: List[str] = []
+    found: Set[int] = set()
+    shards: Set[int] = set()
+    for run_path in run_paths:
+        info = load_shard_info(run_path)
+        made: Set[int] = set()
+        try:
+            with open(
+                run_path.joinpath(TIMINGS_FILE), encoding="utf-8"
+            ) as file:
+                for line in file:
+                    record: StepRecord = loads(line)
+                    records.append(record)
+                    made.add(record["line"])
+                    if record["error"]:
+                        report["failed"].append(
+                            {
+                                "line": record["line"],
+                                "type": record["type"],
+                                "run": run_path.as_posix(),
+                            }
+                        )
+        except FileNotFoundError:
+            test_tool_logger.warning("No timings found in %s", run_path)
+        if info is None:
+            labels.append(run_path.name)
+            continue
+        labels.append(f"shard {info['shard']}/{info['shards']}")
+        found.add(info["shard"])
+        shards.add(info["shards"])
+        # Steps after the first error are not made
+        report["skipped"].extend(
+            line for line in info["lines"] if line not in made
+        )
+
+    if len(shards) > 1:
+        test_tool_logger.warning(
+            "The runs were split in different numbers of shards: %s",
+            ", ".join(str(number) for number in sorted(shards)),
+        )
+    if shards:
+        report["missing"] = sorted(set(range(1, max(shards) + 1)) - found)
+    for shard in report["missing"]:
+        test_tool_logger.error("Shard %s/%s is missing", shard, max(shards))
+
+    # The steps of every shard are numbered on their own
+    records.sort(key=lambda record: record["line"])
+    recorder = TimingRecorder(output_path)
+    for number, record in enumerate(records, 1):
+        record["step"] = number
+        recorder.add(record)
+    recorder.close()
+    report["steps"] = recorder.steps
+    report["errors"] = len(report["failed"])
+    report["skipped"].sort()
+
+    with open(output_path.joinpath(LOG_FILE), "w", encoding="utf-8") as file:
+        file.writelines(
+            merge(
+                *(
+                    iter_log_entries(run_path.joinpath(LOG_FILE), label)
+                    for run_path, label in zip(run_paths, labels)
+                ),
+                key=lambda entry: entry[:23],
+            )
+        )
+    with open(
+        output_path.joinpath(REPORT_FILE), "w", encoding="utf-8"
+    ) as file:
+        dump(report, file, indent=2)
+
+    if recorder.steps:
+        for line in recorder.summary():
+            test_tool_logger.info(line)
+    test_tool_logger.info(
+        "Merged %s runs: %s steps, %s failed, %s not made",
+        len(run_paths),
+        report["steps"],
+        report["errors"],
+        len(report["skipped"]),
+    )
+    return report["errors"] + len(report["skipped"]) + len(report["missing"])
@@ -1,9 +1,21 @@
 """
 This module contains the functions to substitute variables.
 """
+from copy import copy
+from functools import lru_cache
 from logging import getLogger
-from re import findall, search, sub
-from typing import Any, Callable, Dict, List, Optional, Union
+from re import compile as compile_regex
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 # Get the logger
 test_tool_logger = getLogger("test-tool")
@@ -17,6 +29,210 @@ available_pipes: Dict[str, Callable] = {
     "round": round,
 }
 
+# Variables are defined as {{foo.bar[0]}}
+VARIABLE_PATTERN: str = r"{{[a-zA-Z0-9\_\-\.\[\]\|\:\ ]+}}"
+# Index of a list at the end of a key
+LIST_PATTERN: str = r"\[(-?\d+)\]$"
+
+VARIABLE_REGEX = compile_regex(VARIABLE_PATTERN)
+LIST_REGEX = compile_regex(LIST_PATTERN)
+
+# Number of compiled strings to keep
+TEMPLATE_CACHE_SIZE: int = 8192
+
+
+class Variable(NamedTuple):
+    """
+    A compiled variable of a template.
+    """
+
+    # The variable as found in the string, e.g. {{ foo.bar[0] | int }}
+    source: str
+    # Key, list index, path of the parent and path of the key for logging
+    keys: Tuple[Tuple[str, Optional[int], str, str], ...]
+    # Name and arguments of the pipes
+    pipes: Tuple[Tuple[str, Tuple[Any, ...]], ...]
+    # Path of the value in the data, e.g. data.foo.bar[0]
+    path: str
+
+
+# A template is a sequence of literal strings and variables
+Template = Tuple[Union[str, Variable], ...]
+
+# True for a string containing variables, otherwise the keys or indices
+# of the children containing variables
+Variables = Union[bool, Dict[Any, Any]]
+
+
+def parse_pipe_argument(argument: str) -> Any:
+    """
+    Convert an argument of a pipe to int or float if possible and
+    remove the quotes of a string.
+
+    Parameters
+    ----------
+    argument : str
+        The argument.
+
+    Returns
+    -------
+    Any
+        The converted argument.
+    """
+    try:
+        return int(argument)
+    except ValueError:
+        pass
+    try:
+        return float(argument)
+    except ValueError:
+        pass
+    # remove the quotes
+    if argument and argument[0] == argument[-1] and argument[0] in ["'", '"']:
+        return argument[1:-1]
+    return argument
+
+
+def compile_variable(variable: str) -> Variable:
+    """
+    Compile a variable into its accessors and pipes.
+
+    Parameters
+    ----------
+    variable : str
+        The variable including the brackets.
+
+    Returns
+    -------
+    Variable
+        The compiled variable.
+    """
+    # Remove {{ and }}, split for pipes and remove whitespace
+    parts = [part.strip() for part in variable[2:-2].split("|")]
+
+    keys: List[Tuple[str, Optional[int], str, str]] = []
+    # Keep track for logging
+    log_path = "data"
+    # Split for objects
+    for key in parts[0].split("."):
+        # Check if path is list
+        list_key: Optional[int] = None
+        is_list = LIST_REGEX.search(key)
+        if is_list:
+            list_key = int(is_list.group(1))
+            key = LIST_REGEX.sub("", key)
+        keys.append((key, list_key, log_path, f"{log_path}.{key}"))
+        log_path += "." + key
+        if list_key is not None:
+            log_path += f"[{list_key}]"
+
+    pipes: List[Tuple[str, Tuple[Any, ...]]] = []
+    for pipe in parts[1:]:
+        # Get arguments
+        name, *arguments = pipe.split(":")
+        pipes.append(
+            (name, tuple(parse_pipe_argument(arg) for arg in arguments))
+        )
+
+    return Variable(variable, tuple(keys), tuple(pipes), log_path)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(to_compile: str) -> Template:
+    """
+    Compile a string into a sequence of literal strings and variables.
+
+    The compiled templates are cached by the string, so every string is
+    only parsed once.
+
+    Parameters
+    ----------
+    to_compile : str
+        String to compile.
+
+    Returns
+    -------
+    Template
+        The literal strings and compiled variables.
+    """
+    template: List[Union[str, Variable]] = []
+    position = 0
+    for match in VARIABLE_REGEX.finditer(to_compile):
+        start = match.start()
+        if start > position:
+            template.append(to_compile[position:start])
+        template.append(compile_variable(match.group(0)))
+        position = match.end()
+    if position < len(to_compile):
+        template.append(to_compile[position:])
+
+    return tuple(template)
+
+
+def resolve_variable(variable: Variable, data: Dict[str, Any]) -> Any:
+    """
+    Get the value of a compiled variable from the data.
+
+    Parameters
+    ----------
+    variable : Variable
+        The compiled variable.
+    data : Dict[str, Any]
+        Data to get the value from.
+
+    Returns
+    -------
+    Any
+        The value.
+    """
+    value: Any = data
+    for key, list_key, parent_path, key_path in variable.keys:
+        try:
+            value = value[key]
+        except KeyError as e:
+            test_tool_logger.error("Key %s not found in %s", key, parent_path)
+            raise KeyError(f"Key {key} not found in {parent_path}") from e
+        if list_key is not None:
+            try:
+                value = value[list_key]
+            except IndexError as e:
+                test_tool_logger.error(
+                    "Index %s not found in list %s", list_key, key_path
+                )
+                raise IndexError(
+                    f"Index {list_key} not found in list {key_path}"
+                ) from e
+
+    return value
+
+
+def apply_pipes(variable: Variable, value: Any) -> Any:
+    """
+    Apply the pipes of a compiled variable to a value.
+
+    Parameters
+    ----------
+    variable : Variable
+        The compiled variable.
+    value : Any
+        The value.
+
+    Returns
+    -------
+    Any
+        The value after all pipes were applied.
+    """
+    for pipe, arguments in variable.pipes:
+        if pipe in available_pipes:
+            value = available_pipes[pipe](value, *arguments)
+        else:
+            test_tool_logger.error(
+                "Pipe %s not found in available pipes", pipe
+            )
+            raise KeyError(f"Pipe {pipe} not found in available pipes")
+
+    return value
+
 
 def replace_string_variables(
     to_change: str, data: Dict[str, Any]
@@ -36,92 +252,22 @@ def replace_string_variables(
     Optional[str]
         The changed string if it was changed, None otherwise.
     """
-    changed: Any = to_change
-
-    # Find all variables in the string. Variables are defined as {{foo.bar[0]}}
-    pattern = r"{{[a-zA-Z0-9\_\-\.\[\]\|\:\ ]+}}"
-    variables = findall(pattern, changed)
-    # Replace the variables with the data, if possible
-    for variable in variables:
-        # Remove {{ and }}
-        var = variable[2:-2]
-        # Split for pipes
-        pipes = var.split("|")
-        # Remove whitespace
-        pipes = [pipe.strip() for pipe in pipes]
-        # Get the variable
-        var = pipes[0]
-        # Get the pipes
-        pipes = pipes[1:]
-        # Split for objects
-        keys = var.split(".")
-        # Check if path is list
-        list_pattern = r"\[(-?\d+)\]$"
-        # Keep track for logging
-        log_path = "data"
-        # Get the value
-        value: Union[Dict[str, Any], List[Any], str] = data
-        for key in keys:
-            is_list = search(list_pattern, key)
-            if is_list:
-                list_key = int(is_list.group(1))
-                key = sub(list_pattern, "", key)
-            try:
-                value = value[key]
-            except KeyError as e:
-                test_tool_logger.error("Key %s not found in %s", key, log_path)
-                raise KeyError(f"Key {key} not found in {log_path}") from e
-            log_path += "." + key
-            if is_list:
-                try:
-                    value = value[list_key]
-                except IndexError as e:
-                    test_tool_logger.error(
-                        "Index %s not found in list %s", list_key, log_path
-                    )
-                    raise IndexError(
-                        f"Index {list_key} not found in list {log_path}"
-                    ) from e
-                log_path += f"[{list_key}]"
-
-        if changed == variable:
-            for pipe in pipes:
-                # Get arguments
-                pipe = pipe.split(":")
-                arguments = pipe[1:]
-                for idx, argument in enumerate(arguments):
-                    if isinstance(argument, str):
-                        try:
-                            arguments[idx] = int(argument)
-                            argument = arguments[idx]
-                        except ValueError:
-                            pass
-                    if isinstance(argument, str):
-                        try:
-                            arguments[idx] = float(argument)
-                            argument = arguments[idx]
-                        except ValueError:
-                            pass
-                    # remove the quotes
-                    if isinstance(argument, str):
-                        if argument[0] == argument[-1] and argument[0] in [
-                            "'",
-                            '"',
-                        ]:
-                            arguments[idx] = argument[1:-1]
-                            argument = arguments[idx]
-
-                pipe = pipe[0]
-                if pipe in available_pipes:
-                    value = available_pipes[pipe](value, *arguments)
-                else:
-                    test_tool_logger.error(
-                        "Pipe %s not found in available pipes", pipe
-                    )
-                    raise KeyError(f"Pipe {pipe} not found in available pipes")
-            changed = value
-        else:
-            changed = changed.replace(variable, str(value))
+    # Strings without variables don't need to be compiled
+    if "{{" not in to_change:
+        return None
+
+    template = compile_template(to_change)
+    changed: Any
+    if len(template) == 1 and isinstance(template[0], Variable):
+        # A standalone variable keeps its type and pipes are applied
+        changed = apply_pipes(template[0], resolve_variable(template[0], data))
+    else:
+        changed = "".join(
+            str(resolve_variable(chunk, data))
+            if isinstance(chunk, Variable)
+            else chunk
+            for chunk in template
+        )
 
     if changed != to_change:
         test_tool_logger.debug("Changed value %s to %s.", to_change, changed)
@@ -130,6 +276,168 @@ def replace_string_variables(
     return None
 
 
+def find_variables(to_search: Any) -> Optional[Variables]:
+    """
+    Find the strings containing variables in a value.
+
+    Parameters
+    ----------
+    to_search : Any
+        String, list or dict to search for variables.
+
+    Returns
+    -------
+    Optional[Variables]
+        True for a string with variables, the keys or indices of the
+        children containing variables for a dict or list and None if
+        there are no variables at all.
+    """
+    if isinstance(to_search, str):
+        return True if "{{" in to_search else None
+
+    # Iterate the raw values, shared values of a call are not copied
+    if isinstance(to_search, dict):
+        children: Any = dict.items(to_search)
+    elif isinstance(to_search, list):
+        children = enumerate(list.__iter__(to_search))
+    else:
+        return None
+
+    found: Dict[Any, Any] = {}
+    for key, value in children:
+        variables = find_variables(value)
+        if variables is not None:
+            found[key] = variables
+
+    return found or None
+
+
+def lookup_variable(
+    variable: Variable,
+    data: Dict[str, Any],
+    resolved: Dict[str, Any],
+    chain: List[str],
+) -> Any:
+    """
+    Get the value of a variable from the data with all variables within
+    the value resolved.
+
+    Parameters
+    ----------
+    variable : Variable
+        The compiled variable.
+    data : Dict[str, Any]
+        Data to get the value from.
+    resolved : Dict[str, Any]
+        Already resolved values by their path.
+    chain : List[str]
+        The paths of the values currently resolved.
+
+    Returns
+    -------
+    Any
+        The resolved value.
+
+    Raises
+    ------
+    ValueError
+        If the value references itself.
+    """
+    if variable.path in resolved:
+        return resolved[variable.path]
+
+    if variable.path in chain:
+        start = chain.index(variable.path)
+        cycle = chain[start:] + [variable.path]
+        test_tool_logger.error("Cycle in variables: %s", " -> ".join(cycle))
+        raise ValueError(f"Cycle in variables: {' -> '.join(cycle)}")
+
+    value = resolve_variable(variable, data)
+    variables = find_variables(value)
+    if variables is not None:
+        chain.append(variable.path)
+        try:
+            # The value in the data is not changed
+            value, _ = resolve_variables(
+                value, variables, data, resolved, chain, False
+            )
+        finally:
+            chain.pop()
+
+    resolved[variable.path] = value
+    return value
+
+
+def resolve_variables(
+    to_change: Any,
+    variables: Variables,
+    data: Dict[str, Any],
+    resolved: Dict[str, Any],
+    chain: List[str],
+    in_place: bool,
+) -> Tuple[Any, bool]:
+    """
+    Resolve the variables of a value in one traversal.
+
+    Parameters
+    ----------
+    to_change : Any
+        String, list or dict to change.
+    variables : Variables
+        The strings containing variables, as returned by find_variables.
+    data : Dict[str, Any]
+        Data to use for the changes.
+    resolved : Dict[str, Any]
+        Already resolved values by their path.
+    chain : List[str]
+        The paths of the values currently resolved.
+    in_place : bool
+        Change dicts and lists in place, otherwise changed dicts and lists
+        are copied.
+
+    Returns
+    -------
+    Tuple[Any, bool]
+        The changed value and if it was changed.
+    """
+    if variables is True:
+        template = compile_template(to_change)
+        changed: Any
+        if len(template) == 1 and isinstance(template[0], Variable):
+            # A standalone variable keeps its type and pipes are applied
+            changed = apply_pipes(
+                template[0],
+                lookup_variable(template[0], data, resolved, chain),
+            )
+        else:
+            changed = "".join(
+                str(lookup_variable(chunk, data, resolved, chain))
+                if isinstance(chunk, Variable)
+                else chunk
+                for chunk in template
+            )
+        if changed != to_change:
+            test_tool_logger.debug(
+                "Changed value %s to %s.", to_change, changed
+            )
+            return changed, True
+        return to_change, False
+
+    result = to_change if in_place else copy(to_change)
+    any_changed = False
+    for key, child_variables in variables.items():  # type: ignore
+        value, changed = resolve_variables(
+            to_change[key], child_variables, data, resolved, chain, in_place
+        )
+        if changed:
+            result[key] = value
+            any_changed = True
+
+    if any_changed:
+        return result, True
+    return to_change, False
+
+
 def replace_list_variables(
     to_change: List[Any], data: Dict[str, Any]
 ) -> Optional[List[Any]]:
@@ -148,24 +456,11 @@ def replace_list_variables(
     Optional[List[Any]]
         The changed list if it was changed, None otherwise.
     """
-    changed: bool = False
-    for idx, value in enumerate(to_change):
-        if isinstance(value, str):
-            new_string_value = replace_string_variables(value, data)
-            if new_string_value is not None:
-                changed = True
-                to_change[idx] = new_string_value
-        elif isinstance(value, dict):
-            new_dict_value = recursively_replace_variables(value, data)
-            if new_dict_value is not None:
-                changed = True
-                to_change[idx] = new_dict_value
-        elif isinstance(value, list):
-            new_list_value = replace_list_variables(value, data)
-            if new_list_value is not None:
-                changed = True
-                to_change[idx] = new_list_value
+    variables = find_variables(to_change)
+    if variables is None:
+        return None
 
+    _, changed = resolve_variables(to_change, variables, data, {}, [], True)
     if changed:
         return to_change
     else:
@@ -173,50 +468,75 @@ def replace_list_variables(
 
 
 def recursively_replace_variables(
-    to_change: Dict[str, Any], data: Dict[str, Any]
+    to_change: Dict[str, Any],
+    data: Dict[str, Any],
+    variables: Optional[Variables] = None,
 ) -> Optional[Dict[str, Any]]:
     """
     Recursively replace variables in a dict.
 
+    Every string is visited once. Variables referencing values which
+    contain variables themselves are resolved first, every referenced
+    value is only resolved once.
+
     Parameters
     ----------
     to_change : Dict[str, Any]
         Dict to change.
     data : Dict[str, Any]
         Data to use for the changes.
+    variables : Optional[Variables], optional
+        The strings containing variables, as returned by find_variables.
+        Subtrees without variables are skipped. By default the dict is
+        searched.
 
     Returns
     -------
     Dict[str, Any]
         The changed dict.
+
+    Raises
+    ------
+    ValueError
+        If a variable references itself.
     """
-    changed: bool = False
-    for key, value in to_change.items():
-        test_tool_logger.debug("%s: %s", key, value)
-        changed = False
-        changed_iteration: bool = True
-        while changed_iteration:
-            changed_iteration = False
-            if isinstance(to_change[key], dict):
-                new_dict = recursively_replace_variables(to_change[key], data)
-                if new_dict is not None:
-                    changed_iteration = True
-                    to_change[key] = new_dict
-            elif isinstance(to_change[key], list):
-                new_list = replace_list_variables(to_change[key], data)
-                if new_list is not None:
-                    changed_iteration = True
-                    to_change[key] = new_list
-            elif isinstance(to_change[key], str):
-                new_value = replace_string_variables(to_change[key], data)
-                if new_value is not None:
-                    changed_iteration = True
-                    to_change[key] = new_value
-
-        if changed_iteration:
-            changed = True
+    if variables is None:
+        variables = find_variables(to_change)
+        if variables is None:
+            return None
 
+    _, changed = resolve_variables(to_change, variables, data, {}, [], True)
     if changed:
         return to_change
     else:
         return None
+
+
+def find_referenced_keys(to_search: Any) -> Set[str]:
+    """
+    Find the top level keys of the data referenced in a value.
+
+    Parameters
+    ----------
+    to_search : Any
+        String, list or dict to search for variables.
+
+    Returns
+    -------
+    Set[str]
+        The referenced keys, e.g. foo for {{foo.bar[0] | str}}.
+    """
+    keys: Set[str] = set()
+    if isinstance(to_search, str):
+        if "{{" in to_search:
+            for chunk in compile_template(to_search):
+                if isinstance(chunk, Variable):
+                    keys.add(chunk.keys[0][0])
+    elif isinstance(to_search, dict):
+        for value in to_search.values():
+            keys.update(find_referenced_keys(value))
+    elif isinstance(to_search, list):
+        for value in to_search:
+            keys.update(find_referenced_keys(value))
+
+    return keys
@@ -3,19 +3,249 @@ CLI interface for test_tool project.
 
 It is executed when the program is called from the command line.
 """
-from argparse import ArgumentParser
-from logging import DEBUG, INFO, basicConfig
+import sys
+from argparse import Action, ArgumentParser, Namespace
+from logging import DEBUG, INFO, basicConfig, getLogger
 from os import getcwd
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
 
-import pkg_resources
+# Get the logger
+test_tool_logger = getLogger("test-tool")
 
-from test_tool.base import run_tests
+LOG_FORMAT: str = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+
+
+def get_version() -> str:
+    """
+    Get the version of the installed package.
+
+    Returns
+    -------
+    str
+        The version, read from the VERSION file if the package is not
+        installed.
+    """
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("universal-test-tool")
+    except PackageNotFoundError:
+        return Path(__file__).with_name("VERSION").read_text().strip()
+
+
+class VersionAction(Action):
+    """
+    Prints the version, which is only looked up if it is asked for.
+    """
+
+    def __init__(self, option_strings: List[str], dest: str, **kwargs):
+        super().__init__(option_strings, dest, nargs=0, **kwargs)
+
+    def __call__(
+        self,
+        parser: ArgumentParser,
+        namespace: Namespace,
+        values: Union[str, Sequence[Any], None],
+        option_string: Optional[str] = None,
+    ) -> None:
+        parser.exit(message=f"{parser.prog} {get_version()}\n")
 
 
 def main() -> None:  # pragma: no cover
     """
     This is the program's entry point.
     """
+    arguments: List[str] = sys.argv[1:]
+    if arguments[:1] == ["serve"]:
+        serve_main(arguments[1:])
+        return
+    if arguments[:1] == ["merge-reports"]:
+        merge_reports_main(arguments[1:])
+        return
+    if arguments[:1] == ["history"]:
+        history_main(arguments[1:])
+        return
+    if arguments[:1] == ["run"]:
+        arguments = arguments[1:]
+    run_main(arguments)
+
+
+def serve_main(arguments: List[str]) -> None:  # pragma: no cover
+    """
+    Start a daemon making the runs of test-tool run --daemon.
+
+    Parameters
+    ----------
+    arguments : List[str]
+        The command line arguments after serve.
+    """
+    parser = ArgumentParser(
+        prog="test-tool serve",
+        description="This programm keeps the plugins loaded and makes the "
+        + "runs of test-tool run --daemon.",
+        epilog="universal-test-tool Copyright (C) 2023 jackovsky8",
+    )
+
+    parser.add_argument(
+        "--socket",
+        action="store",
+        help="The path of the socket to listen on.",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--preload",
+        action="store",
+        nargs="*",
+        help="The call types of the plugins to import upfront.",
+        default=[],
+    )
+
+    parser.add_argument(
+        "-X", "--debug", action="store_true", help="Activate debugging."
+    )
+
+    args = parser.parse_args(arguments)
+    basicConfig(level=DEBUG if args.debug else INFO, format=LOG_FORMAT)
+
+    from test_tool.daemon import get_socket_path, serve
+
+    try:
+        serve(
+            Path(args.socket) if args.socket else get_socket_path(),
+            args.preload,
+        )
+    except OSError as e:
+        test_tool_logger.error(e)
+        sys.exit(1)
+
+
+def merge_reports_main(arguments: List[str]) -> None:  # pragma: no cover
+    """
+    Merge the reports of the runs of the shards.
+
+    Parameters
+    ----------
+    arguments : List[str]
+        The command line arguments after merge-reports.
+    """
+    parser = ArgumentParser(
+        prog="test-tool merge-reports",
+        description="This programm merges the timings, errors and logs of "
+        + "the runs of test-tool --shard.",
+        epilog="universal-test-tool Copyright (C) 2023 jackovsky8",
+    )
+
+    parser.add_argument(
+        "runs",
+        nargs="+",
+        metavar="RUN",
+        help="The output folders of the runs.",
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output",
+        action="store",
+        help="Create a folder with the merged reports.",
+        default="runs/%Y%m%d_%H%M%S_merged",
+    )
+
+    parser.add_argument(
+        "-X", "--debug", action="store_true", help="Activate debugging."
+    )
+
+    args = parser.parse_args(arguments)
+    basicConfig(level=DEBUG if args.debug else INFO, format=LOG_FORMAT)
+
+    from datetime import datetime
+
+    from test_tool.shard import merge_reports
+
+    errors = merge_reports(
+        [Path(run) for run in args.runs],
+        Path(datetime.now().strftime(args.output)),
+    )
+    sys.exit(1 if errors else 0)
+
+
+def history_main(arguments: List[str]) -> None:  # pragma: no cover
+    """
+    Show the trend of the step durations of the runs of a calls file.
+
+    Parameters
+    ----------
+    arguments : List[str]
+        The command line arguments after history.
+    """
+    parser = ArgumentParser(
+        prog="test-tool history",
+        description="This programm shows the durations of the steps of the "
+        + "last runs and flags steps, which got slower.",
+        epilog="universal-test-tool Copyright (C) 2023 jackovsky8",
+    )
+
+    parser.add_argument(
+        "-p",
+        "--project",
+        action="store",
+        help="The path to the project.",
+        default=getcwd(),
+    )
+
+    parser.add_argument(
+        "-ca",
+        "--calls",
+        action="store",
+        help="The filename of the calls configuration.",
+        default="calls.yaml",
+    )
+
+    parser.add_argument(
+        "--runs",
+        action="store",
+        type=int,
+        help="The number of runs the durations are taken from.",
+        default=10,
+    )
+
+    parser.add_argument(
+        "--threshold",
+        action="store",
+        type=float,
+        metavar="PERCENT",
+        help="Flag steps of the last run taking this much longer than "
+        + "the median of the runs before.",
+        default=50.0,
+    )
+
+    args = parser.parse_args(arguments)
+
+    from test_tool.history import get_calls_key, get_history_path, show_history
+
+    history_path = get_history_path()
+    if history_path is None:
+        parser.exit(1, "The history is disabled with the cache folder\n")
+    project_path = Path(args.project)
+    project, calls = get_calls_key(
+        project_path, project_path.joinpath(args.calls)
+    )
+    for line in show_history(
+        history_path, project, calls, args.runs, args.threshold / 100
+    ):
+        print(line)
+
+
+def run_main(arguments: List[str]) -> None:  # pragma: no cover
+    """
+    Run the tests, locally or in a daemon.
+
+    Parameters
+    ----------
+    arguments : List[str]
+        The command line arguments after run.
+    """
     parser = ArgumentParser(
         prog="test-tool",
         description="This programm runs tests configured in a yaml file.",
@@ -62,12 +292,173 @@ def main() -> None:  # pragma: no cover
         default="runs/%Y%m%d_%H%M%S",
     )
 
-    version: str = pkg_resources.require("universal_test_tool")[0].version
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        action="store",
+        type=int,
+        help="Run independent calls in parallel with the given number "
+        + "of workers.",
+        default=1,
+    )
+
+    parser.add_argument(
+        "-s",
+        "--stream",
+        action="store_true",
+        help="Load every call just before it is made, for large calls files.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile every call and write the profiles to the output "
+        + "folder.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="Trace the memory used by every call and flag calls leaving "
+        + "large objects behind.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Write the calls as Chrome trace events to the output folder.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--async",
+        action="store_true",
+        dest="async_engine",
+        help="Make the calls on an event loop, overlapping the I/O of up to "
+        + "--jobs calls.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--pipeline",
+        action="store",
+        type=int,
+        metavar="K",
+        help="Prepare up to K of the next calls while a call is made, if "
+        + "they do not depend on it.",
+        default=0,
+    )
+
+    parser.add_argument(
+        "--preflight",
+        action="store_true",
+        help="Load the plugins and augment all calls, before the first call "
+        + "is made.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only load the plugins and augment all calls, without making "
+        + "them.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store",
+        metavar="RUN",
+        help="Restore the data of a run from its output folder and start at "
+        + "its first failed call.",
+        default="",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Replay the results of unchanged cacheable calls from the "
+        + "result store, instead of making them.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--repeat",
+        action="store",
+        type=int,
+        metavar="N",
+        help="Run the calls N times in every user and write the latencies "
+        + "to the output folder.",
+        default=0,
+    )
+
+    parser.add_argument(
+        "--concurrency",
+        action="store",
+        type=int,
+        metavar="C",
+        help="Number of users running the calls repeatedly, each with its "
+        + "own data.",
+        default=1,
+    )
+
+    parser.add_argument(
+        "--duration",
+        action="store",
+        type=float,
+        metavar="SECONDS",
+        help="Run the calls repeatedly until the given number of seconds "
+        + "passed.",
+        default=0.0,
+    )
+
+    parser.add_argument(
+        "--shard",
+        action="store",
+        metavar="i/N",
+        help="Split the calls in N shards and only make the calls of "
+        + "shard i.",
+        default="",
+    )
+
+    parser.add_argument(
+        "--shard-timings",
+        action="store",
+        metavar="RUN",
+        help="Weight the calls by their durations in the output folder of "
+        + "a run, when splitting them in shards.",
+        default="",
+    )
+
+    parser.add_argument(
+        "--no-history",
+        action="store_false",
+        dest="history",
+        help="Do not append the durations of the calls to the history.",
+        default=True,
+    )
+
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Let the daemon started with test-tool serve run the tests.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--socket",
+        action="store",
+        help="The path of the socket the daemon listens on.",
+        default=None,
+    )
+
     parser.add_argument(
         "-v",
         "--version",
-        action="version",
-        version=f"%(prog)s {version}",
+        action=VersionAction,
         help="Show the version of the program.",
     )
 
@@ -76,17 +467,51 @@ def main() -> None:  # pragma: no cover
     )
 
     # Parse the arguments
-    args = parser.parse_args()
+    args = parser.parse_args(arguments)
 
-    log_format: str = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
     log_level = INFO
     if args.debug:
         log_level = DEBUG
-    basicConfig(level=log_level, format=log_format)
+    basicConfig(level=log_level, format=LOG_FORMAT)
 
-    run_tests(
-        args.project, args.calls, args.data, args.continue_tests, args.output
-    )
+    run_arguments: Dict[str, Any] = {
+        "project_path_str": args.project,
+        "calls_path_str": args.calls,
+        "data_path_str": args.data,
+        "continue_on_failure": args.continue_tests,
+        "output": args.output,
+        "jobs": args.jobs,
+        "stream": args.stream,
+        "profile": args.profile,
+        "memory": args.memory,
+        "trace_run": args.trace,
+        "async_engine": args.async_engine,
+        "pipeline": args.pipeline,
+        "preflight": args.preflight,
+        "check": args.check,
+        "resume": args.resume,
+        "incremental": args.incremental,
+        "repeat": args.repeat,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "shard": args.shard,
+        "shard_timings": args.shard_timings,
+        "history": args.history,
+    }
+
+    if args.daemon:
+        # The client only imports what is needed to talk to the daemon
+        from test_tool.daemon import get_socket_path, run_in_daemon
+
+        socket_path = Path(args.socket) if args.socket else get_socket_path()
+        try:
+            sys.exit(run_in_daemon(socket_path, run_arguments, log_level))
+        except ConnectionError as e:
+            test_tool_logger.warning("%s, running the tests here", e)
+
+    from test_tool.base import run_tests
+
+    run_tests(**run_arguments)
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -0,0 +1,255 @@
+"""
+This module contains the export of a run as Chrome trace events.
+
+Every step, its phases and the spans of the plugins are written as
+complete events to a JSON file, which can be opened with Perfetto or
+chrome://tracing. The calls of nested SUITE runs are shown on their own
+tracks.
+
+Plugins can add spans with trace_span, which does nothing if no trace is
+written:
+
+    from test_tool import trace_span
+
+    with trace_span("connect", host=host):
+        client.connect(host)
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+from json import dumps
+from logging import getLogger
+from os import getpid
+from pathlib import Path
+from threading import Lock, get_ident
+from time import perf_counter
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Get the logger
+test_tool_logger = getLogger("test-tool")
+
+# File in the output folder, the trace is written to
+TRACE_FILE: str = "trace.json"
+
+
+class Tracer:
+    """
+    Writes the trace events of a run, including nested SUITE runs.
+
+    Every event is written to the file right away.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.lock = Lock()
+        self.start = perf_counter()
+        self.pid = getpid()
+        self.runs = count(1)
+        self.tracks: Dict[Tuple[int, int, int], int] = {}
+        self.file = open(path, "w", encoding="utf-8")
+        self.file.write("[")
+        self.separator = "\n"
+
+    def write(self, event: Dict[str, Any]) -> None:
+        """
+        Write an event.
+
+        Parameters
+        ----------
+        event : Dict[str, Any]
+            The trace event.
+        """
+        with self.lock:
+            self.file.write(self.separator + dumps(event, default=str))
+            self.separator = ",\n"
+
+    def get_track(self, run: Tuple[int, str]) -> int:
+        """
+        Get the track of the current thread or lane in a run.
+
+        Parameters
+        ----------
+        run : Tuple[int, str]
+            Id and name of the run.
+
+        Returns
+        -------
+        int
+            The id of the track.
+        """
+        lane = current_lane.get()
+        key = (run[0], lane, 0 if lane else get_ident())
+        track = self.tracks.get(key)
+        if track is None:
+            with self.lock:
+                track = len(self.tracks) + 1
+                workers = sum(1 for other in self.tracks if other[0] == run[0])
+                self.tracks[key] = track
+            name = run[1] if not workers else f"{run[1]} ({workers + 1})"
+            self.write(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self.pid,
+                    "tid": track,
+                    "args": {"name": name},
+                }
+            )
+            self.write(
+                {
+                    "name": "thread_sort_index",
+                    "ph": "M",
+                    "pid": self.pid,
+                    "tid": track,
+                    "args": {"sort_index": track},
+                }
+            )
+        return track
+
+    def add_span(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        end: float,
+        args: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Add a finished span on the track of the current run and thread.
+
+        Parameters
+        ----------
+        name : str
+            Name of the span.
+        category : str
+            Category of the span, e.g. step, phase or plugin.
+        start : float
+            Start of the span, from perf_counter.
+        end : float
+            End of the span, from perf_counter.
+        args : Optional[Dict[str, Any]], optional
+            Values shown with the span, by default None.
+        """
+        event: Dict[str, Any] = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self.start) * 1e6, 3),
+            "dur": round((end - start) * 1e6, 3),
+            "pid": self.pid,
+            "tid": self.get_track(current_run.get()),
+        }
+        if args:
+            event["args"] = args
+        self.write(event)
+
+    def close(self) -> None:
+        """
+        Finish and close the trace file.
+        """
+        with self.lock:
+            self.file.write("\n]\n")
+            self.file.close()
+        test_tool_logger.info("Trace written to %s", self.path)
+
+
+# The tracer of the run, None if no trace is written
+active_tracer: Optional[Tracer] = None
+
+# The run the current thread makes calls for, as id and name
+current_run: ContextVar[Tuple[int, str]] = ContextVar(
+    "current_run", default=(0, "calls")
+)
+
+# The step the current thread makes, used to name nested runs
+current_step: ContextVar[str] = ContextVar("current_step", default="")
+
+# The lane of the steps overlapping on one event loop, 0 for threads
+current_lane: ContextVar[int] = ContextVar("current_lane", default=0)
+
+
+def start_trace(output_path: Path) -> Optional[Tracer]:
+    """
+    Start writing a trace, if there is no trace written yet.
+
+    Parameters
+    ----------
+    output_path : Path
+        The folder the trace is written to.
+
+    Returns
+    -------
+    Optional[Tracer]
+        The tracer, None if a trace is already written.
+    """
+    global active_tracer  # pylint: disable=global-statement
+    if active_tracer is not None:
+        return None
+    active_tracer = Tracer(output_path.joinpath(TRACE_FILE))
+    return active_tracer
+
+
+def stop_trace(tracer: Tracer) -> None:
+    """
+    Stop writing a trace.
+
+    Parameters
+    ----------
+    tracer : Tracer
+        The tracer returned by start_trace.
+    """
+    global active_tracer  # pylint: disable=global-statement
+    active_tracer = None
+    tracer.close()
+
+
+def start_run(name: str) -> Tuple[int, str]:
+    """
+    Create a run, the calls of which are shown on their own tracks.
+
+    The name of a nested run starts with the name of the step it was
+    started by.
+
+    Parameters
+    ----------
+    name : str
+        Name of the run, e.g. the calls file.
+
+    Returns
+    -------
+    Tuple[int, str]
+        Id and name of the run.
+    """
+    if active_tracer is None:
+        return current_run.get()
+    parent = current_step.get()
+    if parent:
+        name = f"{parent} > {name}"
+    return next(active_tracer.runs), name
+
+
+@contextmanager
+def trace_span(
+    name: str, category: str = "plugin", **args: Any
+) -> Iterator[None]:
+    """
+    Add a span to the trace, if a trace is written.
+
+    Parameters
+    ----------
+    name : str
+        Name of the span.
+    category : str, optional
+        Category of the span, by default plugin.
+    **args : Any
+        Values shown with the span.
+    """
+    tracer = active_tracer
+    if tracer is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        tracer.add_span(name, category, start, perf_counter(), args)
@@ -1,5 +1,13 @@
 """Utility functions for the test tool."""
-from typing import Dict
+from logging import info
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional
+
+from test_tool.resources import acquire_resource, get_secret_digest
+from test_tool.trace import trace_span
+
+if TYPE_CHECKING:
+    # paramiko is only imported when a connection is opened
+    from paramiko import SSHClient
 
 
 class DotDict(Dict):
@@ -8,3 +16,203 @@ class DotDict(Dict):
     __getattr__ = dict.get
     __setattr__ = dict.__setitem__  # type: ignore
     __delattr__ = dict.__delitem__  # type: ignore
+
+
+def is_shared(value: Any, token: object) -> bool:
+    """
+    Check if a value is a dict or list which is not owned by a call.
+
+    Parameters
+    ----------
+    value : Any
+        The value to check.
+    token : object
+        The token of the call.
+
+    Returns
+    -------
+    bool
+        True if the value has to be copied before it can be changed.
+    """
+    return isinstance(value, (dict, list)) and (
+        getattr(value, "_token", None) is not token
+    )
+
+
+def make_private(value: Any, token: object) -> Any:
+    """
+    Create a shallow copy of a dict or list owned by a call.
+
+    Parameters
+    ----------
+    value : Any
+        The dict or list to copy.
+    token : object
+        The token of the call.
+
+    Returns
+    -------
+    Any
+        The copy.
+    """
+    if isinstance(value, dict):
+        return CopyOnWriteDict(value, token=token)
+    # Iterate the raw list, so the elements of the source are not copied
+    return CopyOnWriteList(list.__iter__(value), token=token)
+
+
+class CopyOnWriteDict(Dict[Any, Any]):
+    """
+    A dict sharing the dicts and lists within with their source.
+
+    A shared dict or list is replaced by a private shallow copy when it is
+    accessed, so the source is never changed and values which are never
+    accessed are never copied.
+    """
+
+    __slots__ = ("_token",)
+
+    def __init__(
+        self, *args: Any, token: Optional[object] = None, **kwargs: Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self._token = object() if token is None else token
+
+    def __getitem__(self, key: Any) -> Any:
+        value = dict.__getitem__(self, key)
+        if is_shared(value, self._token):
+            value = make_private(value, self._token)
+            dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        if key in self:
+            return self[key]
+        return default
+
+    def items(self) -> List[Any]:  # type: ignore
+        return [(key, self[key]) for key in self]
+
+    def values(self) -> List[Any]:  # type: ignore
+        return [self[key] for key in self]
+
+    def pop(self, key: Any, *args: Any) -> Any:
+        value = dict.pop(self, key, *args)
+        if is_shared(value, self._token):
+            value = make_private(value, self._token)
+        return value
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        if key not in self:
+            dict.__setitem__(self, key, default)
+        return self[key]
+
+    def copy(self) -> "CopyOnWriteDict":
+        return CopyOnWriteDict(self)
+
+
+class CopyOnWriteList(List[Any]):
+    """
+    A list sharing the dicts and lists within with its source.
+
+    A shared dict or list is replaced by a private shallow copy when it is
+    accessed, so the source is never changed and values which are never
+    accessed are never copied.
+    """
+
+    __slots__ = ("_token",)
+
+    def __init__(
+        self, iterable: Iterable[Any] = (), token: Optional[object] = None
+    ) -> None:
+        super().__init__(iterable)
+        self._token = object() if token is None else token
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[idx] for idx in range(*index.indices(len(self)))]
+        value = list.__getitem__(self, index)
+        if is_shared(value, self._token):
+            value = make_private(value, self._token)
+            list.__setitem__(self, index, value)
+        return value
+
+    def __iter__(self) -> Any:
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def pop(self, index: Any = -1) -> Any:
+        value = list.pop(self, index)
+        if is_shared(value, self._token):
+            value = make_private(value, self._token)
+        return value
+
+    def copy(self) -> "CopyOnWriteList":
+        return CopyOnWriteList(list.__iter__(self))
+
+
+def is_ssh_client_active(client: "SSHClient") -> bool:
+    """
+    Check if the connection of an SSH client is still open.
+
+    Parameters
+    ----------
+    client : SSHClient
+        The client.
+
+    Returns
+    -------
+    bool
+        True if the client can be used.
+    """
+    transport = client.get_transport()
+    return transport is not None and transport.is_active()
+
+
+def run_with_ssh_client(
+    user: str, host: str, password: str, call: Callable[["SSHClient"], None]
+) -> None:
+    """
+    Run the callable with an SSH client.
+
+    The connection is kept open for the next calls of the run to the same
+    host, also by the other SSH plugins.
+
+    Parameters
+    ----------
+    user : str
+        The user name.
+    host : str
+        The host name.
+    password : str
+        The password.
+    call : Callable[[SSHClient], None]
+        The callable.
+    """
+    from paramiko import AutoAddPolicy, SSHClient
+
+    def connect() -> "SSHClient":
+        # Create an SSH client
+        info(f"Connect to {user}@{host}")
+        client = SSHClient()
+
+        # Automatically add the server's host key
+        client.set_missing_host_key_policy(AutoAddPolicy())
+
+        try:
+            # Connect to the remote server
+            with trace_span("SSH connect", host=host):
+                client.connect(host, username=user, password=password)
+        except BaseException:
+            client.close()
+            raise
+        return client
+
+    with acquire_resource(
+        ("SSH", user, host, get_secret_digest(password)),
+        connect,
+        lambda client: client.close(),
+        is_ssh_client_active,
+    ) as client:
+        # Run the callable
+        call(client)
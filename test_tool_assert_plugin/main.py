@@ -3,7 +3,7 @@ Module for the assert plugin."""
 from enum import Enum
 from logging import error, info
 from pathlib import Path
-from typing import Any, Dict, TypedDict
+from typing import Any, Dict, List, Optional, TypedDict
 
 
 class Operator(Enum):
@@ -110,6 +110,27 @@ def augment_assert_call(
         error(f'Unknown operator {call["operator"]}')
 
 
+def cacheable_assert_call(
+    call: AssertCall, path: Path  # pylint: disable=unused-argument
+) -> Optional[List[Path]]:
+    """
+    This function declares the call cacheable, it reads no files.
+
+    Parameters:
+    ----------
+    call: AssertCall
+        The augmented call
+    path: Path
+        The path of the file that contains the call
+
+    Returns:
+    -------
+    Optional[List[Path]]
+        The local files the call reads
+    """
+    return []
+
+
 def main() -> None:
     """
     This function will be called when the plugin is loaded.
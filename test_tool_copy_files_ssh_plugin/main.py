@@ -4,10 +4,14 @@ Module for copying files over SSH.
 from logging import debug, error, info
 from pathlib import Path
 from stat import S_ISDIR
-from typing import Any, Callable, Dict, TypedDict, List
+from typing import TYPE_CHECKING, Any, Dict, TypedDict, List
 from glob import glob
 
-from paramiko import AutoAddPolicy, SSHClient
+from test_tool import run_with_ssh_client
+
+if TYPE_CHECKING:
+    # paramiko is only imported when a connection is opened
+    from paramiko import SSHClient
 
 
 class CopyFilesSshCall(TypedDict):
@@ -32,27 +36,6 @@ default_copy_files_ssh_call: CopyFilesSshCall = {
 }
 
 
-def run_with_ssh_client(
-    user: str, host: str, password: str, call: Callable[[SSHClient], None]
-) -> None:
-    # Create an SSH client
-    info(f"Connect to {user}@{host}")
-    client = SSHClient()
-
-    # Automatically add the server's host key
-    client.set_missing_host_key_policy(AutoAddPolicy())
-
-    try:
-        # Connect to the remote server
-        client.connect(host, username=user, password=password)
-
-        # Run the callable
-        call(client)
-    finally:
-        # Close the SSH connection
-        client.close()
-
-
 def upload_directory(local_path: Path, remote_path: Path, sftp):
     debug(
         f"Upload directory {local_path.as_posix()} to {remote_path.as_posix()}"
@@ -94,7 +77,7 @@ def download_directory(remote_path: Path, local_path: Path, sftp):
 
 
 def copy_remote_file(
-    client: SSHClient,
+    client: "SSHClient",
     local_path: Path,
     remote_path: Path,
     download: bool = False,
@@ -6,10 +6,14 @@ import re
 import tempfile
 from logging import getLogger
 from pathlib import Path
-from typing import Any, Dict, List, Optional, TypedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, TypedDict
 from urllib.request import urlretrieve
 
-from jaydebeapi import Cursor, connect  # type: ignore
+from test_tool import trace_span
+
+if TYPE_CHECKING:
+    # jaydebeapi is only imported when a connection is opened
+    from jaydebeapi import Cursor  # type: ignore
 
 # Get the logger
 test_tool_logger = getLogger("test-tool")
@@ -158,7 +162,7 @@ def get_value_from_path(data: JdbcSqlResult, path: str) -> Any:
     return value
 
 
-def extract_result(cursor: Cursor) -> Optional[JdbcSqlResult]:
+def extract_result(cursor: "Cursor") -> Optional[JdbcSqlResult]:
     """
     This function will extract the result from the cursor.
     It will only return the result if it was an SELECT query.
@@ -179,7 +183,8 @@ def extract_result(cursor: Cursor) -> Optional[JdbcSqlResult]:
         rows: List[Dict[str, Any]] = []
         header = [str(column[0]).lower() for column in cursor.description]
 
-        fetched_rows = cursor.fetchall()
+        with trace_span("fetch"):
+            fetched_rows = cursor.fetchall()
         for row in fetched_rows:
             el = {}
             for i, column in enumerate(header):
@@ -202,22 +207,29 @@ def make_jdbc_sql_call(call: JdbcSqlCall, data: Dict[str, Any]) -> None:
     data: Dict
         The data that was passed to the function
     """
+    from jaydebeapi import connect  # type: ignore
+
     test_tool_logger.info("Run query: %s", call["query"])
 
-    # Establish the database connection
+    # Establish the database connection, it is not pooled, as a reused
+    # connection would leak its transaction and session state to the next
+    # steps
     test_tool_logger.debug(
         "Connect to %s with driver %s", call["url"], call["driver"]
     )
-    with connect(
-        call["driver"],
-        call["url"],
-        [call["username"], call["password"]],
-        call["driver_path"].absolute().as_posix(),
-    ) as conn:
+    with trace_span("connect", url=call["url"]):
+        conn = connect(
+            call["driver"],
+            call["url"],
+            [call["username"], call["password"]],
+            call["driver_path"].absolute().as_posix(),
+        )
+    with conn:
         with conn.cursor() as cursor:
             # Get the query and execute it
             query = call["query"]
-            cursor.execute(query)
+            with trace_span("execute", query=query):
+                cursor.execute(query)
 
             result: Optional[JdbcSqlResult] = extract_result(cursor)
 
@@ -341,6 +353,31 @@ def augment_jdbc_sql_call(
             raise ValueError(f"Parameter path is invalid: {path_string}")
 
 
+def cacheable_jdbc_sql_call(
+    call: JdbcSqlCall, path: Path  # pylint: disable=unused-argument
+) -> Optional[List[Path]]:
+    """
+    This function declares single SELECT queries cacheable, they do not
+    change the database.
+
+    Parameters:
+    ----------
+    call: JdbcSqlCall
+        The augmented call
+    path: Path
+        The path of the file
+
+    Returns:
+    -------
+    Optional[List[Path]]
+        The local files the call reads, None if the call is not cacheable
+    """
+    query: str = call["query"].strip().rstrip(";")
+    if ";" in query or not re.match(r"select\b", query, re.IGNORECASE):
+        return None
+    return [call["driver_path"]]
+
+
 def main() -> None:
     """
     This function will be called when the plugin is run as a script.
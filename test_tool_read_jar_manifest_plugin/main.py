@@ -99,6 +99,27 @@ def augment_read_jar_manifest_call(
             call["jar_path"] = path.joinpath(call["jar_path"])
 
 
+def cacheable_read_jar_manifest_call(
+    call: ReadJarManifestCall, path: Path  # pylint: disable=unused-argument
+) -> Optional[List[Path]]:
+    """
+    This function declares the call cacheable, it only reads the JAR file.
+
+    Parameters
+    ----------
+    call : ReadJarManifestCall
+        The augmented call.
+    path : Path
+        The path of the test tool.
+
+    Returns
+    -------
+    Optional[List[Path]]
+        The local files the call reads.
+    """
+    return [call["jar_path"]]
+
+
 def main() -> None:
     """
     This is the main function of the plugin.
@@ -1,6 +1,20 @@
 """
 This module contains the REST plugin for the universal test tool.
 """
-from .main import augment_rest_call, default_rest_call, make_rest_call
+from .main import (
+    augment_rest_call,
+    cacheable_rest_call,
+    default_rest_call,
+    make_rest_call,
+    setup_rest,
+    teardown_rest,
+)
 
-__all__ = ["augment_rest_call", "default_rest_call", "make_rest_call"]
+__all__ = [
+    "augment_rest_call",
+    "cacheable_rest_call",
+    "default_rest_call",
+    "make_rest_call",
+    "setup_rest",
+    "teardown_rest",
+]
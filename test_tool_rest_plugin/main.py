@@ -2,14 +2,36 @@
 This is the main file of the plugin. It is called by the test tool and
 contains the main function.
 """
+from contextlib import contextmanager
 from enum import Enum
 import json
 from logging import error, info
 from pathlib import Path
-from typing import IO, Any, Dict, List, Optional, Tuple, TypedDict
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypedDict,
+)
 from xml.dom.minidom import parseString
 
-from requests import delete, get, post, put
+from test_tool import RunContext, trace_span
+from test_tool.resources import current_context
+
+if TYPE_CHECKING:
+    # requests is only imported when the first call is made
+    from requests import Session
+    from requests.adapters import HTTPAdapter
+
+# The connections are kept alive and shared by the calls of a run, e.g. by
+# all runs of a test-tool serve daemon, and closed when it ends. Every call
+# has its own session, so no cookies are shared.
+ADAPTER_STATE: str = "rest_adapter"
 
 
 class Assertion(TypedDict):
@@ -201,6 +223,67 @@ default_request_body: Dict[str, Any] = {
 }
 
 
+def setup_rest(context: RunContext) -> None:
+    """
+    Create the connections shared by the calls of the run.
+
+    Parameters
+    ----------
+    context : RunContext
+        The context of the run.
+    """
+    from requests.adapters import HTTPAdapter
+
+    context.state[ADAPTER_STATE] = HTTPAdapter()
+
+
+def teardown_rest(context: RunContext) -> None:
+    """
+    Close the shared connections when the run ends.
+
+    Parameters
+    ----------
+    context : RunContext
+        The context of the run.
+    """
+    http_adapter: Optional["HTTPAdapter"] = context.state.pop(
+        ADAPTER_STATE, None
+    )
+    if http_adapter is not None:
+        http_adapter.close()
+
+
+@contextmanager
+def open_session() -> Iterator["Session"]:
+    """
+    Open a session using the shared connections of the run.
+
+    Outside of a run, the session has connections of its own.
+
+    Yields
+    ------
+    Iterator[Session]
+        The session, closed afterwards without the shared connections.
+    """
+    from requests import Session
+
+    context = current_context.get()
+    http_adapter: Optional["HTTPAdapter"] = (
+        None if context is None else context.state.get(ADAPTER_STATE)
+    )
+    with Session() as session:
+        if http_adapter is None:
+            yield session
+            return
+        session.mount("http://", http_adapter)
+        session.mount("https://", http_adapter)
+        try:
+            yield session
+        finally:
+            # Closing the session would close the shared adapter
+            session.adapters.clear()
+
+
 def pretty_xml(string: str) -> str:
     """
     Return a pretty printed xml string.
@@ -345,14 +428,17 @@ def assert_response(call: RestCall) -> None:
 
     # Make the call
     info(f'Make {call["method"].name} to {url}')
-    if call["method"] == Method.GET:
-        response = get(url, timeout=10, **data)
-    elif call["method"] == Method.POST:
-        response = post(url, timeout=10, **data)
-    elif call["method"] == Method.PUT:
-        response = put(url, timeout=10, **data)
-    elif call["method"] == Method.DELETE:
-        response = delete(url, timeout=10, **data)
+    with open_session() as session, trace_span(
+        f'HTTP {call["method"].name}', url=url
+    ):
+        if call["method"] == Method.GET:
+            response = session.get(url, timeout=10, **data)
+        elif call["method"] == Method.POST:
+            response = session.post(url, timeout=10, **data)
+        elif call["method"] == Method.PUT:
+            response = session.put(url, timeout=10, **data)
+        elif call["method"] == Method.DELETE:
+            response = session.delete(url, timeout=10, **data)
 
     info(f"Response Status: {response.status_code}")
     if call["hide_logs"] is False:
@@ -563,6 +649,34 @@ def augment_rest_call(
                 raise ValueError("Status codes must be integers.")
 
 
+def cacheable_rest_call(call: RestCall, path: Path) -> Optional[List[Path]]:
+    """
+    Declare GET calls cacheable, they do not change the server.
+
+    Parameters
+    ----------
+    call : RestCall
+        The augmented rest call.
+    path : Path
+        The project path.
+
+    Returns
+    -------
+    Optional[List[Path]]
+        The local files the call reads, None if the call is not cacheable.
+    """
+    if call["method"] != Method.GET:
+        return None
+    files: List[Path] = []
+    if call["files"] is not None:
+        for file in call["files"].values():
+            if file[0] is not None:
+                files.append(path.joinpath(file[0]))
+    if call["cert"] is not None:
+        files.append(path.joinpath(call["cert"]["path"]))
+    return files
+
+
 def main() -> None:
     """
     The main function of the plugin.
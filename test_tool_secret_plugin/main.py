@@ -5,9 +5,6 @@ from getpass import getpass
 from logging import getLogger
 from typing import TypedDict
 
-from keyring import delete_password, get_password, set_password
-from keyring.errors import KeyringError
-
 # Get the logger
 test_tool_logger = getLogger("test-tool")
 
@@ -69,6 +66,10 @@ def delete_secret(servicename: str, username: str) -> None:
     username: str
         The username
     """
+    # keyring is only imported when a secret is used
+    from keyring import delete_password
+    from keyring.errors import KeyringError
+
     try:
         delete_password(servicename, username)
         test_tool_logger.debug("Deleted password from keyring")
@@ -91,6 +92,10 @@ def make_secret_call(call: SecretCall) -> str:
     for env in call["env"]:
         os.environ[env["name"]] = env["value"]
 
+    # keyring is only imported when a secret is used
+    from keyring import get_password, set_password
+    from keyring.errors import KeyringError
+
     try:
         password = get_password(call["servicename"], call["username"])
     except KeyringError:
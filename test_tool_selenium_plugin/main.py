@@ -2,20 +2,14 @@
 Docstring for the main module.
 """
 from enum import Enum
+from importlib import import_module
 from logging import getLogger
 from typing import Any, Callable, Dict, List, TypedDict
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chromium.options import ChromiumOptions
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
 from test_tool_selenium_plugin.actions import (BLACKLIST, SeleniumAction,
                                                get_arguments,
                                                get_set_or_call_attribute,
                                                run_action)
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.firefox import GeckoDriverManager
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
 
 # Get the logger
 test_tool_logger = getLogger("test-tool")
@@ -31,28 +25,51 @@ class BrowserType(Enum):
     CHROMIUM_EDGE = "chromium-edge"
 
 
+# The classes are only imported when a browser is started, as selenium and
+# webdriver_manager take long to import
+
 # Define the mapping between the browser type and the driver manager
-BROWSER_MAPPING: Dict[BrowserType, Callable] = {
-    BrowserType.CHROME: ChromeDriverManager,
-    BrowserType.GECKO: GeckoDriverManager,
-    BrowserType.CHROMIUM_EDGE: EdgeChromiumDriverManager,
+BROWSER_MAPPING: Dict[BrowserType, str] = {
+    BrowserType.CHROME: "webdriver_manager.chrome.ChromeDriverManager",
+    BrowserType.GECKO: "webdriver_manager.firefox.GeckoDriverManager",
+    BrowserType.CHROMIUM_EDGE:
+        "webdriver_manager.microsoft.EdgeChromiumDriverManager",
 }
 
 # Define the mapping between the browser type and the options
-BROWSER_OPTIONS_MAPPING: Dict[BrowserType, Callable] = {
-    BrowserType.CHROME: ChromeOptions,
-    BrowserType.GECKO: FirefoxOptions,
-    BrowserType.CHROMIUM_EDGE: ChromiumOptions,
+BROWSER_OPTIONS_MAPPING: Dict[BrowserType, str] = {
+    BrowserType.CHROME: "selenium.webdriver.chrome.options.Options",
+    BrowserType.GECKO: "selenium.webdriver.firefox.options.Options",
+    BrowserType.CHROMIUM_EDGE:
+        "selenium.webdriver.chromium.options.ChromiumOptions",
 }
 
 # Define the mapping between the browser type and the driver
-BROWSER_DRIVER_MAPPING: Dict[BrowserType, Callable] = {
-    BrowserType.CHROME: webdriver.Chrome,
-    BrowserType.GECKO: webdriver.Firefox,
-    BrowserType.CHROMIUM_EDGE: webdriver.ChromiumEdge,
+BROWSER_DRIVER_MAPPING: Dict[BrowserType, str] = {
+    BrowserType.CHROME: "selenium.webdriver.Chrome",
+    BrowserType.GECKO: "selenium.webdriver.Firefox",
+    BrowserType.CHROMIUM_EDGE: "selenium.webdriver.ChromiumEdge",
 }
 
 
+def load_class(path: str) -> Callable:
+    """
+    Import a class by its full path.
+
+    Parameters:
+    -----------
+    path: str
+        The module and name of the class, e.g. selenium.webdriver.Chrome.
+
+    Returns:
+    --------
+    Callable
+        The class.
+    """
+    module, name = path.rsplit(".", 1)
+    return getattr(import_module(module), name)
+
+
 class SeleniumCall(TypedDict):
     """
     The structure of a Selenium call.
@@ -93,10 +110,10 @@ def make_selenium_call(call: SeleniumCall) -> None:
     # For each webdriver
     for web_driver in call["webdriver"]:
         # Install the webdriver
-        BROWSER_MAPPING[web_driver]().install()
+        load_class(BROWSER_MAPPING[web_driver])().install()
 
         # Create browser options
-        browser_options = BROWSER_OPTIONS_MAPPING[web_driver]()
+        browser_options = load_class(BROWSER_OPTIONS_MAPPING[web_driver])()
         for option in call["options"].keys():
             if option in BLACKLIST:
                 raise ValueError(f"Option {option} is not allowed.")
@@ -110,7 +127,9 @@ def make_selenium_call(call: SeleniumCall) -> None:
                 )
 
         # Create a new instance of the Chrome driver
-        driver = BROWSER_DRIVER_MAPPING[web_driver](options=browser_options)
+        driver = load_class(BROWSER_DRIVER_MAPPING[web_driver])(
+            options=browser_options
+        )
 
         # Open the website
         driver.get(call["url"])
@@ -5,9 +5,13 @@ It provides the ability to run commands on a remote host via SSH.
 """
 from logging import error, info
 from pathlib import Path
-from typing import Any, Callable, Dict, TypedDict
+from typing import TYPE_CHECKING, Any, Dict, TypedDict
 
-from paramiko import AutoAddPolicy, SSHClient
+from test_tool import run_with_ssh_client, trace_span
+
+if TYPE_CHECKING:
+    # paramiko is only imported when a connection is opened
+    from paramiko import SSHClient
 
 
 class SshCmdCall(TypedDict):
@@ -31,43 +35,8 @@ default_ssh_cmd_call: SshCmdCall = {
 }
 
 
-def run_with_ssh_client(
-    user: str, host: str, password: str, call: Callable[[SSHClient], None]
-) -> None:
-    """
-    Run the callable with an SSH client.
-
-    Parameters
-    ----------
-    user : str
-        The user name.
-    host : str
-        The host name.
-    password : str
-        The password.
-    call : Callable[[SSHClient], None]
-        The callable.
-    """
-    # Create an SSH client
-    info(f"Connect to {user}@{host}")
-    client = SSHClient()
-
-    # Automatically add the server's host key
-    client.set_missing_host_key_policy(AutoAddPolicy())
-
-    try:
-        # Connect to the remote server
-        client.connect(host, username=user, password=password)
-
-        # Run the callable
-        call(client)
-    finally:
-        # Close the SSH connection
-        client.close()
-
-
 def run_ssh_cmd(
-    client: SSHClient, cmd: str, expected_return_code: int
+    client: "SSHClient", cmd: str, expected_return_code: int
 ) -> None:
     """
     Run an SSH command.
@@ -82,11 +51,12 @@ def run_ssh_cmd(
         The expected return code.
     """
     # Execute the command
-    _, stdout, stderr = client.exec_command(cmd)
+    with trace_span("SSH exec", cmd=cmd):
+        _, stdout, stderr = client.exec_command(cmd)
 
-    # Read and print the output
-    output_str = stdout.read().decode("utf-8")
-    error_str = stderr.read().decode("utf-8")
+        # Read and print the output
+        output_str = stdout.read().decode("utf-8")
+        error_str = stderr.read().decode("utf-8")
     if output_str:
         info(output_str.strip().strip("'").strip('"'))
     if error_str:
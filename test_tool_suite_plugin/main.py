@@ -20,6 +20,8 @@ class SuiteCall(TypedDict):
     data: str
     continue_tests: bool
     output: str
+    jobs: int
+    stream: bool
 
 
 # Define the default call
@@ -29,6 +31,8 @@ default_suite_call: SuiteCall = {
     "data": "data.yaml",
     "continue_tests": False,
     "output": "runs/%Y%m%d_%H%M%S",
+    "jobs": 1,
+    "stream": False,
 }
 
 
@@ -43,12 +47,14 @@ def make_suite_call(call: SuiteCall) -> None:
     """
     test_tool_logger.info(
         "Running suite call with project: %s, calls: %s, "
-        + "data: %s, continue_tests: %s, output: %s",
+        + "data: %s, continue_tests: %s, output: %s, jobs: %s, stream: %s",
         call["project"],
         call["calls"],
         call["data"],
         call["continue_tests"],
         call["output"],
+        call["jobs"],
+        call["stream"],
     )
 
     run_tests(
@@ -57,6 +63,8 @@ def make_suite_call(call: SuiteCall) -> None:
         call["data"],
         call["continue_tests"],
         call["output"],
+        call["jobs"],
+        call["stream"],
     )
 
 
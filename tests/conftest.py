@@ -18,3 +18,19 @@ def go_to_tmpdir(request):
     # Chdir only for the duration of the test.
     with tmpdir.as_cwd():
         yield
+
+
+# each test uses its own caches
+@pytest.fixture(autouse=True)
+def use_temporary_cache(tmpdir, monkeypatch):
+    """
+    Use caches in the temporary directory of the test.
+    """
+    monkeypatch.setenv("TEST_TOOL_CACHE_HOME", str(tmpdir.join("caches")))
+    monkeypatch.setenv("TEST_TOOL_CACHE_DIR", str(tmpdir.join("cache")))
+    for variable in [
+        "TEST_TOOL_HISTORY_DIR",
+        "TEST_TOOL_RESULTS_DIR",
+        "TEST_TOOL_PLUGINS_DIR",
+    ]:
+        monkeypatch.delenv(variable, raising=False)
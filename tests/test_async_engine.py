@@ -0,0 +1,235 @@
+"""
+This module contains tests for the async_engine module.
+"""
+import asyncio
+import sys
+from pathlib import Path
+from threading import get_ident
+from time import perf_counter
+from typing import Any, Dict, List
+
+import pytest
+from test_tool.base import Call, CallType, import_plugin, make_all_calls
+from test_tool.scheduler import DATA_WRITES, run_scheduled_async
+
+
+class AsyncMock(object):
+    """
+    A mock class for test plugin with coroutine functions.
+    """
+
+    default_mock_call: Dict[str, Any] = {"fail": False}
+
+    @staticmethod
+    def make_mock_call(call: Dict[str, Any]) -> None:
+        """
+        A mock function, which is not used if there is a coroutine function.
+        """
+        raise AssertionError("Sync function called")
+
+    @staticmethod
+    async def augment_mock_call_async(call: Dict[str, Any]) -> None:
+        """
+        A mock coroutine function waiting for a tenth of a second.
+        """
+        await asyncio.sleep(0.1)
+
+    @staticmethod
+    async def make_mock_call_async(
+        call: Dict[str, Any], data: Dict[str, Any]
+    ) -> None:
+        """
+        A mock coroutine function waiting for a tenth of a second.
+        """
+        await asyncio.sleep(0.1)
+        assert not call["fail"], "Call failed"
+        data[f"RESULT_{call['id']}"] = call["id"]
+
+
+def test_import_plugin_async_functions() -> None:
+    """
+    Test that the coroutine functions of a plugin are found.
+    """
+    sys.modules["test_tool_mock_plugin"] = AsyncMock  # type: ignore
+    loaded_call_types: Dict[str, CallType] = {}
+
+    assert import_plugin("MOCK", loaded_call_types)
+
+    loaded = loaded_call_types["MOCK"]
+    assert loaded["make_call_async"] is AsyncMock.make_mock_call_async
+    assert loaded["invoke_make_call_async"] is not None
+    assert loaded["invoke_augment_call_async"] is not None
+
+
+def test_import_plugin_async_function_not_coroutine() -> None:
+    """
+    Test that an async function of a plugin must be a coroutine function.
+    """
+
+    class WrongMock(object):
+        """
+        A wrong mock class for test plugin.
+        """
+
+        @staticmethod
+        def make_mock_call_async() -> None:
+            """
+            A mock function, which is not a coroutine function.
+            """
+
+    sys.modules["test_tool_mock_plugin"] = WrongMock  # type: ignore
+    loaded_call_types: Dict[str, CallType] = {}
+
+    with pytest.raises(AttributeError) as excinfo:
+        import_plugin("MOCK", loaded_call_types)
+
+    assert "is not a coroutine function" in str(excinfo.value)
+
+
+def test_run_scheduled_async_stop_on_error() -> None:
+    """
+    Test that no further calls are started after the first error.
+    """
+    order: List[int] = []
+
+    async def run_step(idx: int) -> bool:
+        order.append(idx)
+        return True
+
+    errors = asyncio.run(
+        run_scheduled_async([set(), {0}, {1}], run_step, False, 4)
+    )
+
+    assert errors == 1
+    assert order == [0]
+
+
+def test_make_all_calls_async_overlaps_calls(tmpdir, monkeypatch) -> None:
+    """
+    Test that independent calls wait for their I/O at the same time.
+    """
+    sys.modules["test_tool_mock_plugin"] = AsyncMock  # type: ignore
+    monkeypatch.setitem(
+        DATA_WRITES, "MOCK", lambda call: {f"RESULT_{call['id']}"}
+    )
+    calls: List[Call] = [
+        {"type": "MOCK", "call": {"id": i}, "line": i} for i in range(10)
+    ]
+    data: Dict[str, Any] = {}
+
+    start = perf_counter()
+    errors = make_all_calls(
+        calls, data, Path(tmpdir), False, 10, async_engine=True
+    )
+
+    assert errors == 0
+    assert perf_counter() - start < 1
+    assert data == {f"RESULT_{i}": i for i in range(10)}
+
+
+def test_make_all_calls_async_errors(tmpdir) -> None:
+    """
+    Test that errors are counted like in the sync engine.
+    """
+    sys.modules["test_tool_mock_plugin"] = AsyncMock  # type: ignore
+    calls: List[Call] = [
+        {"type": "MOCK", "call": {"id": 1, "fail": True}, "line": 1},
+        {"type": "MOCK", "call": {"id": 2}, "line": 4},
+        {"type": "MOCK", "call": {"id": 3, "fail": True}, "line": 7},
+    ]
+
+    assert (
+        make_all_calls(
+            calls, {}, Path(tmpdir), False, 1, None, False, False, True
+        )
+        == 1
+    )
+    assert (
+        make_all_calls(
+            calls, {}, Path(tmpdir), True, 1, None, False, False, True
+        )
+        == 2
+    )
+    assert (
+        make_all_calls(
+            calls, {}, Path(tmpdir), True, 3, None, False, False, True
+        )
+        == 2
+    )
+
+
+def test_make_all_calls_async_sync_plugin(tmpdir) -> None:
+    """
+    Test that the sync functions of a plugin run on a worker thread.
+    """
+    threads: List[int] = []
+
+    class SyncMock(object):
+        """
+        A mock class for test plugin without coroutine functions.
+        """
+
+        @staticmethod
+        def make_mock_call() -> None:
+            """
+            A mock function recording its thread.
+            """
+            threads.append(get_ident())
+
+    sys.modules["test_tool_mock_plugin"] = SyncMock  # type: ignore
+    calls: List[Call] = [
+        {"type": "MOCK", "call": {}, "line": 1},
+        {"type": "MOCK", "call": {}, "line": 4},
+    ]
+
+    errors = make_all_calls(
+        calls, {}, Path(tmpdir), False, 2, async_engine=True
+    )
+
+    assert errors == 0
+    assert len(threads) == 2
+    assert get_ident() not in threads
+
+
+@pytest.mark.parametrize("jobs, pipeline", [(1, 0), (2, 0), (1, 2)])
+def test_make_all_calls_sync_async_only_plugin(tmpdir, jobs, pipeline) -> None:
+    """
+    Test that the sync engine runs the coroutine functions of a plugin
+    without sync functions.
+    """
+
+    class AsyncOnlyMock(object):
+        """
+        A mock class for test plugin with coroutine functions only.
+        """
+
+        @staticmethod
+        async def augment_mock_call_async(call: Dict[str, Any]) -> None:
+            """
+            A mock coroutine function marking the call as augmented.
+            """
+            await asyncio.sleep(0)
+            call["augmented"] = True
+
+        @staticmethod
+        async def make_mock_call_async(
+            call: Dict[str, Any], data: Dict[str, Any]
+        ) -> None:
+            """
+            A mock coroutine function saving the augmented call.
+            """
+            await asyncio.sleep(0)
+            data[f"RESULT_{call['id']}"] = call["augmented"]
+
+    sys.modules["test_tool_mock_plugin"] = AsyncOnlyMock  # type: ignore
+    calls: List[Call] = [
+        {"type": "MOCK", "call": {"id": i}, "line": i} for i in range(2)
+    ]
+    data: Dict[str, Any] = {}
+
+    errors = make_all_calls(
+        calls, data, Path(tmpdir), False, jobs, pipeline=pipeline
+    )
+
+    assert errors == 0
+    assert data == {"RESULT_0": True, "RESULT_1": True}
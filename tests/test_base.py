@@ -9,14 +9,17 @@ from typing import Any, Dict, List
 
 import pytest
 import yaml
+from test_tool import base, plugin_arguments
 from test_tool.base import (
     Call,
     CallType,
     import_plugin,
+    iter_config_yaml,
     load_config_yaml,
     make_all_calls,
     run_tests,
 )
+from test_tool.scheduler import DATA_WRITES
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -111,6 +114,68 @@ def test_import_plugin_wrong_members_type() -> None:
     )
 
 
+def test_import_plugin_builds_invokers() -> None:
+    """
+    Test that the invokers only pass the arguments a function takes.
+    """
+    passed: List[Dict[str, Any]] = []
+
+    class InvokerMock(object):
+        """
+        A mock class for test plugin.
+        """
+
+        @staticmethod
+        def augment_mock_call(path: Path, call: Dict[str, Any]) -> None:
+            """
+            A mock function taking the path and call.
+            """
+            passed.append({"path": path, "call": call})
+
+        @staticmethod
+        @plugin_arguments("data")
+        def make_mock_call(*args, **kwargs) -> None:
+            """
+            A mock function declaring its arguments.
+            """
+            passed.append(kwargs)
+
+    sys.modules["test_tool_mock_plugin"] = InvokerMock  # type: ignore
+    loaded_call_types: Dict[str, CallType] = {}
+    import_plugin("MOCK", loaded_call_types)
+
+    loaded_call_types["MOCK"]["invoke_augment_call"]({}, {}, Path("."))
+    loaded_call_types["MOCK"]["invoke_make_call"]({}, {"a": 1}, Path("."))
+
+    assert passed == [{"path": Path("."), "call": {}}, {"data": {"a": 1}}]
+
+
+def test_import_plugin_wrong_declared_arguments() -> None:
+    """
+    Test that declaring an argument which is not passed raises an error.
+    """
+
+    class WrongArgumentsMock(object):
+        """
+        A mock class for test plugin.
+        """
+
+        @staticmethod
+        @plugin_arguments("call", "path")
+        def make_mock_call(call: Dict[str, Any], path: Path) -> None:
+            """
+            A mock function declaring an argument which is not passed.
+            """
+
+    sys.modules["test_tool_mock_plugin"] = WrongArgumentsMock  # type: ignore
+    loaded_call_types: Dict[str, CallType] = {}
+
+    with pytest.raises(AttributeError) as excinfo:
+        import_plugin("MOCK", loaded_call_types)
+
+    assert "allowed are call, data" in str(excinfo.value.args[0])
+
+
 def test_make_all_calls() -> None:
     """
     Test the make_all_calls function.
@@ -263,6 +328,48 @@ def test_make_all_calls_and_dont_require_all_arguments() -> None:
     assert errors == 0
 
 
+def test_make_all_calls_substitutes_augmented_values() -> None:
+    """
+    Test that values set by the augmenting function are substituted.
+    """
+    made: List[Dict[str, Any]] = []
+
+    class AugmentMock(object):
+        """
+        A mock class for test plugin.
+        """
+
+        default_mock_call: Dict[str, Any] = {"url": "{{BASE}}"}
+
+        @staticmethod
+        def augment_mock_call(call: Dict[str, Any]) -> None:
+            """
+            A mock function setting a value with a variable.
+            """
+            call["path"] = "{{BASE}}/path"
+
+        @staticmethod
+        def make_mock_call(call: Dict[str, Any]) -> None:
+            """
+            A mock function storing the call.
+            """
+            made.append(call)
+
+    sys.modules["test_tool_mock_plugin"] = AugmentMock  # type: ignore
+
+    calls: List[Call] = [{"type": "MOCK", "call": {}, "line": 1}]
+    data: Dict[str, Any] = {"BASE": "http://localhost"}
+    temporary_directory = Path(tempfile.gettempdir()).joinpath("test_tool")
+    temporary_directory.mkdir(exist_ok=True)
+
+    errors = make_all_calls(calls, data, temporary_directory, False)
+
+    assert errors == 0
+    assert made == [
+        {"url": "http://localhost", "path": "http://localhost/path"}
+    ]
+
+
 def test_load_config_yaml() -> None:
     """
     Test the load_config_yaml function.
@@ -305,6 +412,56 @@ def test_load_config_yaml_with_line_numbers() -> None:
     ]
 
 
+def test_load_config_yaml_line_numbers_flow_style_and_comments() -> None:
+    """
+    Test the line numbers of flow style and commented calls.
+    """
+    path: Path = Path(tempfile.gettempdir()).joinpath(
+        "test_tool/config/test.yaml"
+    )
+    path.parent.mkdir(exist_ok=True, parents=True)
+
+    test_config = (
+        "# - type: COMMENTED\n"
+        "- {type: MOCK, call: {test: 1}}\n"
+        "\n"
+        "-   # The second call\n"
+        "    call:\n"
+        "      test: 2\n"
+        "    type: MOCK\n"
+    )
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(test_config)
+
+    config = load_config_yaml(path, True)
+
+    assert config == [
+        {"type": "MOCK", "call": {"test": 1}, "line": 2},
+        {"type": "MOCK", "call": {"test": 2}, "line": 5},
+    ]
+
+
+def test_load_config_yaml_pure_python(monkeypatch) -> None:
+    """
+    Test the load_config_yaml function without libyaml.
+    """
+    monkeypatch.setattr(base, "SafeLoader", yaml.SafeLoader)
+    path: Path = Path(tempfile.gettempdir()).joinpath(
+        "test_tool/config/test.yaml"
+    )
+    path.parent.mkdir(exist_ok=True, parents=True)
+
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("- type: MOCK\n  call:\n    test: 1\n- type: MOCK\n")
+
+    config = load_config_yaml(path, True)
+
+    assert config == [
+        {"type": "MOCK", "call": {"test": 1}, "line": 1},
+        {"type": "MOCK", "line": 4},
+    ]
+
+
 def test_load_config_yaml_no_file() -> None:
     """
     Test the load_config_yaml function.
@@ -320,6 +477,70 @@ def test_load_config_yaml_no_file() -> None:
     assert excinfo.value.args == (2, "No such file or directory")
 
 
+def test_iter_config_yaml() -> None:
+    """
+    Test that the calls of all documents are loaded one by one.
+    """
+    path: Path = Path(tempfile.gettempdir()).joinpath(
+        "test_tool/config/test.yaml"
+    )
+    path.parent.mkdir(exist_ok=True, parents=True)
+
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(
+            "- &first {type: MOCK, call: {test: 1}}\n"
+            "- type: MOCK\n"
+            "  call: *first\n"
+            "---\n"
+            "type: MOCK\n"
+        )
+
+    calls = iter_config_yaml(path)
+
+    assert next(calls) == {"type": "MOCK", "call": {"test": 1}, "line": 1}
+    assert list(calls) == [
+        {
+            "type": "MOCK",
+            "call": {"type": "MOCK", "call": {"test": 1}},
+            "line": 2,
+        },
+        {"type": "MOCK", "line": 5},
+    ]
+
+
+def test_make_all_calls_streams_calls() -> None:
+    """
+    Test that calls are made before the rest of the file is loaded.
+    """
+    made: List[int] = []
+
+    class StreamMock(object):
+        """
+        A mock class for test plugin.
+        """
+
+        @staticmethod
+        def make_mock_call(call: Dict[str, Any]) -> None:
+            """
+            A mock function storing the call.
+            """
+            made.append(call["test"])
+
+    sys.modules["test_tool_mock_plugin"] = StreamMock  # type: ignore
+    path: Path = Path(tempfile.gettempdir()).joinpath(
+        "test_tool/config/test.yaml"
+    )
+    path.parent.mkdir(exist_ok=True, parents=True)
+
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("- type: MOCK\n  call:\n    test: 1\n- type: [\n")
+
+    with pytest.raises(SystemExit):
+        make_all_calls(iter_config_yaml(path), {}, path.parent, False)
+
+    assert made == [1]
+
+
 def test_run_tests() -> None:
     """
     Test the run_tests function.
@@ -372,3 +593,124 @@ def test_run_tests_no_data() -> None:
     # Check if the output folder was created
     assert path.joinpath("output").exists()
     assert path.joinpath("output").is_dir()
+
+
+class CheckMock(object):
+    """
+    A mock class for test plugin validating its calls when augmenting.
+    """
+
+    made: List[int] = []
+
+    default_mock_call: Dict[str, Any] = {"method": "GET"}
+
+    @staticmethod
+    def augment_mock_call(call: Dict[str, Any], data: Dict[str, Any]) -> None:
+        """
+        A mock function failing for an unknown method.
+        """
+        if call["method"] not in ("GET", "POST"):
+            raise ValueError("Method is not supported.")
+        data["AUGMENTED"] = True
+
+    @staticmethod
+    def make_mock_call(call: Dict[str, Any], data: Dict[str, Any]) -> None:
+        """
+        A mock function recording the call.
+        """
+        CheckMock.made.append(call["id"])
+        data[f"RESULT_{call['id']}"] = call["id"]
+
+
+def write_calls(path: Path, calls: List[Dict[str, Any]]) -> None:
+    """
+    Write a calls file to an empty project folder.
+
+    Parameters
+    ----------
+    path : Path
+        Folder of the project.
+    calls : List[Dict[str, Any]]
+        The calls.
+    """
+    rmtree(path, ignore_errors=True)
+    path.mkdir(parents=True)
+    with open(path.joinpath("calls.yaml"), "w", encoding="utf-8") as file:
+        file.write(yaml.dump(calls))
+
+
+def test_run_tests_preflight() -> None:
+    """
+    Test that a wrong call is found before the first call is made.
+    """
+    sys.modules["test_tool_mock_plugin"] = CheckMock  # type: ignore
+    CheckMock.made = []
+    path: Path = Path(tempfile.gettempdir()).joinpath("test_tool/check")
+    write_calls(
+        path,
+        [
+            {"type": "MOCK", "call": {"id": 1}},
+            {"type": "MOCK", "call": {"id": 2, "method": "GTE"}},
+        ],
+    )
+
+    with pytest.raises(SystemExit):
+        run_tests(
+            path.as_posix(),
+            "calls.yaml",
+            "data.yaml",
+            False,
+            "",
+            preflight=True,
+        )
+
+    assert CheckMock.made == []
+
+
+def test_check_all_calls_defers_runtime_data(monkeypatch) -> None:
+    """
+    Test that a call using data written by a call before is deferred.
+    """
+    sys.modules["test_tool_mock_plugin"] = CheckMock  # type: ignore
+    monkeypatch.setitem(
+        DATA_WRITES, "MOCK", lambda call: {f"RESULT_{call['id']}"}
+    )
+    calls: List[Call] = [
+        {"type": "MOCK", "call": {"id": 1}, "line": 1},
+        {
+            "type": "MOCK",
+            "call": {"id": 2, "method": "{{ RESULT_1 }}"},
+            "line": 4,
+        },
+        {
+            "type": "MOCK",
+            "call": {"id": 3, "method": "{{ METHOD }}"},
+            "line": 7,
+        },
+    ]
+    data: Dict[str, Any] = {"METHOD": "POST"}
+
+    assert base.check_all_calls(calls, data, Path(".")) == 0
+    # The data is not changed by the augmenting functions
+    assert data == {"METHOD": "POST"}
+
+    calls[2]["call"]["method"] = "{{ MISSING }}"
+
+    assert base.check_all_calls(calls, data, Path(".")) == 1
+
+
+def test_run_tests_check() -> None:
+    """
+    Test that the calls are only checked, nothing is made or written.
+    """
+    sys.modules["test_tool_mock_plugin"] = CheckMock  # type: ignore
+    CheckMock.made = []
+    path: Path = Path(tempfile.gettempdir()).joinpath("test_tool/check")
+    write_calls(path, [{"type": "MOCK", "call": {"id": 1}}])
+
+    run_tests(
+        path.as_posix(), "calls.yaml", "data.yaml", False, "output", check=True
+    )
+
+    assert CheckMock.made == []
+    assert not path.joinpath("output").exists()
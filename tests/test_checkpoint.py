@@ -0,0 +1,169 @@
+"""
+This module contains tests for the checkpoint module.
+"""
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+from test_tool.base import run_tests
+from test_tool.checkpoint import (
+    Checkpoint,
+    load_checkpoint,
+    remove_secrets,
+    restore_data,
+)
+from yaml import dump
+
+
+class ResumeMock(object):
+    """
+    A mock class for test plugin recording the calls it makes.
+    """
+
+    made: List[int] = []
+
+    @staticmethod
+    def make_mock_call(call: Dict[str, Any], data: Dict[str, Any]) -> None:
+        """
+        A mock function writing into the data or failing.
+        """
+        ResumeMock.made.append(call["id"])
+        assert not call.get("fail"), "Call failed"
+        if call["id"] == 1:
+            data["RESULT"] = 42
+            data["CALLBACK"] = lambda: None
+        else:
+            assert data["RESULT"] == 42
+            assert data["db"]["password"] == "hunter2"
+
+
+def write_project(path: Path, fail: bool) -> None:
+    """
+    Write a project with three calls, the second one may fail.
+
+    Parameters
+    ----------
+    path : Path
+        Folder of the project.
+    fail : bool
+        Let the second call fail.
+    """
+    path.mkdir(exist_ok=True)
+    with open(path.joinpath("data.yaml"), "w", encoding="utf-8") as file:
+        file.write(dump({"db": {"user": "test", "password": "hunter2"}}))
+    with open(path.joinpath("calls.yaml"), "w", encoding="utf-8") as file:
+        file.write(
+            dump(
+                [
+                    {"type": "MOCK", "call": {"id": 1}},
+                    {"type": "MOCK", "call": {"id": 2, "fail": fail}},
+                    {"type": "MOCK", "call": {"id": 3}},
+                ]
+            )
+        )
+
+
+def test_run_tests_resume(tmpdir, caplog) -> None:
+    """
+    Test that a resumed run starts at the failed call with the data of the
+    run before.
+    """
+    sys.modules["test_tool_mock_plugin"] = ResumeMock  # type: ignore
+    ResumeMock.made = []
+    project = Path(tmpdir).joinpath("project")
+    write_project(project, True)
+
+    with pytest.raises(SystemExit):
+        run_tests(project.as_posix(), "calls.yaml", "data.yaml", False, "run1")
+
+    checkpoint = load_checkpoint(project.joinpath("run1"))
+    assert checkpoint["step"] == 1
+    assert checkpoint["data"]["RESULT"] == 42
+    assert checkpoint["data"]["db"] == {"user": "test"}
+    assert checkpoint["secrets"] == ["db.password"]
+    assert checkpoint["unpicklable"] == ["CALLBACK"]
+    assert "CALLBACK of the data can not be checkpointed" in caplog.text
+
+    ResumeMock.made = []
+    write_project(project, False)
+
+    run_tests(
+        project.as_posix(),
+        "calls.yaml",
+        "data.yaml",
+        False,
+        "run2",
+        resume="run1",
+    )
+
+    assert ResumeMock.made == [2, 3]
+    assert load_checkpoint(project.joinpath("run2"))["step"] == 3
+
+
+def test_run_tests_resume_no_checkpoint(tmpdir) -> None:
+    """
+    Test that resuming a folder without checkpoint fails.
+    """
+    project = Path(tmpdir).joinpath("project")
+    write_project(project, False)
+
+    with pytest.raises(SystemExit):
+        run_tests(
+            project.as_posix(),
+            "calls.yaml",
+            "data.yaml",
+            False,
+            "",
+            resume="missing",
+        )
+
+
+def test_restore_data_secrets(caplog) -> None:
+    """
+    Test that the secrets are taken from the data file.
+    """
+    secrets: List[str] = []
+    data = {"API_TOKEN": "abc", "db": {"password": "old", "url": "db"}}
+    checkpoint: Checkpoint = {
+        "version": 1,
+        "step": 2,
+        "data": remove_secrets(data, secrets),
+        "secrets": secrets,
+        "unpicklable": [],
+    }
+
+    assert checkpoint["data"] == {"db": {"url": "db"}}
+    assert secrets == ["API_TOKEN", "db.password"]
+
+    restored = restore_data(checkpoint, {"db": {"password": "new"}})
+
+    assert restored == {"db": {"password": "new", "url": "db"}}
+    assert "Secret API_TOKEN is not restored" in caplog.text
+
+
+def test_restore_data_secrets_in_lists() -> None:
+    """
+    Test that secrets within lists are not checkpointed and are restored.
+    """
+    secrets: List[str] = []
+    data = {"servers": [{"host": "a", "password": "old"}, {"host": "b"}]}
+    checkpoint: Checkpoint = {
+        "version": 1,
+        "step": 2,
+        "data": remove_secrets(data, secrets),
+        "secrets": secrets,
+        "unpicklable": [],
+    }
+
+    assert checkpoint["data"] == {"servers": [{"host": "a"}, {"host": "b"}]}
+    assert secrets == ["servers.0.password"]
+    assert data["servers"][0]["password"] == "old"
+
+    restored = restore_data(
+        checkpoint, {"servers": [{"host": "a", "password": "new"}]}
+    )
+
+    assert restored == {
+        "servers": [{"host": "a", "password": "new"}, {"host": "b"}]
+    }
@@ -0,0 +1,149 @@
+"""
+This module contains tests for the config cache.
+"""
+from os import name, stat, utime
+from pathlib import Path
+
+import pytest
+from test_tool import base
+from test_tool.base import load_config_yaml
+from test_tool.config_cache import (
+    get_cache_dir,
+    get_entry_path,
+    store_cached_config,
+)
+from test_tool.history import get_history_path
+
+
+def write_config(path: Path, content: str) -> None:
+    """
+    Write a config file.
+
+    Parameters
+    ----------
+    path : Path
+        Path of the config file.
+    content : str
+        Content of the config file.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(content)
+
+
+def test_load_config_yaml_from_cache(monkeypatch) -> None:
+    """
+    Test that an unchanged config is not parsed again.
+    """
+    path = Path("calls.yaml")
+    write_config(path, "- type: MOCK\n  call:\n    test: 1\n")
+    expected = [{"type": "MOCK", "call": {"test": 1}, "line": 1}]
+
+    assert load_config_yaml(path, True) == expected
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The config was parsed again")
+
+    monkeypatch.setattr(base, "SafeLoader", fail)
+    config = load_config_yaml(path, True)
+    config[0]["call"]["test"] = 2
+
+    assert load_config_yaml(path, True) == expected
+    # Parsed without line numbers is a different entry
+    with pytest.raises(AssertionError):
+        load_config_yaml(path)
+
+
+def test_load_config_yaml_stale_cache() -> None:
+    """
+    Test that a changed config is parsed again.
+    """
+    path = Path("data.yaml")
+    write_config(path, "value: 1\n")
+    status = stat(path)
+    assert load_config_yaml(path) == {"value": 1}
+
+    # Same size and modification time, but a different content
+    write_config(path, "value: 2\n")
+    utime(path, ns=(status.st_atime_ns, status.st_mtime_ns))
+
+    assert load_config_yaml(path) == {"value": 2}
+
+
+def test_load_config_yaml_cache_disabled(monkeypatch) -> None:
+    """
+    Test that nothing is cached if the cache folder is empty.
+    """
+    monkeypatch.setenv("TEST_TOOL_CACHE_DIR", "")
+    path = Path("data.yaml")
+    write_config(path, "value: 1\n")
+
+    assert load_config_yaml(path) == {"value": 1}
+    assert get_cache_dir() is None
+
+
+def test_run_tests_data_not_cached(tmpdir) -> None:
+    """
+    Test that the data file of a run is not cached, only its calls file,
+    in a folder only the user can read.
+    """
+    project = Path(tmpdir).joinpath("project")
+    project.mkdir()
+    write_config(project.joinpath("calls.yaml"), "[]\n")
+    write_config(project.joinpath("data.yaml"), "password: secret\n")
+
+    base.run_tests(project.as_posix(), "calls.yaml", "data.yaml", True, "")
+
+    cache_dir = get_cache_dir()
+    assert cache_dir is not None
+    assert get_entry_path(
+        cache_dir, project.joinpath("calls.yaml"), "lines"
+    ).exists()
+    assert not get_entry_path(
+        cache_dir, project.joinpath("data.yaml"), "plain"
+    ).exists()
+    if name == "posix":
+        assert cache_dir.stat().st_mode & 0o777 == 0o700
+
+
+def test_store_dirs_are_separate(monkeypatch, tmpdir) -> None:
+    """
+    Test that disabling the config cache keeps the history, which can be
+    disabled on its own.
+    """
+    monkeypatch.setenv("TEST_TOOL_CACHE_DIR", "")
+
+    assert get_history_path() == Path(tmpdir).joinpath(
+        "caches", "history", "history.sqlite"
+    )
+
+    monkeypatch.setenv("TEST_TOOL_HISTORY_DIR", "")
+
+    assert get_history_path() is None
+
+
+def test_store_cached_config_evicts_least_recently_used() -> None:
+    """
+    Test that the least recently used entries are evicted.
+    """
+    cache_dir = get_cache_dir()
+    assert cache_dir is not None
+    paths = [Path(f"{idx}.yaml") for idx in range(3)]
+    for idx, path in enumerate(paths):
+        write_config(path, f"value: {idx}\n")
+        load_config_yaml(path)
+        entry_path = get_entry_path(cache_dir, path, "plain")
+        utime(entry_path, ns=(idx, idx))
+    # Using the first entry makes the second the least recently used one
+    load_config_yaml(paths[0])
+
+    entry_size = get_entry_path(cache_dir, paths[0], "plain").stat().st_size
+    path = Path("3.yaml")
+    write_config(path, "value: 3\n")
+    store_cached_config(
+        path, stat(path), b"value: 3\n", "plain", {"value": 3}, entry_size * 3
+    )
+
+    assert [
+        get_entry_path(cache_dir, path, "plain").exists()
+        for path in paths + [path]
+    ] == [True, False, True, True]
@@ -0,0 +1,192 @@
+"""
+This module contains tests for the daemon module.
+"""
+import socket
+import sys
+from pathlib import Path
+from threading import Thread
+from typing import Any, Dict, Iterator, List
+
+import pytest
+from test_tool import daemon
+from test_tool.daemon import create_server, is_serving, run_in_daemon
+from yaml import dump
+
+# The daemon listens on a Unix socket
+needs_unix_sockets = pytest.mark.skipif(
+    not hasattr(socket, "AF_UNIX"), reason="Unix sockets are missing"
+)
+
+
+@pytest.fixture(name="socket_path")
+def fixture_socket_path(tmpdir) -> Iterator[Path]:
+    """
+    Serve runs on a socket in the temporary directory.
+    """
+    socket_path = Path(tmpdir).joinpath("daemon.sock")
+    server = create_server(socket_path)
+    thread = Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        yield socket_path
+    finally:
+        server.shutdown()
+        thread.join()
+        server.server_close()
+
+
+def create_project(path: Path, fail: bool) -> Dict[str, Any]:
+    """
+    Create a project with a single MOCK call.
+
+    Parameters
+    ----------
+    path : Path
+        Folder of the project.
+    fail : bool
+        Let the call fail.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The arguments of run_tests.
+    """
+
+    class Mock(object):
+        """
+        A mock class for test plugin.
+        """
+
+        @staticmethod
+        def make_mock_call(call: Dict[str, Any]) -> None:
+            """
+            A mock function failing if the call says so.
+            """
+            assert not call["fail"], "Call failed"
+
+    sys.modules["test_tool_mock_plugin"] = Mock  # type: ignore
+    path.mkdir()
+    with open(path.joinpath("calls.yaml"), "w", encoding="utf-8") as file:
+        file.write(dump([{"type": "MOCK", "call": {"fail": fail}}]))
+    return {
+        "project_path_str": path.as_posix(),
+        "calls_path_str": "calls.yaml",
+        "data_path_str": "data.yaml",
+        "continue_on_failure": False,
+        "output": "output",
+    }
+
+
+@needs_unix_sockets
+def test_run_in_daemon(tmpdir, socket_path, capsys) -> None:
+    """
+    Test that a run is made by the daemon and its logs are sent back.
+    """
+    arguments = create_project(Path(tmpdir).joinpath("project"), False)
+
+    code = run_in_daemon(socket_path, arguments, 20)
+
+    assert code == 0
+    assert "Everything OK" in capsys.readouterr().err
+    assert Path(tmpdir).joinpath("project", "output", "run.log").exists()
+
+
+@needs_unix_sockets
+def test_run_in_daemon_failing(tmpdir, socket_path, capsys) -> None:
+    """
+    Test that the exit code of a failing run is sent back.
+    """
+    arguments = create_project(Path(tmpdir).joinpath("project"), True)
+
+    code = run_in_daemon(socket_path, arguments, 20)
+
+    assert code == 1
+    assert "Call failed" in capsys.readouterr().err
+
+
+@needs_unix_sockets
+def test_run_in_daemon_shares_context(tmpdir) -> None:
+    """
+    Test that the runs of a daemon share one context, so a plugin is set up
+    once and torn down when the daemon stops.
+    """
+    events: List[str] = []
+
+    class ContextMock(object):
+        """
+        A mock class for test plugin with a setup and a teardown.
+        """
+
+        @staticmethod
+        def setup_mock(context: Any) -> None:
+            """
+            A mock function recording the setup.
+            """
+            events.append("setup")
+
+        @staticmethod
+        def teardown_mock(context: Any) -> None:
+            """
+            A mock function recording the teardown.
+            """
+            events.append("teardown")
+
+        @staticmethod
+        def make_mock_call() -> None:
+            """
+            A mock function recording the call.
+            """
+            events.append("call")
+
+    arguments = create_project(Path(tmpdir).joinpath("project"), False)
+    sys.modules["test_tool_mock_plugin"] = ContextMock  # type: ignore
+    socket_path = Path(tmpdir).joinpath("daemon.sock")
+    with create_server(socket_path) as server:
+        thread = Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            for _ in range(2):
+                assert run_in_daemon(socket_path, arguments, 20) == 0
+        finally:
+            server.shutdown()
+            thread.join()
+        assert events == ["setup", "call", "call"]
+
+    assert events == ["setup", "call", "call", "teardown"]
+
+
+def test_run_in_daemon_not_serving(tmpdir) -> None:
+    """
+    Test that a missing daemon raises a ConnectionError.
+    """
+    with pytest.raises(ConnectionError):
+        run_in_daemon(Path(tmpdir).joinpath("daemon.sock"), {}, 20)
+
+
+@needs_unix_sockets
+def test_create_server_stale_socket(tmpdir) -> None:
+    """
+    Test that a socket left behind by a killed daemon is replaced.
+    """
+    socket_path = Path(tmpdir).joinpath("daemon.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(socket_path.as_posix())
+    assert not is_serving(socket_path)
+
+    with create_server(socket_path):
+        assert is_serving(socket_path)
+
+
+def test_daemon_without_unix_sockets(tmpdir, monkeypatch) -> None:
+    """
+    Test that no daemon is started without Unix sockets and a client falls
+    back to running the tests itself.
+    """
+    monkeypatch.setattr(daemon, "UNIX_SOCKETS", False)
+    socket_path = Path(tmpdir).joinpath("daemon.sock")
+
+    with pytest.raises(OSError):
+        create_server(socket_path)
+    assert not is_serving(socket_path)
+    with pytest.raises(ConnectionError):
+        run_in_daemon(socket_path, {}, 20)
@@ -0,0 +1,158 @@
+"""
+This module contains tests for the history module.
+"""
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+from test_tool.base import run_tests
+from test_tool.history import (
+    HistoryRecorder,
+    get_calls_key,
+    get_history_path,
+    get_step_durations,
+    get_step_histories,
+    show_history,
+)
+from test_tool.instrumentation import StepRecord, create_step_record
+from yaml import dump
+
+
+class HistoryMock(object):
+    """
+    A mock class for test plugin.
+    """
+
+    @staticmethod
+    def make_mock_call(call: Dict[str, Any]) -> None:
+        """
+        A mock function failing on request.
+        """
+        assert not call.get("fail"), "Call failed"
+
+
+def create_record(line: int, wall: float) -> StepRecord:
+    """
+    Create the record of a successful step.
+
+    Parameters
+    ----------
+    line : int
+        The line of the step.
+    wall : float
+        The duration of the step in seconds.
+
+    Returns
+    -------
+    StepRecord
+        The record.
+    """
+    record = create_step_record(line - 1, {"type": "MOCK", "line": line})
+    record["wall"] = wall
+    return record
+
+
+def record_runs(path: Path, project: Path, walls: List[float]) -> None:
+    """
+    Append runs with two steps to the history.
+
+    Parameters
+    ----------
+    path : Path
+        Path of the database.
+    project : Path
+        Path to the project.
+    walls : List[float]
+        The duration of the second step in every run.
+    """
+    for wall in walls:
+        recorder = HistoryRecorder(
+            path, project, project.joinpath("calls.yaml")
+        )
+        recorder.add(create_record(1, 0.1))
+        recorder.add(create_record(2, wall))
+        recorder.close()
+
+
+def test_run_tests_history(tmpdir) -> None:
+    """
+    Test that every run appends its steps to the history, without the
+    durations of the failed steps.
+    """
+    sys.modules["test_tool_mock_plugin"] = HistoryMock  # type: ignore
+    project = Path(tmpdir).joinpath("project")
+    project.mkdir()
+    with open(project.joinpath("calls.yaml"), "w", encoding="utf-8") as file:
+        file.write(
+            dump(
+                [
+                    {"type": "MOCK", "call": {}},
+                    {"type": "MOCK", "call": {"fail": True}},
+                ]
+            )
+        )
+
+    for history in [True, True, False]:
+        with pytest.raises(SystemExit):
+            run_tests(
+                project.as_posix(),
+                "calls.yaml",
+                "data.yaml",
+                True,
+                "",
+                history=history,
+            )
+
+    path = get_history_path()
+    project_key, calls_key = get_calls_key(
+        project, project.joinpath("calls.yaml")
+    )
+    last_run, histories = get_step_histories(
+        path, project_key, calls_key  # type: ignore
+    )
+
+    assert last_run == 2
+    assert list(histories) == [1]
+    assert len(histories[1]["durations"]) == 2
+
+
+def test_history_recorder_regression(tmpdir, caplog) -> None:
+    """
+    Test that a step taking longer than the runs before is flagged.
+    """
+    path = Path(tmpdir).joinpath("history.sqlite")
+    project = Path(tmpdir)
+    record_runs(path, project, [0.1, 0.12, 0.11, 0.5])
+
+    assert "Call from line 2 took 500.0 ms" in caplog.text
+    assert "Call from line 1" not in caplog.text
+
+    lines = show_history(path, project.resolve().as_posix(), "calls.yaml")
+
+    assert lines[1].startswith("    1 | MOCK")
+    assert lines[2].endswith("+355% REGRESSED")
+
+
+def test_history_recorder_estimate(tmpdir, caplog) -> None:
+    """
+    Test that the duration of a run is estimated by the runs before.
+    """
+    caplog.set_level("INFO")
+    path = Path(tmpdir).joinpath("history.sqlite")
+    project = Path(tmpdir)
+    record_runs(path, project, [0.3, 0.5, 0.4])
+
+    durations = get_step_durations(
+        path, project.resolve().as_posix(), "calls.yaml"
+    )
+    recorder = HistoryRecorder(
+        path,
+        project,
+        project.joinpath("calls.yaml"),
+        calls=[{"line": 1}, {"line": 2}, {"line": 3}],
+    )
+
+    assert durations == {1: 0.1, 2: 0.4}
+    assert recorder.pending == {1: 0.1, 2: 0.4, 3: 0.25}
+    assert "The calls are expected to take 0.8 s" in caplog.text
@@ -0,0 +1,104 @@
+"""
+This module contains tests for the instrumentation module.
+"""
+import sys
+from json import loads
+from pathlib import Path
+from typing import Any, Dict, List
+
+from test_tool.base import Call, make_all_calls
+from test_tool.instrumentation import (
+    PHASES,
+    TIMINGS_FILE,
+    TimingRecorder,
+    create_step_record,
+    measure_phase,
+)
+
+
+def test_measure_phase() -> None:
+    """
+    Test that the timing of a phase is added to the record.
+    """
+    record = create_step_record(0, {"type": "MOCK", "line": 3})
+
+    with measure_phase(record, "make"):
+        sum(range(1000))
+
+    assert record["step"] == 1
+    assert record["line"] == 3
+    assert list(record["phases"]) == ["make"]
+    assert record["wall"] == record["phases"]["make"]["wall"] > 0
+
+
+def test_timing_recorder_summary() -> None:
+    """
+    Test that the summary shows the slowest steps first.
+    """
+    recorder = TimingRecorder()
+    for idx in range(7):
+        record = create_step_record(idx, {"type": "MOCK", "line": idx})
+        record["phases"] = {
+            "merge": {"wall": 0.001, "cpu": 0.001},
+            "make": {"wall": idx * 0.001, "cpu": 0.0},
+        }
+        record["wall"] = 0.001 + idx * 0.001
+        recorder.add(record)
+
+    summary = recorder.summary()
+
+    assert summary[0] == (
+        "Timing of 7 steps: 28.0 ms, engine 7.0 ms (25.0%), "
+        + "plugins 21.0 ms (75.0%)"
+    )
+    steps = [int(line.split("|")[0]) for line in summary[-5:]]
+    assert steps == [7, 6, 5, 4, 3]
+
+
+def test_timing_recorder_repeated_steps() -> None:
+    """
+    Test that records of the same step with the same duration, e.g. from
+    several shards, can be added.
+    """
+    recorder = TimingRecorder()
+    for idx in range(7):
+        record = create_step_record(0, {"type": "MOCK", "line": idx})
+        record["phases"] = {"make": {"wall": 0.001, "cpu": 0.0}}
+        record["wall"] = 0.001
+        recorder.add(record)
+
+    assert recorder.summary()[0].startswith("Timing of 7 steps")
+
+
+def test_make_all_calls_writes_timings(tmpdir) -> None:
+    """
+    Test that the timing of every step is written to the output folder.
+    """
+
+    class Mock(object):
+        """
+        A mock class for test plugin.
+        """
+
+        @staticmethod
+        def make_mock_call(call: Dict[str, Any]) -> None:
+            """
+            A mock function failing for the second call.
+            """
+            assert call["value"] == 1
+
+    sys.modules["test_tool_mock_plugin"] = Mock  # type: ignore
+    calls: List[Call] = [
+        {"type": "MOCK", "call": {"value": 1}, "line": 1},
+        {"type": "MOCK", "call": {"value": 2}, "line": 4},
+    ]
+    output_path = Path(tmpdir)
+
+    errors = make_all_calls(calls, {}, output_path, True, 1, output_path)
+
+    with open(output_path.joinpath(TIMINGS_FILE), encoding="utf-8") as file:
+        records = [loads(line) for line in file]
+    assert errors == 1
+    assert [record["line"] for record in records] == [1, 4]
+    assert [record["error"] for record in records] == [False, True]
+    assert list(records[0]["phases"]) == list(PHASES)
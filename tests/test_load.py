@@ -0,0 +1,136 @@
+"""
+This module contains tests for the load module.
+"""
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from test_tool.base import run_tests
+from test_tool.load import LOAD_FILE, Histogram
+from yaml import dump
+
+
+class LoadMock(object):
+    """
+    A mock class for test plugin recording the users and iterations.
+    """
+
+    made: List[Tuple[int, int]] = []
+
+    @staticmethod
+    def make_mock_call(call: Dict[str, Any], data: Dict[str, Any]) -> None:
+        """
+        A mock function checking that every iteration has its own data.
+        """
+        if call["id"] == 1:
+            assert "RESULT" not in data
+            data["RESULT"] = call["id"]
+        else:
+            assert data["RESULT"] == 1
+            LoadMock.made.append((data["VIRTUAL_USER"], data["ITERATION"]))
+
+
+def write_project(path: Path) -> None:
+    """
+    Write a project with two calls.
+
+    Parameters
+    ----------
+    path : Path
+        Folder of the project.
+    """
+    path.mkdir(exist_ok=True)
+    with open(path.joinpath("calls.yaml"), "w", encoding="utf-8") as file:
+        file.write(
+            dump(
+                [
+                    {"type": "MOCK", "call": {"id": 1}},
+                    {"type": "MOCK", "call": {"id": 2}},
+                ]
+            )
+        )
+
+
+def test_histogram_percentiles() -> None:
+    """
+    Test that the percentiles are within the width of a bucket.
+    """
+    histogram = Histogram()
+    for latency in range(1, 1001):
+        histogram.add(latency / 1000)
+
+    assert histogram.count == 1000
+    assert abs(histogram.percentile(0.5) - 0.5) <= 0.5 * 0.01
+    assert abs(histogram.percentile(0.99) - 0.99) <= 0.99 * 0.01
+    assert histogram.percentile(1.0) == 1.0
+
+
+def test_histogram_merge() -> None:
+    """
+    Test that merged histograms equal the histogram of all latencies.
+    """
+    merged = Histogram()
+    single = Histogram()
+    for user in range(4):
+        histogram = Histogram()
+        for latency in range(user, 400, 4):
+            histogram.add(latency / 100, latency % 7 == 0)
+            single.add(latency / 100, latency % 7 == 0)
+        merged.merge(histogram)
+
+    assert merged.buckets == single.buckets
+    assert merged.errors == single.errors
+    assert merged.max == single.max
+    assert merged.percentile(0.9) == single.percentile(0.9)
+
+
+def test_run_tests_repeat(tmpdir) -> None:
+    """
+    Test that every user runs the calls the given number of times and the
+    report is written to the output folder.
+    """
+    sys.modules["test_tool_mock_plugin"] = LoadMock  # type: ignore
+    LoadMock.made = []
+    project = Path(tmpdir).joinpath("project")
+    write_project(project)
+
+    run_tests(
+        project.as_posix(),
+        "calls.yaml",
+        "data.yaml",
+        False,
+        "run",
+        repeat=3,
+        concurrency=2,
+    )
+
+    assert sorted(LoadMock.made) == [
+        (user, iteration) for user in range(2) for iteration in range(3)
+    ]
+    with open(project.joinpath("run", LOAD_FILE), encoding="utf-8") as file:
+        report = json.load(file)
+    assert report["iterations"] == 6
+    assert [step["count"] for step in report["steps"]] == [6, 6]
+    assert report["steps"][1]["line"] == 4
+
+
+def test_run_tests_duration(tmpdir) -> None:
+    """
+    Test that the calls are repeated until the duration passed.
+    """
+    sys.modules["test_tool_mock_plugin"] = LoadMock  # type: ignore
+    LoadMock.made = []
+    project = Path(tmpdir).joinpath("project")
+    write_project(project)
+
+    run_tests(
+        project.as_posix(),
+        "calls.yaml",
+        "data.yaml",
+        False,
+        "",
+        duration=0.05,
+    )
+
+    assert len(LoadMock.made) > 1
@@ -0,0 +1,95 @@
+"""
+This module contains tests for the memory module.
+"""
+import sys
+from json import loads
+from pathlib import Path
+from typing import Any, Dict, List
+
+from test_tool.base import Call, make_all_calls
+from test_tool import memory
+from test_tool.memory import (
+    LEAK_THRESHOLD,
+    MEMORY_FILE,
+    MemoryRecorder,
+    get_size,
+)
+
+
+def test_get_size() -> None:
+    """
+    Test that nested and shared values are counted once.
+    """
+    shared = "x" * 1000
+    value = {"a": [shared, shared], "b": (shared,)}
+
+    size = get_size(value)
+
+    assert size >= sys.getsizeof(value) + sys.getsizeof(shared)
+    assert size < sys.getsizeof(value) + 2 * sys.getsizeof(shared)
+
+
+def test_memory_recorder_data_size(monkeypatch) -> None:
+    """
+    Test that only the values replaced or added since the last step are
+    measured.
+    """
+    measured: List[Any] = []
+
+    def measure(value: Any) -> int:
+        measured.append(value)
+        return 1
+
+    monkeypatch.setattr(memory, "get_size", measure)
+    recorder = MemoryRecorder()
+    data: Dict[str, Any] = {"A": [1], "B": [2]}
+    try:
+        recorder.get_data_size(data)
+        measured.clear()
+        data["B"] = [3]
+        data["C"] = [4]
+        size = recorder.get_data_size(data)
+    finally:
+        recorder.close()
+
+    assert measured == ["B", [3], "C", [4]]
+    assert size == sys.getsizeof(data) + 6
+
+
+def test_make_all_calls_flags_leaking_steps(tmpdir) -> None:
+    """
+    Test that a step storing a large object in the data is flagged.
+    """
+
+    class Mock(object):
+        """
+        A mock class for test plugin.
+        """
+
+        @staticmethod
+        def make_mock_call(call: Dict[str, Any], data: Dict[str, Any]) -> None:
+            """
+            A mock function storing a large object, if the call says so.
+            """
+            temporary = bytearray(LEAK_THRESHOLD * 2)
+            if call["keep"]:
+                data["RESULT"] = temporary
+
+    sys.modules["test_tool_mock_plugin"] = Mock  # type: ignore
+    calls: List[Call] = [
+        {"type": "MOCK", "call": {"keep": False}, "line": 1},
+        {"type": "MOCK", "call": {"keep": True}, "line": 4},
+    ]
+    output_path = Path(tmpdir)
+
+    errors = make_all_calls(
+        calls, {}, output_path, False, 1, output_path, memory=True
+    )
+
+    with open(output_path.joinpath(MEMORY_FILE), encoding="utf-8") as file:
+        records = [loads(line) for line in file]
+    assert errors == 0
+    assert [record["leak"] for record in records] == [False, True]
+    assert records[0]["peak"] > LEAK_THRESHOLD * 2
+    assert records[1]["net"] > LEAK_THRESHOLD * 2
+    assert records[1]["data"] > LEAK_THRESHOLD * 2
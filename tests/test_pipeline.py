@@ -0,0 +1,171 @@
+"""
+This module contains tests for the pipeline module.
+"""
+import sys
+from pathlib import Path
+from threading import Event, current_thread
+from typing import Any, Dict, List, Tuple
+
+import pytest
+from test_tool import pipeline
+from test_tool.base import Call, make_all_calls
+from test_tool.scheduler import DATA_WRITES
+
+
+class PipelineMock(object):
+    """
+    A mock class for test plugin recording where its calls are augmented.
+    """
+
+    augmented: List[Tuple[int, bool]] = []
+    made: List[Tuple[int, Any]] = []
+    started = Event()
+
+    @staticmethod
+    def augment_mock_call(call: Dict[str, Any], data: Dict[str, Any]) -> None:
+        """
+        A mock function recording if the call is augmented ahead.
+        """
+        ahead = current_thread().name.startswith("test-tool-pipeline")
+        PipelineMock.augmented.append((call["id"], ahead))
+        if ahead:
+            PipelineMock.started.set()
+        if call.get("augment_save"):
+            data[call["augment_save"]] = call["id"]
+
+    @staticmethod
+    def make_mock_call(call: Dict[str, Any], data: Dict[str, Any]) -> None:
+        """
+        A mock function saving its id, after waiting for the call after it.
+        """
+        if call.get("wait"):
+            assert PipelineMock.started.wait(5)
+        PipelineMock.made.append((call["id"], call.get("value")))
+        if call.get("save"):
+            data[call["save"]] = call["id"]
+
+
+@pytest.fixture(name="pipeline_mock")
+def fixture_pipeline_mock(monkeypatch) -> None:
+    """
+    Install the mock, the keys it declares to write and that it can be
+    prepared ahead.
+    """
+    PipelineMock.augmented = []
+    PipelineMock.made = []
+    PipelineMock.started = Event()
+    monkeypatch.setitem(sys.modules, "test_tool_mock_plugin", PipelineMock)
+    monkeypatch.setitem(
+        DATA_WRITES,
+        "MOCK",
+        lambda call: {call["declared"]} if call.get("declared") else set(),
+    )
+    monkeypatch.setattr(
+        pipeline,
+        "PREPARED_CALL_TYPES",
+        pipeline.PREPARED_CALL_TYPES | {"MOCK"},
+    )
+
+
+def create_calls(*calls: Dict[str, Any]) -> List[Call]:
+    """
+    Create calls of the mock plugin, numbered from 1.
+
+    Parameters
+    ----------
+    *calls : Dict[str, Any]
+        The calls.
+
+    Returns
+    -------
+    List[Call]
+        The calls from the config.
+    """
+    return [
+        {"type": "MOCK", "line": idx, "call": {"id": idx, **call}}
+        for idx, call in enumerate(calls, 1)
+    ]
+
+
+def test_pipeline_overlaps_augment(pipeline_mock, tmpdir) -> None:
+    """
+    Test that the next call is augmented while a call is made.
+    """
+    calls = create_calls({"wait": True}, {})
+
+    errors = make_all_calls(calls, {}, Path(tmpdir), False, pipeline=2)
+
+    assert errors == 0
+    assert sorted(PipelineMock.augmented) == [(1, False), (2, True)]
+    assert PipelineMock.made == [(1, None), (2, None)]
+
+
+def test_pipeline_side_effects(pipeline_mock, monkeypatch, tmpdir) -> None:
+    """
+    Test that the calls of plugins, whose augmenting may have side effects,
+    are not augmented ahead.
+    """
+    monkeypatch.setattr(pipeline, "PREPARED_CALL_TYPES", set())
+    calls = create_calls({}, {}, {})
+
+    errors = make_all_calls(calls, {}, Path(tmpdir), False, pipeline=2)
+
+    assert errors == 0
+    assert PipelineMock.augmented == [(1, False), (2, False), (3, False)]
+    assert PipelineMock.made == [(1, None), (2, None), (3, None)]
+
+
+def test_pipeline_waits_for_writes(pipeline_mock, tmpdir) -> None:
+    """
+    Test that a call reading a key written by a call before it is not
+    augmented ahead, the calls after it are.
+    """
+    calls = create_calls(
+        {"save": "TOKEN", "declared": "TOKEN"},
+        {"value": "{{ TOKEN }}"},
+        {},
+    )
+
+    errors = make_all_calls(calls, {}, Path(tmpdir), False, pipeline=2)
+
+    assert errors == 0
+    assert sorted(PipelineMock.augmented) == [
+        (1, False),
+        (2, False),
+        (3, True),
+    ]
+    assert PipelineMock.made == [(1, None), (2, 1), (3, None)]
+
+
+def test_pipeline_discards_changed_reads(pipeline_mock, tmpdir) -> None:
+    """
+    Test that a call prepared ahead is prepared again, if a key it reads
+    changed, or if its augmenting changed the data.
+    """
+    calls = create_calls(
+        {"save": "TOKEN"},
+        {"value": "{{ TOKEN }}"},
+        {"augment_save": "AUGMENTED"},
+    )
+    data: Dict[str, Any] = {"TOKEN": 0}
+
+    errors = make_all_calls(calls, data, Path(tmpdir), False, pipeline=2)
+
+    assert errors == 0
+    assert PipelineMock.made == [(1, None), (2, 1), (3, None)]
+    assert (2, True) in PipelineMock.augmented
+    assert (2, False) in PipelineMock.augmented
+    assert (3, False) in PipelineMock.augmented
+    assert data["AUGMENTED"] == 3
+
+
+def test_pipeline_stops_on_error(pipeline_mock, tmpdir) -> None:
+    """
+    Test that no call is made after the first error.
+    """
+    calls = create_calls({}, {"value": "{{ MISSING }}"}, {})
+
+    errors = make_all_calls(calls, {}, Path(tmpdir), False, pipeline=2)
+
+    assert errors == 1
+    assert PipelineMock.made == [(1, None)]
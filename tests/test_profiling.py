@@ -0,0 +1,104 @@
+"""
+This module contains tests for the profiling module.
+"""
+import sys
+from cProfile import Profile
+from pathlib import Path
+from pstats import Stats
+from typing import Any, Dict, List
+
+from test_tool.base import Call, make_all_calls
+from test_tool.profiling import (
+    COLLAPSED_STACKS_FILE,
+    MERGED_PROFILE_FILE,
+    PROFILES_FOLDER,
+    collapse_stats,
+)
+
+
+def inner() -> int:
+    """
+    A function called by outer.
+    """
+    return sum(range(10000))
+
+
+def outer() -> int:
+    """
+    A function calling inner twice.
+    """
+    return inner() + inner()
+
+
+def test_collapse_stats() -> None:
+    """
+    Test that the stacks are reconstructed from the callers.
+    """
+    profiler = Profile()
+    profiler.enable()
+    outer()
+    profiler.disable()
+    profiler.enable()
+    inner()
+    profiler.disable()
+    profiler.create_stats()
+
+    stacks = collapse_stats(profiler.stats, "line 1 MOCK")  # type: ignore
+
+    frames = {tuple(stack.split(";")) for stack in stacks}
+    assert (
+        "line 1 MOCK",
+        "outer (test_profiling.py:26)",
+        "inner (test_profiling.py:19)",
+        "<built-in method builtins.sum>",
+    ) in frames
+    assert (
+        "line 1 MOCK",
+        "inner (test_profiling.py:19)",
+        "<built-in method builtins.sum>",
+    ) in frames
+    assert all("_lsprof" not in stack for stack in stacks)
+
+
+def test_make_all_calls_writes_profiles(tmpdir) -> None:
+    """
+    Test that the profiles of every step are written.
+    """
+
+    class Mock(object):
+        """
+        A mock class for test plugin.
+        """
+
+        @staticmethod
+        def make_mock_call(call: Dict[str, Any]) -> None:
+            """
+            A mock function calling outer.
+            """
+            outer()
+
+    sys.modules["test_tool_mock_plugin"] = Mock  # type: ignore
+    calls: List[Call] = [
+        {"type": "MOCK", "call": {}, "line": 1},
+        {"type": "MOCK", "call": {}, "line": 4},
+    ]
+    output_path = Path(tmpdir)
+
+    errors = make_all_calls(
+        calls, {}, output_path, False, 2, output_path, True
+    )
+
+    assert errors == 0
+    assert sorted(
+        path.name for path in output_path.joinpath(PROFILES_FOLDER).iterdir()
+    ) == ["step_00001_line_1.pstats", "step_00002_line_4.pstats"]
+    merged = Stats(output_path.joinpath(MERGED_PROFILE_FILE).as_posix())
+    assert any(
+        function[2] == "outer" and timing[1] == 2
+        for function, timing in merged.stats.items()  # type: ignore
+    )
+    with open(
+        output_path.joinpath(COLLAPSED_STACKS_FILE), encoding="utf-8"
+    ) as file:
+        stacks = file.read().splitlines()
+    assert any(stack.startswith("line 4 MOCK;") for stack in stacks)
@@ -0,0 +1,136 @@
+"""
+This module contains tests for the registry module.
+"""
+import sys
+from importlib import invalidate_caches
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+from test_tool import registry
+from test_tool.base import CallType, import_plugin, run_tests
+from test_tool.import_plugin import is_plugin_available
+from yaml import dump
+
+# A plugin, whose module does not follow the naming convention
+CUSTOM_PLUGIN: str = """
+async def make_custom_call_async(call):
+    pass
+
+
+def make_custom_call(call):
+    pass
+"""
+
+
+@pytest.fixture(name="custom_plugin")
+def fixture_custom_plugin(tmpdir, monkeypatch) -> str:
+    """
+    Register a plugin for the call type CUSTOM by an entry point.
+    """
+    Path(tmpdir).joinpath("custom_module.py").write_text(
+        CUSTOM_PLUGIN, encoding="utf-8"
+    )
+    invalidate_caches()
+    entry_point = SimpleNamespace(
+        name="custom",
+        value="custom_module",
+        dist=SimpleNamespace(version="1.2.3"),
+    )
+    monkeypatch.setattr(
+        registry, "get_plugin_entry_points", lambda: [entry_point]
+    )
+    monkeypatch.setattr(registry, "loaded_index", None)
+    yield "custom_module"
+    sys.modules.pop("custom_module", None)
+
+
+def test_get_plugin_index_entry_point(custom_plugin) -> None:
+    """
+    Test that a plugin registered by an entry point is indexed with its
+    version and functions.
+    """
+    index = registry.get_plugin_index()
+
+    assert index["plugins"]["CUSTOM"] == {
+        "module": custom_plugin,
+        "version": "1.2.3",
+        "functions": ["make_call", "make_call_async"],
+    }
+    # Plugins following the naming convention are indexed as well
+    assert index["plugins"]["ASSERT"]["module"] == "test_tool_assert_plugin"
+
+
+def test_import_plugin_entry_point(custom_plugin) -> None:
+    """
+    Test that the module of an entry point is imported for its call type.
+    """
+    loaded_call_types: Dict[str, CallType] = {}
+
+    assert import_plugin("CUSTOM", loaded_call_types)
+    assert loaded_call_types["CUSTOM"]["make_call_async"] is not None
+
+
+def test_get_plugin_index_cached(custom_plugin, tmpdir, monkeypatch) -> None:
+    """
+    Test that the stored index is used, until the module search path
+    changes, which is checked once per run.
+    """
+    site_packages = Path(tmpdir).joinpath("site-packages")
+    site_packages.mkdir()
+    monkeypatch.syspath_prepend(site_packages.as_posix())
+    built = registry.get_plugin_index()
+    monkeypatch.setattr(registry, "loaded_index", None)
+
+    def build_plugin_index(fingerprint: str) -> Any:
+        raise AssertionError("Index built again")
+
+    with monkeypatch.context() as context:
+        context.setattr(registry, "build_plugin_index", build_plugin_index)
+        assert registry.get_plugin_index() == built
+
+    site_packages.joinpath("installed").mkdir()
+
+    assert registry.get_plugin_index()["fingerprint"] == built["fingerprint"]
+    registry.reload_plugin_index()
+    assert registry.get_plugin_index()["fingerprint"] != built["fingerprint"]
+
+
+def test_is_plugin_available(custom_plugin) -> None:
+    """
+    Test that plugins are found without importing them.
+    """
+    assert is_plugin_available("custom")
+    assert is_plugin_available("ASSERT")
+    assert not is_plugin_available("ASERT")
+
+
+def test_run_tests_unknown_call_type(tmpdir) -> None:
+    """
+    Test that no call is made, if a call type has no plugin.
+    """
+    made: List[int] = []
+
+    class Mock(object):
+        """
+        A mock class for test plugin.
+        """
+
+        @staticmethod
+        def make_mock_call() -> None:
+            """
+            A mock function recording the call.
+            """
+            made.append(1)
+
+    sys.modules["test_tool_mock_plugin"] = Mock  # type: ignore
+    project = Path(tmpdir).joinpath("project")
+    project.mkdir()
+    with open(project.joinpath("calls.yaml"), "w", encoding="utf-8") as file:
+        file.write(dump([{"type": "MOCK"}, {"type": "MOKC"}]))
+
+    with pytest.raises(SystemExit):
+        run_tests(project.as_posix(), "calls.yaml", "data.yaml", False, "")
+
+    assert made == []
@@ -0,0 +1,272 @@
+"""
+This module contains tests for the resources module.
+"""
+import sys
+from pathlib import Path
+from threading import Barrier, Thread
+from typing import Any, Dict, List, Optional
+
+import pytest
+from test_tool.base import run_tests
+from test_tool.resources import (
+    ResourceRegistry,
+    RunContext,
+    acquire_resource,
+    current_context,
+)
+from yaml import dump
+
+
+class Handle(object):
+    """
+    A handle recording if it was closed.
+    """
+
+    def __init__(self, number: int) -> None:
+        self.number = number
+        self.closed = False
+
+    def close(self) -> None:
+        """
+        Close the handle.
+        """
+        self.closed = True
+
+
+class HandleFactory(object):
+    """
+    Creates numbered handles.
+    """
+
+    def __init__(self) -> None:
+        self.created: List[Handle] = []
+
+    def __call__(self) -> Handle:
+        handle = Handle(len(self.created) + 1)
+        self.created.append(handle)
+        return handle
+
+
+class ResourcesMock(object):
+    """
+    A mock class for test plugin with a setup and a teardown.
+    """
+
+    events: List[str] = []
+    contexts: List[Optional[RunContext]] = []
+
+    @staticmethod
+    def setup_mock(context: RunContext) -> None:
+        """
+        A mock function recording the setup.
+        """
+        ResourcesMock.events.append("setup")
+        context.state["mock"] = HandleFactory()
+
+    @staticmethod
+    def teardown_mock(context: RunContext) -> None:
+        """
+        A mock function recording the teardown.
+        """
+        ResourcesMock.events.append("teardown")
+
+    @staticmethod
+    def make_mock_call(call: Dict[str, Any]) -> None:
+        """
+        A mock function using a pooled handle, failing on request.
+        """
+        context = current_context.get()
+        ResourcesMock.contexts.append(context)
+        assert context is not None
+        with acquire_resource("mock", context.state["mock"], Handle.close):
+            ResourcesMock.events.append("call")
+        if call.get("nested"):
+            run_tests(call["nested"], "calls.yaml", "data.yaml", True, "")
+        if call.get("interrupt"):
+            raise KeyboardInterrupt()
+        assert not call.get("fail"), "Call failed"
+
+
+@pytest.fixture(name="resources_mock")
+def fixture_resources_mock(monkeypatch) -> None:
+    """
+    Install the mock.
+    """
+    ResourcesMock.events = []
+    ResourcesMock.contexts = []
+    monkeypatch.setitem(sys.modules, "test_tool_mock_plugin", ResourcesMock)
+
+
+def create_project(path: Path, calls: List[Dict[str, Any]]) -> Path:
+    """
+    Create a project with a calls file of the mock plugin.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the project.
+    calls : List[Dict[str, Any]]
+        The calls of the mock plugin.
+
+    Returns
+    -------
+    Path
+        Path to the project.
+    """
+    path.mkdir()
+    with open(path.joinpath("calls.yaml"), "w", encoding="utf-8") as file:
+        file.write(dump([{"type": "MOCK", "call": call} for call in calls]))
+    return path
+
+
+def test_registry_reuses_handles() -> None:
+    """
+    Test that a handle is reused by the next use and closed with the
+    registry.
+    """
+    registry = ResourceRegistry()
+    factory = HandleFactory()
+
+    for _ in range(3):
+        with registry.acquire("key", factory, Handle.close) as handle:
+            assert handle.number == 1
+    registry.close()
+
+    assert len(factory.created) == 1
+    assert factory.created[0].closed
+
+
+def test_registry_discards_failed_handles() -> None:
+    """
+    Test that a handle is closed if its use failed or its check fails.
+    """
+    registry = ResourceRegistry()
+    factory = HandleFactory()
+
+    with pytest.raises(ValueError):
+        with registry.acquire("key", factory, Handle.close):
+            raise ValueError()
+    with registry.acquire("key", factory, Handle.close):
+        pass
+    with registry.acquire(
+        "key", factory, Handle.close, lambda handle: False
+    ) as handle:
+        assert handle.number == 3
+
+    assert [handle.closed for handle in factory.created] == [
+        True,
+        True,
+        False,
+    ]
+
+
+def test_registry_keeps_checked_handles() -> None:
+    """
+    Test that the handle of a failed call is reused if its check passes.
+    """
+    registry = ResourceRegistry()
+    factory = HandleFactory()
+
+    for _ in range(2):
+        with pytest.raises(AssertionError):
+            with registry.acquire(
+                "key", factory, Handle.close, lambda handle: True
+            ):
+                raise AssertionError()
+
+    assert len(factory.created) == 1
+    assert not factory.created[0].closed
+
+
+def test_registry_concurrent_handles() -> None:
+    """
+    Test that uses at the same time get handles of their own.
+    """
+    registry = ResourceRegistry()
+    factory = HandleFactory()
+    barrier = Barrier(2)
+    numbers: List[int] = []
+
+    def use() -> None:
+        with registry.acquire("key", factory) as handle:
+            barrier.wait(5)
+            numbers.append(handle.number)
+
+    threads = [Thread(target=use) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(numbers) == [1, 2]
+
+
+def test_acquire_resource_outside_run() -> None:
+    """
+    Test that a handle is closed right away outside of a run.
+    """
+    factory = HandleFactory()
+
+    with acquire_resource("key", factory, Handle.close) as handle:
+        assert not handle.closed
+
+    assert handle.closed
+
+
+@pytest.mark.parametrize("failure", ["fail", "interrupt"])
+def test_run_tests_teardown(resources_mock, tmpdir, failure) -> None:
+    """
+    Test that a plugin is set up once per run and torn down, even if a call
+    failed or the run was interrupted.
+    """
+    project = create_project(
+        Path(tmpdir).joinpath("project"), [{}, {failure: True}]
+    )
+
+    with pytest.raises((SystemExit, KeyboardInterrupt)):
+        run_tests(project.as_posix(), "calls.yaml", "data.yaml", True, "")
+
+    factory = ResourcesMock.contexts[0].state["mock"]  # type: ignore
+    assert ResourcesMock.events == ["setup", "call", "call", "teardown"]
+    assert len(factory.created) == 1
+    assert factory.created[0].closed
+    assert current_context.get() is None
+
+
+def test_run_tests_nested(resources_mock, tmpdir) -> None:
+    """
+    Test that a nested run shares the context of the run it is part of.
+    """
+    nested = create_project(Path(tmpdir).joinpath("nested"), [{}])
+    project = create_project(
+        Path(tmpdir).joinpath("project"), [{"nested": nested.as_posix()}]
+    )
+
+    run_tests(project.as_posix(), "calls.yaml", "data.yaml", True, "")
+
+    assert ResourcesMock.events == ["setup", "call", "call", "teardown"]
+    assert ResourcesMock.contexts[0] is ResourcesMock.contexts[1]
+
+
+@pytest.mark.parametrize("option", ["preflight", "check"])
+def test_run_tests_check_in_context(resources_mock, tmpdir, option) -> None:
+    """
+    Test that the checks set up the plugins in the context of the run and
+    tear them down.
+    """
+    project = create_project(Path(tmpdir).joinpath("project"), [{}])
+
+    run_tests(
+        project.as_posix(),
+        "calls.yaml",
+        "data.yaml",
+        True,
+        "",
+        **{option: True},
+    )
+
+    expected = ["setup", "teardown"]
+    if option == "preflight":
+        expected = ["setup", "call", "teardown"]
+    assert ResourcesMock.events == expected
+    assert current_context.get() is None
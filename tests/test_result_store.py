@@ -0,0 +1,178 @@
+"""
+This module contains tests for the result_store module.
+"""
+import sys
+from os import utime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pytest
+from test_tool.base import make_all_calls, run_tests
+from test_tool.result_store import ResultStore
+from test_tool.scheduler import DATA_WRITES
+from yaml import dump
+
+
+class CacheMock(object):
+    """
+    A mock class for test plugin reading a file into the data.
+    """
+
+    __version__ = "1.0.0"
+    made: List[str] = []
+
+    @staticmethod
+    def make_mock_call(call: Dict[str, Any], data: Dict[str, Any]) -> None:
+        """
+        A mock function saving the content of the file.
+        """
+        CacheMock.made.append(call["file"])
+        data[call["to"]] = Path(call["file"]).read_text(encoding="utf-8")
+
+    @staticmethod
+    def cacheable_mock_call(
+        call: Dict[str, Any], path: Path
+    ) -> Optional[List[Path]]:
+        """
+        A mock function declaring calls with a file cacheable.
+        """
+        if call.get("uncached"):
+            return None
+        return [path.joinpath(call["file"])]
+
+
+@pytest.fixture(name="cache_mock")
+def fixture_cache_mock(monkeypatch) -> None:
+    """
+    Install the mock and the keys it writes.
+    """
+    CacheMock.made = []
+    monkeypatch.setattr(CacheMock, "__version__", "1.0.0")
+    monkeypatch.setitem(sys.modules, "test_tool_mock_plugin", CacheMock)
+    monkeypatch.setitem(DATA_WRITES, "MOCK", lambda call: {call["to"]})
+
+
+def make_calls(path: Path, **call: Any) -> Dict[str, Any]:
+    """
+    Make a single call incremental and return the data.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the project.
+    **call : Any
+        The call.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The data after the call.
+    """
+    data: Dict[str, Any] = {}
+    calls = [{"type": "MOCK", "line": 1, "call": call}]
+    errors = make_all_calls(calls, data, path, False, incremental=True)
+    assert errors == 0
+    return data
+
+
+def test_incremental_replays_result(cache_mock, tmpdir, caplog) -> None:
+    """
+    Test that an unchanged call is replayed with the keys it wrote.
+    """
+    caplog.set_level("INFO")
+    path = Path(tmpdir)
+    path.joinpath("input.txt").write_text("first", encoding="utf-8")
+
+    assert make_calls(path, file="input.txt", to="RESULT") == {
+        "RESULT": "first"
+    }
+    assert make_calls(path, file="input.txt", to="RESULT") == {
+        "RESULT": "first"
+    }
+    assert CacheMock.made == ["input.txt"]
+    assert "Replayed call 1 in MOCK plugin." in caplog.text
+
+
+def test_incremental_invalidates_result(cache_mock, tmpdir) -> None:
+    """
+    Test that a call is made again if its file, its plugin version or
+    the call changes.
+    """
+    path = Path(tmpdir)
+    path.joinpath("input.txt").write_text("first", encoding="utf-8")
+    make_calls(path, file="input.txt", to="RESULT")
+
+    path.joinpath("input.txt").write_text("second", encoding="utf-8")
+    assert make_calls(path, file="input.txt", to="RESULT") == {
+        "RESULT": "second"
+    }
+
+    CacheMock.__version__ = "2.0.0"
+    make_calls(path, file="input.txt", to="RESULT")
+    make_calls(path, file="input.txt", to="OTHER")
+
+    assert len(CacheMock.made) == 4
+
+
+def test_incremental_uncacheable_call(cache_mock, tmpdir) -> None:
+    """
+    Test that calls, which are not cacheable, are always made.
+    """
+    path = Path(tmpdir)
+    path.joinpath("input.txt").write_text("first", encoding="utf-8")
+
+    make_calls(path, file="input.txt", to="RESULT", uncached=True)
+    make_calls(path, file="input.txt", to="RESULT", uncached=True)
+
+    assert len(CacheMock.made) == 2
+
+
+def test_result_store_evicts_results(tmpdir, monkeypatch) -> None:
+    """
+    Test that the least recently used results exceeding the size limit are
+    removed.
+    """
+    monkeypatch.setitem(DATA_WRITES, "EVICT", lambda call: {"RESULT"})
+    store = ResultStore(Path(tmpdir).joinpath("results"), 1500)
+    for idx, key in enumerate(["a", "b", "c"]):
+        store.store(key, "EVICT", {}, {"RESULT": key * 1000})
+        utime(store.get_entry_path(key), (idx, idx))
+    store.close()
+
+    data: Dict[str, Any] = {}
+    assert not store.replay("a", data)
+    assert not store.replay("b", data)
+    assert store.replay("c", data)
+    assert data == {"RESULT": "c" * 1000}
+
+
+def test_incremental_bundled_plugin(tmpdir, caplog) -> None:
+    """
+    Test that a step of a bundled plugin is replayed by the next run.
+    """
+    caplog.set_level("INFO")
+    project = Path(tmpdir).joinpath("project")
+    project.mkdir()
+    with open(project.joinpath("calls.yaml"), "w", encoding="utf-8") as file:
+        file.write(
+            dump(
+                [
+                    {
+                        "type": "ASSERT",
+                        "call": {"value": 1, "operator": "==", "expected": 1},
+                    }
+                ]
+            )
+        )
+
+    for _ in range(2):
+        run_tests(
+            project.as_posix(),
+            "calls.yaml",
+            "data.yaml",
+            False,
+            "",
+            incremental=True,
+        )
+
+    assert caplog.text.count("Replayed call 1 in ASSERT plugin.") == 1
@@ -0,0 +1,324 @@
+"""
+This module contains tests for the scheduler module.
+"""
+import sys
+import tempfile
+from pathlib import Path
+from threading import Event
+from typing import Any, Dict, List, Set
+
+import pytest
+from test_tool.base import Call, estimate_call_durations, make_all_calls
+from test_tool.import_plugin import CallType, import_plugin
+from test_tool.scheduler import (
+    build_dependencies,
+    get_step_priorities,
+    run_scheduled,
+)
+
+started: List[str] = []
+
+
+@pytest.fixture(scope="function", autouse=True)
+def create_test_mock() -> None:
+    """
+    Create a mock for the test tool plugin.
+    """
+
+    class Mock(object):
+        """
+        A mock class for test plugin.
+        """
+
+        default_mock_call: Dict[str, Any] = {"value": None}
+
+        @staticmethod
+        def make_mock_call(call: Dict[str, Any]) -> None:
+            """
+            A mock function for make_mock_call.
+            """
+            started.append(str(call["value"]))
+
+    started.clear()
+    sys.modules["test_tool_mock_plugin"] = Mock  # type: ignore
+
+
+def test_build_dependencies_independent() -> None:
+    """
+    Test that calls without references are independent.
+    """
+    calls = [
+        {"type": "REST", "call": {"url": "a"}},
+        {"type": "REST", "call": {"url": "b"}},
+    ]
+
+    assert build_dependencies(calls, {}) == [set(), set()]
+
+
+def test_build_dependencies_read_after_write() -> None:
+    """
+    Test that a call depends on the call writing a referenced key.
+    """
+    calls = [
+        {"type": "JDBC_SQL", "call": {"save": [{"to": "ID"}]}},
+        {"type": "REST", "call": {"url": "a"}},
+        {"type": "ASSERT", "call": {"value": "{{ ID | int }}"}},
+    ]
+
+    assert build_dependencies(calls, {}) == [set(), set(), {0}]
+
+
+def test_build_dependencies_write_after_read() -> None:
+    """
+    Test that a call overwriting a key waits for the readers.
+    """
+    calls = [
+        {"type": "RUN_PROCESS", "call": {"save": {"name": "OUT"}}},
+        {"type": "ASSERT", "call": {"value": "{{OUT}}"}},
+        {"type": "RUN_PROCESS", "call": {"save": {"name": "OUT"}}},
+    ]
+
+    assert build_dependencies(calls, {}) == [set(), {0}, {0, 1}]
+
+
+def test_build_dependencies_default_call() -> None:
+    """
+    Test that references in the default call are found.
+    """
+    calls = [
+        {"type": "READ_JAR_MANIFEST", "call": {"save": [{"name": "JAR"}]}},
+        {"type": "REST", "call": {}},
+    ]
+
+    dependencies = build_dependencies(calls, {"REST": {"url": "{{JAR}}"}})
+
+    assert dependencies == [set(), {0}]
+
+
+def test_build_dependencies_barrier() -> None:
+    """
+    Test that unknown call types and barriers order all calls.
+    """
+    calls = [
+        {"type": "REST", "call": {}},
+        {"type": "REST", "call": {}},
+        {"type": "TIMING", "call": {}},
+        {"type": "REST", "call": {}},
+        {"type": "REST", "call": {}, "barrier": True},
+        {"type": "REST", "call": {}},
+    ]
+
+    assert build_dependencies(calls, {}) == [
+        set(),
+        set(),
+        {0, 1},
+        {2},
+        {2, 3},
+        {4},
+    ]
+
+
+def test_build_dependencies_depends_on() -> None:
+    """
+    Test that depends_on overrides the inferred dependencies.
+    """
+    calls = [
+        {"id": "first", "type": "REST", "call": {}},
+        {"type": "RUN_PROCESS", "call": {"save": {"name": "OUT"}}},
+        {"type": "ASSERT", "call": {"value": "{{OUT}}"}, "depends_on": []},
+        {"type": "REST", "call": {}, "depends_on": "first"},
+    ]
+
+    assert build_dependencies(calls, {}) == [set(), set(), set(), {0}]
+
+
+def test_build_dependencies_unknown_id() -> None:
+    """
+    Test that depending on an unknown id raises an error.
+    """
+    calls = [{"type": "REST", "call": {}, "depends_on": ["x"], "line": 3}]
+
+    with pytest.raises(ValueError) as excinfo:
+        build_dependencies(calls, {})
+
+    assert "Unknown id x in depends_on for test from line 3" in str(
+        excinfo.value
+    )
+
+
+def test_run_scheduled_respects_dependencies() -> None:
+    """
+    Test that a call is only started after its dependencies are done.
+    """
+    order: List[int] = []
+    first_done = Event()
+
+    def run_step(idx: int) -> bool:
+        if idx == 0:
+            first_done.set()
+        else:
+            assert first_done.is_set()
+        order.append(idx)
+        return False
+
+    errors = run_scheduled([set(), {0}, {0}], run_step, False, 4)
+
+    assert errors == 0
+    assert order[0] == 0
+    assert sorted(order) == [0, 1, 2]
+
+
+def test_run_scheduled_stop_on_error() -> None:
+    """
+    Test that no further calls are started after the first error.
+    """
+    order: List[int] = []
+
+    def run_step(idx: int) -> bool:
+        order.append(idx)
+        return True
+
+    errors = run_scheduled([set(), {0}, {1}], run_step, False, 4)
+
+    assert errors == 1
+    assert order == [0]
+
+
+def test_run_scheduled_continue_on_error() -> None:
+    """
+    Test that all calls are run when continuing on error.
+    """
+    errors = run_scheduled([set(), {0}, set()], lambda idx: True, True, 2)
+
+    assert errors == 3
+
+
+def test_get_step_priorities() -> None:
+    """
+    Test that a call is prioritized by its duration and the longest chain
+    of calls waiting for it.
+    """
+    assert (
+        get_step_priorities([set(), set(), set()], [None, None, None]) is None
+    )
+    assert get_step_priorities([set(), set(), set()], [1.0, 3.0, None]) == [
+        1.0,
+        3.0,
+        2.0,
+    ]
+    assert get_step_priorities([set(), {0}, set()], [1.0, 1.0, 1.5]) == [
+        2.0,
+        1.0,
+        1.5,
+    ]
+
+
+def test_run_scheduled_priorities() -> None:
+    """
+    Test that ready calls are started longest first, after the calls they
+    depend on.
+    """
+    order: List[int] = []
+
+    def run_step(idx: int) -> bool:
+        order.append(idx)
+        return False
+
+    dependencies: List[Set[int]] = [set(), set(), {1}, set()]
+    errors = run_scheduled(
+        dependencies,
+        run_step,
+        False,
+        1,
+        get_step_priorities(dependencies, [1.0, 0.5, 2.0, 3.0]),
+    )
+
+    assert errors == 0
+    assert order == [3, 1, 2, 0]
+
+
+def test_estimate_call_durations() -> None:
+    """
+    Test that the history is used before the estimate of the plugin, which
+    does not change the default call.
+    """
+
+    class SlowMock(object):
+        """
+        A mock class for test plugin estimating its calls.
+        """
+
+        default_slow_call: Dict[str, Any] = {
+            "seconds": 2,
+            "options": {"estimated": 0},
+        }
+
+        @staticmethod
+        def make_slow_call() -> None:
+            """
+            A mock function for make_slow_call.
+            """
+
+        @staticmethod
+        def estimate_slow_call(call: Dict[str, Any]) -> Any:
+            """
+            A mock function estimating the call by its seconds.
+            """
+            call["options"]["estimated"] += 1
+            return call["seconds"]
+
+    sys.modules["test_tool_slow_plugin"] = SlowMock  # type: ignore
+    loaded_call_types: Dict[str, CallType] = {}
+    import_plugin("SLOW", loaded_call_types)
+    import_plugin("MOCK", loaded_call_types)
+    calls: List[Call] = [
+        {"type": "SLOW", "call": {}, "line": 1},
+        {"type": "SLOW", "call": {"seconds": 5}, "line": 2},
+        {"type": "SLOW", "call": {"seconds": "x"}, "line": 3},
+        {"type": "MOCK", "call": {}, "line": 4},
+    ]
+
+    estimates = estimate_call_durations(
+        calls, loaded_call_types, Path("."), {2: 0.5, 4: 1.5}
+    )
+
+    assert estimates == [2.0, 0.5, None, 1.5]
+    assert loaded_call_types["SLOW"]["default_call"]["options"] == {
+        "estimated": 0
+    }
+
+
+def test_make_all_calls_parallel() -> None:
+    """
+    Test the make_all_calls function with multiple jobs.
+    """
+    calls: List[Call] = [
+        {"type": "MOCK", "call": {"value": i}, "line": i} for i in range(10)
+    ]
+    data: Dict[str, Any] = {}
+    temporary_directory = Path(tempfile.gettempdir()).joinpath("test_tool")
+    temporary_directory.mkdir(exist_ok=True)
+
+    errors = make_all_calls(calls, data, temporary_directory, False, 4)
+
+    assert errors == 0
+    assert sorted(started) == sorted(str(i) for i in range(10))
+
+
+def test_make_all_calls_parallel_unknown_plugin() -> None:
+    """
+    Test that an unknown plugin counts as error with multiple jobs.
+    """
+    calls: List[Call] = [
+        {"type": "MOCK", "call": {"value": 1}, "line": 1},
+        {"type": "NON_EXISTING_PLUGIN", "call": {}, "line": 2},
+        {"type": "MOCK", "call": {"value": 3}, "line": 3},
+    ]
+    data: Dict[str, Any] = {}
+    temporary_directory = Path(tempfile.gettempdir()).joinpath("test_tool")
+    temporary_directory.mkdir(exist_ok=True)
+
+    errors = make_all_calls(calls, data, temporary_directory, True, 2)
+
+    assert errors == 1
+    assert sorted(started) == ["1", "3"]
@@ -0,0 +1,150 @@
+"""
+This module contains tests for the shard module.
+"""
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+from test_tool.base import run_tests
+from test_tool.scheduler import DATA_WRITES
+from test_tool.shard import (
+    REPORT_FILE,
+    SHARD_FILE,
+    merge_reports,
+    parse_shard,
+    split_calls,
+)
+from yaml import dump
+
+
+class ShardMock(object):
+    """
+    A mock class for test plugin recording the calls it makes.
+    """
+
+    made: List[int] = []
+
+    @staticmethod
+    def make_mock_call(call: Dict[str, Any], data: Dict[str, Any]) -> None:
+        """
+        A mock function saving a value.
+        """
+        ShardMock.made.append(call["id"])
+        if call.get("save"):
+            data[call["save"]] = call["id"]
+
+
+@pytest.fixture(name="shard_mock")
+def fixture_shard_mock(monkeypatch) -> None:
+    """
+    Install the mock and the keys it writes.
+    """
+    ShardMock.made = []
+    monkeypatch.setitem(sys.modules, "test_tool_mock_plugin", ShardMock)
+    monkeypatch.setitem(
+        DATA_WRITES,
+        "MOCK",
+        lambda call: {call["save"]} if call.get("save") else set(),
+    )
+
+
+def create_calls() -> List[Dict[str, Any]]:
+    """
+    Create six calls, the third reads the key saved by the first.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        The calls.
+    """
+    calls: List[Dict[str, Any]] = [
+        {"type": "MOCK", "line": idx + 1, "call": {"id": idx}}
+        for idx in range(6)
+    ]
+    calls[0]["call"]["save"] = "TOKEN"
+    calls[2]["call"]["token"] = "{{ TOKEN }}"
+    return calls
+
+
+def test_parse_shard() -> None:
+    """
+    Test that shards outside of 1 to N are invalid.
+    """
+    assert parse_shard("2/3") == (2, 3)
+    for shard in ["0/3", "4/3", "3", "a/b"]:
+        with pytest.raises(ValueError):
+            parse_shard(shard)
+
+
+def test_split_calls(shard_mock) -> None:
+    """
+    Test that every call is made by one shard, together with the calls it
+    depends on.
+    """
+    calls = create_calls()
+    shards = [split_calls(calls, {}, shard, 3) for shard in range(1, 4)]
+
+    ids = sorted(test["call"]["id"] for tests in shards for test in tests)
+    assert ids == list(range(6))
+    assert any(
+        [test["call"]["id"] for test in tests][:2] == [0, 2]
+        for tests in shards
+    )
+    assert split_calls(calls, {}, 1, 3) == shards[0]
+
+
+def test_split_calls_durations(shard_mock) -> None:
+    """
+    Test that the longest call is made by a shard on its own.
+    """
+    calls = create_calls()
+    durations = {1: 1.0, 2: 1.0, 3: 1.0, 4: 1.0, 5: 1.0, 6: 5.0}
+
+    first = split_calls(calls, {}, 1, 2, durations)
+    second = split_calls(calls, {}, 2, 2, durations)
+
+    assert [test["line"] for test in first] == [6]
+    assert [test["line"] for test in second] == [1, 2, 3, 4, 5]
+
+
+def test_merge_reports(shard_mock, tmpdir, caplog) -> None:
+    """
+    Test that the runs of the shards are merged into one report.
+    """
+    caplog.set_level("INFO")
+    project = Path(tmpdir).joinpath("project")
+    project.mkdir()
+    with open(project.joinpath("calls.yaml"), "w", encoding="utf-8") as file:
+        file.write(
+            dump([{"type": "MOCK", "call": {"id": idx}} for idx in range(4)])
+        )
+
+    for shard in [1, 2]:
+        run_tests(
+            project.as_posix(),
+            "calls.yaml",
+            "data.yaml",
+            False,
+            f"shard{shard}",
+            shard=f"{shard}/2",
+        )
+
+    assert sorted(ShardMock.made) == [0, 1, 2, 3]
+    with open(project.joinpath("shard1", SHARD_FILE), encoding="utf-8") as f:
+        assert json.load(f)["shards"] == 2
+
+    runs = [project.joinpath("shard1"), project.joinpath("shard2")]
+    merged = project.joinpath("merged")
+
+    assert merge_reports(runs, merged) == 0
+    with open(merged.joinpath(REPORT_FILE), encoding="utf-8") as file:
+        report = json.load(file)
+    assert report["steps"] == 4
+    assert report["failed"] == []
+    log = merged.joinpath("run.log").read_text(encoding="utf-8")
+    assert "| shard 1/2 | INFO |" in log
+    assert "| shard 2/2 | INFO |" in log
+
+    assert merge_reports(runs[:1], merged) == 1
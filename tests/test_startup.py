@@ -0,0 +1,184 @@
+"""
+This module contains tests for the startup of the test tool.
+
+The imports are recorded with python -X importtime in a new interpreter,
+so modules imported by other tests don't count. Only which modules are
+imported is checked, their import time depends on the machine.
+"""
+import subprocess
+import sys
+from json import loads
+from pathlib import Path
+from typing import List
+
+import test_tool
+from yaml import dump
+
+# Dependencies of the bundled plugins, which are slow to import
+HEAVY_MODULES: List[str] = [
+    "jaydebeapi",
+    "jpype",
+    "keyring",
+    "paramiko",
+    "requests",
+    "selenium",
+    "webdriver_manager",
+]
+
+# Modules of the standard library, which are slow to import and only
+# needed by some options
+SLOW_STDLIB_MODULES: List[str] = [
+    "asyncio",
+    "importlib.metadata",
+    "sqlite3",
+]
+
+# Records the heavy modules imported by the code in argv[2]
+RECORD_IMPORTS: str = """
+import sys
+from json import dumps
+
+heavy = sys.argv[1].split(",")
+imported = []
+
+
+class Recorder:
+    @staticmethod
+    def find_spec(name, path=None, target=None):
+        if name.split(".")[0] not in heavy:
+            return None
+        if name not in imported:
+            imported.append(name)
+        if "--block" in sys.argv:
+            raise ModuleNotFoundError(f"No module named {name!r}")
+        return None
+
+
+sys.meta_path.insert(0, Recorder)
+try:
+    exec(sys.argv[2])
+except SystemExit:
+    pass
+print(dumps(imported))
+"""
+
+
+def run_python(arguments: List[str]) -> subprocess.CompletedProcess:
+    """
+    Run a new interpreter with the test tool on the path.
+
+    Parameters
+    ----------
+    arguments : List[str]
+        The arguments of the interpreter.
+
+    Returns
+    -------
+    subprocess.CompletedProcess
+        The finished process.
+    """
+    root = Path(test_tool.__file__).parent.parent
+    return subprocess.run(
+        [sys.executable, *arguments],
+        capture_output=True,
+        check=True,
+        cwd=root,
+        text=True,
+    )
+
+
+def get_heavy_imports(code: str, block: bool = False) -> List[str]:
+    """
+    Get the heavy modules imported by some code in a new interpreter.
+
+    Parameters
+    ----------
+    code : str
+        The code.
+    block : bool, optional
+        Raise an ImportError for the heavy modules, by default False.
+
+    Returns
+    -------
+    List[str]
+        The imported heavy modules.
+    """
+    arguments = ["-c", RECORD_IMPORTS, ",".join(HEAVY_MODULES), code]
+    if block:
+        arguments.append("--block")
+    return loads(run_python(arguments).stdout.splitlines()[-1])
+
+
+def get_imported_modules(stderr: str) -> List[str]:
+    """
+    Get all modules imported, also the ones imported by other modules.
+
+    Parameters
+    ----------
+    stderr : str
+        The output of python -X importtime.
+
+    Returns
+    -------
+    List[str]
+        The names of the modules.
+    """
+    return [
+        line.split("|")[2].strip()
+        for line in stderr.splitlines()
+        if line.startswith("import time:") and line.count("|") == 2
+    ]
+
+
+def test_cli_imports() -> None:
+    """
+    Test that the help of the CLI imports no slow modules.
+    """
+    process = run_python(["-X", "importtime", "-m", "test_tool", "--help"])
+
+    modules = get_imported_modules(process.stderr)
+    assert not {module.split(".")[0] for module in modules}.intersection(
+        HEAVY_MODULES
+    )
+    assert not set(modules).intersection(SLOW_STDLIB_MODULES)
+
+
+def test_run_imports(tmpdir) -> None:
+    """
+    Test that a run of ASSERT steps imports no dependencies of the other
+    plugins.
+    """
+    project = Path(tmpdir).joinpath("project")
+    project.mkdir()
+    with open(project.joinpath("calls.yaml"), "w", encoding="utf-8") as file:
+        file.write(
+            dump([{"type": "ASSERT", "call": {"value": 1, "expected": 1}}])
+        )
+    code = (
+        "from test_tool.base import run_tests; "
+        + f"run_tests({project.as_posix()!r}, 'calls.yaml', 'data.yaml', "
+        + "False, '')"
+    )
+
+    process = run_python(["-X", "importtime", "-c", code])
+
+    modules = get_imported_modules(process.stderr)
+    assert any(
+        module.startswith("test_tool_assert_plugin") for module in modules
+    )
+    assert get_heavy_imports(code) == []
+
+
+def test_plugins_import_without_dependencies() -> None:
+    """
+    Test that the bundled plugins only import their dependencies when a
+    call is made.
+    """
+    root = Path(test_tool.__file__).parent.parent
+    plugins = sorted(
+        path.name for path in root.glob("test_tool_*_plugin") if path.is_dir()
+    )
+    code = "; ".join(f"import {plugin}" for plugin in plugins)
+
+    assert plugins
+    assert get_heavy_imports(code, block=True) == []
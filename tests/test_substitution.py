@@ -3,6 +3,10 @@ This module contains tests for the substitution module.
 """
 import pytest
 from test_tool.substitute import (
+    Variable,
+    compile_template,
+    find_referenced_keys,
+    find_variables,
     replace_string_variables,
     recursively_replace_variables,
 )
@@ -490,3 +494,107 @@ def test_recursively_substitute_more_complex_inducing_list_in_list():
     assert call == {
         "key": [["This is a value and value2"], ["This is a value and value2"]]
     }
+
+
+def test_compile_template():
+    """
+    Test that a string is compiled into literals and variables.
+    """
+    template = compile_template("a {{ foo.bar[-1] | round:2 }} b")
+
+    assert len(template) == 3
+    assert template[0] == "a "
+    assert template[2] == " b"
+    assert isinstance(template[1], Variable)
+    assert template[1].keys == (
+        ("foo", None, "data", "data.foo"),
+        ("bar", -1, "data.foo", "data.foo.bar"),
+    )
+    assert template[1].pipes == (("round", (2,)),)
+
+
+def test_compile_template_is_cached():
+    """
+    Test that a string is only compiled once.
+    """
+    compile_template.cache_clear()
+    compile_template("{{var}}")
+    compile_template("{{var}}")
+
+    assert compile_template.cache_info().hits == 1
+    assert compile_template.cache_info().misses == 1
+
+
+def test_find_referenced_keys():
+    """
+    Test that the top level keys of all variables are found.
+    """
+    call = {
+        "a": "{{ foo.bar | int }}",
+        "b": ["x {{baz[0]}} {{qux}}", {"c": "no variable"}],
+    }
+
+    assert find_referenced_keys(call) == {"foo", "baz", "qux"}
+
+
+def test_recursively_substitute_nested_reference_with_pipe():
+    """
+    Test that a referenced value is resolved before the pipes are applied.
+    """
+    data = {"var": "{{var2}}", "var2": "1"}
+    call = {"key": "{{var|int}}"}
+
+    recursively_replace_variables(call, data)
+    assert call == {"key": 1}
+
+
+def test_recursively_substitute_does_not_change_data():
+    """
+    Test that values from the data are resolved without changing them.
+    """
+    data = {"var": "value", "var3": {"key": "This is a {{var}}"}}
+    call = {"key": "{{var3}}"}
+
+    recursively_replace_variables(call, data)
+    assert call == {"key": {"key": "This is a value"}}
+    assert data["var3"] == {"key": "This is a {{var}}"}
+
+
+def test_recursively_substitute_cycle():
+    """
+    Test that a self referencing value raises an error with the chain.
+    """
+    data = {"a": "{{b}}", "b": ["{{c.d}}"], "c": {"d": "x {{a}}"}}
+    call = {"key": "{{a}}"}
+
+    with pytest.raises(ValueError) as excinfo:
+        recursively_replace_variables(call, data)
+
+    assert excinfo.value.args[0] == (
+        "Cycle in variables: data.a -> data.b -> data.c.d -> data.a"
+    )
+
+
+def test_recursively_substitute_only_given_variables():
+    """
+    Test that only the given strings are substituted.
+    """
+    data = {"var": "value"}
+    call = {"key": "{{var}}", "skipped": "{{var}}"}
+
+    recursively_replace_variables(call, data, {"key": True})
+    assert call == {"key": "value", "skipped": "{{var}}"}
+
+
+def test_find_variables():
+    """
+    Test that only the subtrees containing variables are found.
+    """
+    call = {
+        "a": "{{ foo }}",
+        "b": ["x", {"c": "{{bar}}", "d": 1}],
+        "e": {"f": ["no variable"]},
+    }
+
+    assert find_variables(call) == {"a": True, "b": {1: {"c": True}}}
+    assert find_variables({"a": "b"}) is None
@@ -0,0 +1,88 @@
+"""
+This module contains tests for the trace module.
+"""
+import sys
+from json import load
+from pathlib import Path
+from typing import Any, Dict
+
+from test_tool import trace, trace_span
+from test_tool.base import run_tests
+from test_tool.trace import TRACE_FILE
+from yaml import dump
+
+
+def test_trace_span_without_trace() -> None:
+    """
+    Test that a span does nothing if no trace is written.
+    """
+    with trace_span("connect", host="localhost"):
+        pass
+
+    assert trace.active_tracer is None
+
+
+def test_run_tests_writes_trace(tmpdir) -> None:
+    """
+    Test that steps, phases, plugin spans and nested runs are traced.
+    """
+
+    class Mock(object):
+        """
+        A mock class for test plugin.
+        """
+
+        @staticmethod
+        def make_mock_call(call: Dict[str, Any]) -> None:
+            """
+            A mock function adding a span.
+            """
+            with trace_span("request", url=call["url"]):
+                pass
+
+    sys.modules["test_tool_mock_plugin"] = Mock  # type: ignore
+    project = Path(tmpdir).joinpath("project")
+    suite = project.joinpath("suite")
+    suite.mkdir(parents=True)
+    with open(project.joinpath("calls.yaml"), "w", encoding="utf-8") as file:
+        file.write(
+            dump(
+                [
+                    {"type": "MOCK", "call": {"url": "a"}},
+                    {"type": "SUITE", "call": {"project": suite.as_posix()}},
+                ]
+            )
+        )
+    with open(suite.joinpath("calls.yaml"), "w", encoding="utf-8") as file:
+        file.write(dump([{"type": "MOCK", "call": {"url": "b"}}]))
+
+    run_tests(
+        project.as_posix(),
+        "calls.yaml",
+        "data.yaml",
+        False,
+        "output",
+        trace_run=True,
+    )
+
+    with open(
+        project.joinpath("output", TRACE_FILE), encoding="utf-8"
+    ) as file:
+        events = load(file)
+    tracks = {
+        event["tid"]: event["args"]["name"]
+        for event in events
+        if event["name"] == "thread_name"
+    }
+    spans = {
+        (tracks[event["tid"]], event["name"])
+        for event in events
+        if event["ph"] == "X"
+    }
+    assert trace.active_tracer is None
+    assert ("project", "MOCK line 1") in spans
+    assert ("project", "make") in spans
+    assert ("project", "request") in spans
+    assert ("project", "SUITE line 4") in spans
+    assert ("SUITE line 4 > suite", "MOCK line 1") in spans
+    assert ("SUITE line 4 > suite", "request") in spans
@@ -0,0 +1,92 @@
+"""
+This module contains tests for the utils module.
+"""
+import pickle
+from copy import deepcopy
+
+from test_tool.utils import CopyOnWriteDict, CopyOnWriteList
+
+
+def test_copy_on_write_dict_does_not_change_source():
+    """
+    Test that changing nested values does not change the source.
+    """
+    source = {"headers": {"Accept": "json"}, "codes": [200], "url": "a"}
+    expected = deepcopy(source)
+    call = CopyOnWriteDict(source)
+
+    call["headers"]["Content-Type"] = "text"
+    del call["headers"]["Accept"]
+    call["codes"].append(201)
+    call["url"] = "b"
+
+    assert source == expected
+    assert call == {
+        "headers": {"Content-Type": "text"},
+        "codes": [200, 201],
+        "url": "b",
+    }
+
+
+def test_copy_on_write_dict_copies_on_access_only():
+    """
+    Test that only accessed values are copied, and only once.
+    """
+    headers = {"Accept": "json"}
+    options = {"a": {"b": 1}}
+    call = CopyOnWriteDict({"headers": headers, "options": options})
+
+    assert dict.__getitem__(call, "options") is options
+    assert call["headers"] is not headers
+    assert call["headers"] is call["headers"]
+    assert dict.__getitem__(call, "options") is options
+
+
+def test_copy_on_write_dict_nested_access():
+    """
+    Test that values read through get, items and values are private.
+    """
+    source = {"save": {"type": None}, "files": [{"path": "a"}]}
+    call = CopyOnWriteDict(source)
+
+    call.get("save")["type"] = "STRING"
+    for key, value in call.items():
+        if key == "files":
+            value[0]["path"] = "b"
+    for value in call.values():
+        if isinstance(value, dict):
+            value["name"] = "c"
+
+    assert source == {"save": {"type": None}, "files": [{"path": "a"}]}
+    assert call == {
+        "save": {"type": "STRING", "name": "c"},
+        "files": [{"path": "b"}],
+    }
+
+
+def test_copy_on_write_list_iteration():
+    """
+    Test that dicts read by iterating a list are private.
+    """
+    actions = [{"action": "click"}, {"action": "wait"}]
+    call = CopyOnWriteDict({"actions": actions})
+
+    for action in call["actions"]:
+        action["done"] = True
+    call["actions"].pop()["done"] = False
+
+    assert actions == [{"action": "click"}, {"action": "wait"}]
+    assert call["actions"] == [{"action": "click", "done": True}]
+    assert isinstance(call["actions"], CopyOnWriteList)
+
+
+def test_copy_on_write_dict_pickle():
+    """
+    Test that a call can be pickled.
+    """
+    call = CopyOnWriteDict({"headers": {"Accept": "json"}})
+    call["headers"]["Content-Type"] = "text"
+
+    loaded = pickle.loads(pickle.dumps(call))
+
+    assert loaded == {"headers": {"Accept": "json", "Content-Type": "text"}}